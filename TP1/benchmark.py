@@ -0,0 +1,677 @@
+import typer
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import jobscli  # noqa: E402
+
+# Benchmarks do jobscli.py: os comandos correm contra um transporte HTTP simulado que responde
+# com fixtures (gravadas com "record" ou geradas de forma determinística), sem rede nem limites de taxa.
+#
+#   python benchmark.py run [--sizes 200,10000,100000] [--fixtures dir] [-o resultados.json] [--compare base.json]
+#   python benchmark.py record dir    (grava respostas reais do itjobs.pt e do Teamlyzer)
+#   python benchmark.py engines [--requests 200] [--latency 50]    (série vs threads vs async num servidor local)
+#   python benchmark.py duplicates [--trials 200]    (deteção de anúncios repetidos em anúncios editados)
+#   python benchmark.py statistics [--jobs 1000]    (statistics --offline igual ao caminho sem armazém)
+
+app = typer.Typer()
+
+SKILLS = ["python", "java", "javascript", "typescript", "sql", "docker", "kubernetes", "aws", "react",
+          "node", "c#", ".net", "php", "go", "rust", "spark", "azure", "linux", "git", "angular"]
+LOCAIS = ["Lisboa", "Porto", "Braga", "Coimbra", "Aveiro", "Faro", "Setúbal", "Viseu", "Remoto"]
+TIPOS = ["Full-time", "Part-time", "Estágio", "Freelance"]
+REGIMES = ["Trabalho remoto", "Regime híbrido", "Trabalho presencial", "On-site", ""]
+PAGINAS_TEAMLYZER = ["ranking", "empresa", "beneficios", "salario", "cargos", "tags"]
+
+
+### Fixtures ###
+
+def gerar_fixtures(n_empresas: int = 300, n_jobs: int = 1000, semente: int = 42) -> dict:
+    rnd = random.Random(semente)
+    empresas = [(f"Empresa {i} Lda", f"empresa-{i}") for i in range(n_empresas)]
+    inicio = datetime(2026, 1, 1)
+
+    jobs = []
+    for i in range(n_jobs):
+        nome, slug = empresas[rnd.randrange(n_empresas)]
+        skills = rnd.sample(SKILLS, 4)
+        paragrafos = "".join(
+            f"<p>Procuramos alguém com experiência em <b>{s}</b> para integrar a equipa de produto. "
+            f"Valorizamos conhecimentos de {rnd.choice(SKILLS)} e boas práticas de engenharia.</p>"
+            for s in skills
+        )
+        publicado = inicio + timedelta(minutes=rnd.randrange(365 * 24 * 60))
+        jobs.append({
+            "id": i + 1,
+            "company": {"id": int(slug.split("-")[1]) + 1, "name": nome, "slug": slug},
+            "title": f"{rnd.choice(['Junior', 'Senior', 'Mid'])} {skills[0].capitalize()} Developer",
+            "body": f"<p>{rnd.choice(REGIMES)}.</p>{paragrafos}<ul>" + "<li>Seguro de saúde</li>" * 3 + "</ul>",
+            "locations": [{"id": k + 1, "name": LOCAIS[k]} for k in rnd.sample(range(len(LOCAIS)), rnd.randint(1, 2))],
+            "types": [{"id": 1, "name": rnd.choice(TIPOS)}],
+            "allowRemote": rnd.choice([True, False, None]),
+            "wage": rnd.choice([None, "1.500 € - 2.000 €", "30.000€ / ano", "A combinar"]),
+            "publishedAt": publicado.strftime("%Y-%m-%d %H:%M:%S"),
+            "updatedAt": (publicado + timedelta(hours=rnd.randrange(48))).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    # Páginas do Teamlyzer com o mesmo aspeto (e tamanho aproximado) das reais.
+    ruido = "".join(f'<div class="review"><span>Review {k}</span><p>{"texto " * 40}</p></div>' for k in range(150))
+    links = "".join(f'<li><a href="/companies/{slug}">{nome}</a></li>' for nome, slug in empresas)
+    opcoes_cargos = "".join(
+        f'<option value="{c.lower().replace(" ", "-")}">{c} ({rnd.randint(5, 400)})</option>'
+        for c in ["Backend Developer", "Frontend Developer", "Data Scientist", "DevOps Engineer", "QA Engineer"]
+    )
+    opcoes_tags = "".join(f'<option value="{s}">{s} ({rnd.randint(1, 300)})</option>' for s in SKILLS)
+    paginas = {
+        "ranking": f"<html><body><a href='/companies/ranking'>Ranking</a><ul>{links}</ul>{ruido}</body></html>",
+        "empresa": (
+            '<html><head><meta itemprop="ratingValue" content="3,9">'
+            '<meta itemprop="description" content="Empresa de software com equipas em Lisboa e no Porto.">'
+            f"</head><body>{ruido}</body></html>"
+        ),
+        "beneficios": (
+            f"<html><body>{ruido}<h2 class=\"text-muted\">Benefícios e vantagens</h2>"
+            + "".join(f"<h3><b>Benefício {k}</b></h3><div class=\"flex_details\">Detalhe {k}</div>" for k in range(25))
+            + "<h2>Valores e cultura</h2><h3><b>Transparência</b></h3></body></html>"
+        ),
+        "salario": f"<html><body>{ruido}<div><span>Salário médio bruto</span><p>1.600 € - 2.400 €</p></div></body></html>",
+        "cargos": f'<html><body><select id="profession_role"><option value="-">-</option>{opcoes_cargos}</select>{ruido}</body></html>',
+        "tags": f'<html><body><select id="tags"><option value="-">-</option>{opcoes_tags}</select>{ruido}</body></html>',
+    }
+    return {"jobs": jobs, "teamlyzer": paginas}
+
+
+def ler_fixtures(pasta: str) -> dict:
+    with open(os.path.join(pasta, "itjobs_jobs.json"), encoding="utf-8") as f:
+        jobs = json.load(f)
+    paginas = {}
+    for nome in PAGINAS_TEAMLYZER:
+        with open(os.path.join(pasta, "teamlyzer", f"{nome}.html"), encoding="utf-8") as f:
+            paginas[nome] = f.read()
+    return {"jobs": jobs, "teamlyzer": paginas}
+
+
+def catalogo(base: list, n: int) -> list:
+    # Repete as fixtures até n jobs, com ids novos e datas desfasadas (ordenado do mais recente para o mais antigo).
+    jobs = []
+    for i in range(n):
+        job = dict(base[i % len(base)])
+        volta = i // len(base)
+        job["id"] = i + 1
+        if volta:
+            for campo in ("publishedAt", "updatedAt"):
+                if job.get(campo):
+                    data = datetime.fromisoformat(job[campo]) - timedelta(days=volta)
+                    job[campo] = data.strftime("%Y-%m-%d %H:%M:%S")
+        jobs.append(job)
+    jobs.sort(key=lambda j: j.get("publishedAt") or "", reverse=True)
+    return jobs
+
+
+### Transporte simulado ###
+
+class TransporteSimulado:
+    def __init__(self, jobs: list, paginas: dict):
+        self.jobs = jobs
+        self.por_id = {job["id"]: job for job in jobs}
+        self.paginas = paginas
+        self.pedidos = 0
+        self.bytes = 0
+
+    def resposta(self, url: str, corpo: str, tipo: str, status: int = 200):
+        dados = corpo.encode("utf-8")
+        self.pedidos += 1
+        self.bytes += len(dados)
+        return jobscli.resposta_requests(url, status, {"Content-Type": f"{tipo}; charset=utf-8"}, dados)
+
+    def __call__(self, url: str, headers: Optional[dict] = None, timeout: Optional[float] = None):
+        partes = urlparse(url)
+        q = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        caminho = partes.path
+
+        if caminho.endswith("/job/list.json"):
+            limite, pagina = int(q.get("limit", 12)), int(q.get("page", 1))
+            resultados = self.jobs[(pagina - 1) * limite:pagina * limite]
+            return self.resposta(url, json.dumps({"total": len(self.jobs), "results": resultados}), "application/json")
+        if caminho.endswith("/job/get.json"):
+            job = self.por_id.get(int(q.get("id", 0)))
+            corpo = job if job else {"error": {"code": 404, "message": "Job not found"}}
+            return self.resposta(url, json.dumps(corpo), "application/json")
+
+        if caminho == "/companies/ranking":
+            return self.resposta(url, self.paginas["ranking"], "text/html")
+        if caminho == "/companies/jobs":
+            return self.resposta(url, self.paginas["tags" if "profession_role" in q else "cargos"], "text/html")
+        segmentos = caminho.strip("/").split("/")
+        if segmentos[0] == "companies" and len(segmentos) == 2:
+            return self.resposta(url, self.paginas["empresa"], "text/html")
+        if segmentos[0] == "companies" and len(segmentos) == 3:
+            pagina = {"benefits-and-values": "beneficios", "salary-reviews": "salario"}.get(segmentos[2])
+            if pagina:
+                return self.resposta(url, self.paginas[pagina], "text/html")
+        return self.resposta(url, "not found", "text/plain", 404)
+
+
+def preparar_ambiente(pasta: str, transporte: TransporteSimulado):
+    # Armazém e cache novos por tamanho de catálogo; todos os pedidos passam pelo transporte simulado.
+    if jobscli._cache_con is not None:
+        jobscli._cache_con.close()
+        jobscli._cache_con = None
+    # Memos de processo feitos a partir do armazém anterior (senão o tamanho seguinte reutilizava-os).
+    jobscli._indice_empresas = None
+    jobscli._catalogo_cargos = None
+    jobscli._catalogo_local = None
+    jobscli._chave_catalogo = None
+    jobscli.DADOS_DIR = pasta
+    jobscli.CACHE_DB = os.path.join(pasta, "cache_http.sqlite3")
+    jobscli.ARMAZEM_DB = os.path.join(pasta, "jobs.sqlite3")
+    jobscli.enviar_pedido = transporte
+
+
+### Servidor local (motores HTTP) ###
+
+# Ao contrário do transporte simulado, os pedidos passam mesmo pela rede (127.0.0.1): é isto que permite
+# comparar o caminho em série (requests) com os motores em paralelo (threads e asyncio + httpx).
+
+def servidor_local(jobs: list, latencia: float) -> ThreadingHTTPServer:
+    corpos = {job["id"]: json.dumps(job).encode("utf-8") for job in jobs}
+
+    class Atendedor(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Cabeçalhos e corpo num só envio (evita a espera do Nagle/ACK atrasado em keep-alive).
+        wbufsize = 1 << 16
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            corpo = corpos.get(int(q.get("id", 0)), b'{"error": {"code": 404, "message": "Job not found"}}')
+            time.sleep(latencia)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Atendedor)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def correr_motor(motor: str, pedidos: list) -> int:
+    # Devolve o número de respostas 200.
+    if motor == "serie":
+        respostas = [jobscli.pedido_get(*pedido) for pedido in pedidos]
+    else:
+        jobscli.motor_http = motor
+        respostas = jobscli.obter_em_paralelo(pedidos)
+    return sum(1 for r in respostas if not isinstance(r, Exception) and r.status_code == 200)
+
+
+### Anúncios repetidos ###
+
+# Anúncios com o aspeto dos reais: cada empresa tem a sua apresentação e benefícios, que se repetem em
+# todos os anúncios dela; muda o cargo, as skills, os requisitos e as responsabilidades.
+FRASES_EMPRESA = [
+    "Somos uma empresa portuguesa de {area} com escritórios em {local} e clientes em mais de {n} países.",
+    "Há mais de {n} anos que desenvolvemos soluções de {area} para a banca, seguros e retalho.",
+    "A nossa equipa de {n} pessoas trabalha em projetos internacionais de {area}.",
+    "Acreditamos na autonomia, na partilha de conhecimento e num ambiente de trabalho descontraído.",
+    "Oferecemos seguro de saúde, horário flexível, formação contínua e um plano de carreira definido.",
+    "Temos um modelo de trabalho {regime} e um orçamento anual para conferências e certificações.",
+]
+FRASES_CARGO = [
+    "Procuramos um {nivel} {skill} developer para reforçar a equipa de {area}.",
+    "Vais participar no desenho, desenvolvimento e manutenção de serviços em {skill} e {skill2}.",
+    "Experiência de pelo menos {n} anos com {skill} em ambiente de produção.",
+    "Conhecimentos de {skill2}, bases de dados relacionais e integração contínua.",
+    "Vais colaborar com as equipas de produto e de design na definição de novas funcionalidades.",
+    "Valorizamos experiência com {skill2}, testes automáticos e revisão de código.",
+    "Serás responsável por garantir a qualidade, o desempenho e a segurança das aplicações.",
+    "Inglês fluente, boa capacidade de comunicação e espírito de equipa.",
+    "Licenciatura em Engenharia Informática ou área semelhante é um fator preferencial.",
+    "Vais acompanhar a migração dos sistemas atuais para a cloud com {skill} e {skill2}.",
+    "O projeto é uma plataforma de {area} usada diariamente por milhares de utilizadores.",
+    "Irás definir a arquitetura de novos microsserviços e documentar as decisões técnicas.",
+    "Gostamos de pessoas curiosas que queiram aprender {skill2} connosco.",
+    "Participarás nas cerimónias Scrum e no planeamento das entregas de cada sprint.",
+    "É importante teres experiência a monitorizar aplicações e a resolver incidentes em produção.",
+    "Trabalharás diretamente com o cliente para levantar requisitos e validar soluções.",
+    "Experiência com pipelines de CI/CD, Git e ferramentas de observabilidade é uma mais-valia.",
+    "Terás um mentor durante os primeiros meses e acesso a formação certificada em {skill}.",
+    "Procuramos alguém com capacidade de análise, autonomia e foco no detalhe.",
+    "As entrevistas decorrem em duas fases: conversa com recursos humanos e desafio técnico.",
+    "Vais otimizar consultas, modelar dados e garantir a integridade da informação.",
+    "A equipa é multidisciplinar e inclui analistas, testers e gestores de produto.",
+    "Conhecimentos de segurança aplicacional e boas práticas OWASP são valorizados.",
+    "Disponibilidade para deslocações pontuais a {local} para reuniões com a equipa.",
+    "Vais criar testes unitários e de integração e ajudar a manter a cobertura elevada.",
+    "Experiência em contextos ágeis e com metodologias Kanban ou Scrum.",
+    "Valorizamos contribuições para projetos open source e presença em comunidades técnicas.",
+    "Irás apoiar colegas mais novos com revisões de código e sessões de partilha.",
+    "O salário é ajustado à experiência, com revisão anual e prémio de desempenho.",
+    "Vais integrar APIs de parceiros externos e garantir a fiabilidade das integrações.",
+]
+PALAVRAS_EDICAO = ["urgente", "novo", "remoto", "sénior", "equipa", "projeto", "cliente", "lisboa", "porto",
+                   "python", "java", "docker", "excelente", "oportunidade", "imediata", "salário", "competitivo"]
+
+
+def anuncio_realista(rnd: random.Random, empresa: list, palavras: int) -> str:
+    valores = lambda: {"nivel": rnd.choice(["Junior", "Mid", "Senior"]), "skill": rnd.choice(SKILLS),
+                       "skill2": rnd.choice(SKILLS), "area": rnd.choice(["dados", "pagamentos", "saúde", "logística"]),
+                       "n": rnd.randint(2, 15), "local": rnd.choice(LOCAIS), "regime": rnd.choice(["híbrido", "remoto"])}
+    cargo = iter(rnd.sample(FRASES_CARGO[1:], len(FRASES_CARGO) - 1))
+    frases = [FRASES_CARGO[0].format(**valores())]
+    # Anúncios longos levam também a apresentação da empresa (igual em todos os anúncios dela).
+    if palavras > 100:
+        frases += empresa
+    while sum(len(f.split()) for f in frases) < palavras:
+        frases.append(next(cargo).format(**valores()))
+    return " ".join(" ".join(frases).split()[:palavras])
+
+
+def editar_anuncio(rnd: random.Random, texto: str, edicoes: int) -> str:
+    # Troca, acrescenta ou apaga palavras soltas, como numa atualização do anúncio.
+    palavras = texto.split()
+    for _ in range(edicoes):
+        i = rnd.randrange(len(palavras))
+        operacao = rnd.choice(["trocar", "acrescentar", "apagar"])
+        if operacao == "trocar":
+            palavras[i] = rnd.choice(PALAVRAS_EDICAO)
+        elif operacao == "acrescentar":
+            palavras.insert(i, rnd.choice(PALAVRAS_EDICAO))
+        else:
+            del palavras[i]
+    return " ".join(palavras)
+
+
+def job_de_texto(job_id: int, texto: str) -> dict:
+    titulo, _, corpo = texto.partition(".")
+    return {"id": job_id, "title": titulo, "body": f"<p>{corpo}</p>", "company": {"name": "Empresa Lda", "slug": "empresa"}}
+
+
+def repetido(a: str, b: str) -> bool:
+    return len(list(jobscli.sem_repetidos([job_de_texto(1, a), job_de_texto(2, b)]))) == 1
+
+
+### Medição ###
+
+def correr_comando(argv: list):
+    try:
+        jobscli.app(args=["--no-cache", "--engine", "threads"] + argv, prog_name="jobscli.py")
+    except SystemExit as e:
+        if e.code:
+            raise RuntimeError(f"{' '.join(argv)} terminou com código {e.code}")
+
+
+def silenciosa(funcao):
+    def correr():
+        with open(os.devnull, "w") as nulo, redirect_stdout(nulo), redirect_stderr(nulo):
+            funcao()
+    return correr
+
+
+def medir(nome: str, tamanho: int, funcao, transporte: TransporteSimulado, repeticoes: int,
+          memoria: bool, bytes_entrada: int = 0) -> dict:
+    funcao = silenciosa(funcao)
+    tempos = []
+    for _ in range(repeticoes):
+        transporte.pedidos = transporte.bytes = 0
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    pedidos, recebidos = transporte.pedidos, transporte.bytes
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        funcao()
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    resultado = {
+        "nome": nome,
+        "tamanho": tamanho,
+        "tempo_s": round(min(tempos), 6),
+        "pedidos": pedidos,
+        "bytes": recebidos + bytes_entrada,
+        "pico_memoria_bytes": pico,
+    }
+    print(f"  {nome:<28} {resultado['tempo_s']:>10.4f}s {pedidos:>6} pedidos "
+          f"{resultado['bytes'] / 1024:>10.0f} KiB" + (f" {pico / 2**20:>8.1f} MiB" if pico else ""),
+          file=sys.stderr)
+    return resultado
+
+
+def benchmarks(jobs: list, paginas: dict, pasta: str) -> list:
+    # (nome, função, bytes de entrada já em memória). A ordem importa: o sync prepara os comandos --offline.
+    textos = [((job.get("title") or "") + " " + (job.get("body") or "")).lower() for job in jobs]
+    bytes_textos = sum(len(t.encode("utf-8")) for t in textos)
+    contador = jobscli.carregar_skills(None)
+    n = str(len(jobs))
+
+    def regimes():
+        for job in jobs:
+            jobscli.regime_job(job)
+
+    def skills_contador():
+        contagens = dict.fromkeys(contador.skills, 0)
+        for texto in textos:
+            contador.contar(texto, contagens)
+
+    def agregacao():
+        cubo = jobscli.construir_cubo(jobs)
+        linhas = (chave + (ids,) for chave, ids in cubo.items())
+        jobscli.agregar_estatisticas(linhas, ["Lisboa", "Porto"], [], None, None, ["zona", "tipo_trabalho"])
+
+    def parsers():
+        jobscli.extrair_empresas_ranking(paginas["ranking"])
+        jobscli.info_empresa_de_html(paginas["empresa"])
+        jobscli.beneficios_de_html(paginas["beneficios"])
+        jobscli.salario_medio_de_html(paginas["salario"])
+        jobscli.opcoes_select_de_html(paginas["cargos"], "profession_role")
+        jobscli.opcoes_select_de_html(paginas["tags"], "tags")
+
+    lista = [
+        ("exportar_csv", lambda: jobscli.exportar_csv(jobs, os.path.join(pasta, "export.csv")), 0),
+        ("detectar_regime", regimes, bytes_textos),
+        ("skills_contador", skills_contador, bytes_textos),
+        ("statistics_agregacao", agregacao, 0),
+        ("teamlyzer_parsers", parsers, sum(len(p.encode("utf-8")) for p in paginas.values())),
+        ("cmd_top", lambda: correr_comando(["top", n]), 0),
+        ("cmd_search", lambda: correr_comando(["search", "Lisboa", "", n, "--all"]), 0),
+        ("cmd_skills", lambda: correr_comando(["skills", "2000-01-01", "2100-12-31", "--all"]), 0),
+        ("cmd_statistics", lambda: correr_comando(["statistics", "Lisboa", "Porto", "--all"]), 0),
+        ("cmd_skills_workers", lambda: correr_comando(
+            ["skills", "2000-01-01", "2100-12-31", "--all", "--workers", "4"]), 0),
+        ("cmd_statistics_workers", lambda: correr_comando(
+            ["statistics", "Lisboa", "Porto", "--all", "--workers", "4"]), 0),
+        ("cmd_type", lambda: correr_comando(["type", str(jobs[0]["id"])]), 0),
+        ("cmd_get", lambda: correr_comando(["get", str(jobs[0]["id"])]), 0),
+        ("cmd_list_skills", lambda: correr_comando(["list", "skills", "backend"]), 0),
+        ("cmd_sync", lambda: correr_comando(["sync", "--full"]), 0),
+        ("cmd_type_batch_offline", lambda: correr_comando(["type", "--batch", "--all-stored", "--reclassify"]), 0),
+        ("cmd_search_offline_query", lambda: correr_comando(
+            ["search", "Lisboa", "", "50", "--offline", "--any-type", "--query", "python OR java"]), 0),
+        ("cmd_search_offline", lambda: correr_comando(["search", "Lisboa", "", "50", "--offline"]), 0),
+        ("cmd_skills_offline", lambda: correr_comando(["skills", "2000-01-01", "2100-12-31", "--offline"]), 0),
+        ("cmd_statistics_offline", lambda: correr_comando(["statistics", "Lisboa", "Porto", "--offline"]), 0),
+        ("cmd_skills_unique_offline", lambda: correr_comando(
+            ["skills", "2000-01-01", "2100-12-31", "--offline", "--unique"]), 0),
+        ("cmd_salaries_offline", lambda: correr_comando(["salaries", "--min", "1500"]), 0),
+    ]
+    try:
+        import pandas  # noqa: F401
+        lista.append(("cmd_report_offline", lambda: correr_comando(["report", "--offline"]), 0))
+    except ImportError:
+        pass
+    return lista
+
+
+RUIDO_MINIMO_S = 0.005
+
+
+def comparar(base: dict, atual: dict, limiar: float) -> int:
+    anteriores = {(r["nome"], r["tamanho"]): r for r in base["resultados"]}
+    regressoes = 0
+    print(f"{'benchmark':<28} {'tamanho':>8} {'antes':>10} {'agora':>10} {'razão':>7}")
+    for r in atual["resultados"]:
+        antes = anteriores.get((r["nome"], r["tamanho"]))
+        if not antes or not antes["tempo_s"]:
+            continue
+        razao = r["tempo_s"] / antes["tempo_s"]
+        marca = ""
+        if razao > 1 + limiar and r["tempo_s"] - antes["tempo_s"] > RUIDO_MINIMO_S:
+            regressoes += 1
+            marca = "  <-- regressão"
+        print(f"{r['nome']:<28} {r['tamanho']:>8} {antes['tempo_s']:>10.4f} {r['tempo_s']:>10.4f} {razao:>7.2f}{marca}")
+    return regressoes
+
+
+@app.command()
+def run(
+    sizes: str = typer.Option("200,10000", "--sizes", help="Tamanhos do catálogo (ex: 200,10000,100000)."),
+    fixtures: Optional[str] = typer.Option(None, "--fixtures", help="Pasta com fixtures gravadas (ver record)."),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Ficheiro JSON com os resultados."),
+    compare: Optional[str] = typer.Option(None, "--compare", help="Resultados anteriores para comparar."),
+    threshold: float = typer.Option(0.10, "--threshold", help="Abrandamento tolerado (acima de 5 ms) antes de contar como regressão."),
+    repeat: int = typer.Option(1, "--repeat", help="Repetições por benchmark (conta o melhor tempo)."),
+    only: Optional[str] = typer.Option(None, "--only", help="Só os benchmarks com estes nomes (separados por vírgulas)."),
+    no_memory: bool = typer.Option(False, "--no-memory", help="Não mede o pico de memória (evita a corrida extra)."),
+):
+    dados = ler_fixtures(fixtures) if fixtures else gerar_fixtures()
+    tamanhos = [int(t) for t in sizes.split(",") if t.strip()]
+    filtro = {nome.strip() for nome in only.split(",")} if only else None
+
+    resultados = []
+    for tamanho in tamanhos:
+        print(f"Catálogo com {tamanho} jobs:", file=sys.stderr)
+        jobs = catalogo(dados["jobs"], tamanho)
+        transporte = TransporteSimulado(jobs, dados["teamlyzer"])
+        with tempfile.TemporaryDirectory(prefix="jobscli-bench-") as pasta:
+            preparar_ambiente(pasta, transporte)
+            for nome, funcao, bytes_entrada in benchmarks(jobs, dados["teamlyzer"], pasta):
+                if filtro and nome not in filtro:
+                    continue
+                resultados.append(medir(nome, tamanho, funcao, transporte, max(1, repeat), not no_memory, bytes_entrada))
+            preparar_ambiente(pasta, transporte)
+
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "fixtures": fixtures or "sintéticas",
+        "resultados": resultados,
+    }
+    output = output or f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados em '{output}'.", file=sys.stderr)
+
+    if compare:
+        with open(compare, encoding="utf-8") as f:
+            regressoes = comparar(json.load(f), relatorio, threshold)
+        if regressoes:
+            print(f"{regressoes} regressão(ões) acima de {threshold:.0%}.")
+            raise typer.Exit(1)
+
+
+@app.command()
+def engines(
+    n_pedidos: int = typer.Option(200, "--requests", help="Pedidos por motor."),
+    latency: float = typer.Option(50.0, "--latency", help="Latência de cada resposta do servidor local, em ms."),
+    concurrency: int = typer.Option(jobscli.CONCORRENCIA_DEFAULT, "--concurrency", help="Pedidos em simultâneo (threads e async)."),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Ficheiro JSON com os resultados."),
+):
+    jobs = catalogo(gerar_fixtures(n_jobs=min(n_pedidos, 1000))["jobs"], n_pedidos)
+    servidor = servidor_local(jobs, latency / 1000)
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/job/get.json"
+    pedidos = [(url, {"id": job["id"]}, None, 30) for job in jobs]
+
+    # Sem cache nem limite de taxa: mede-se só o transporte.
+    jobscli.cache_ativa = False
+    jobscli.concorrencia_http = max(1, concurrency)
+    jobscli.LIMITE_TAXA_POR_HOST["127.0.0.1"] = (1e9, 10 ** 9)
+    motores = ["serie", "threads"] + (["async"] if jobscli.HTTPX_DISPONIVEL else [])
+    if not jobscli.HTTPX_DISPONIVEL:
+        print("Motor async ignorado: o pacote httpx não está instalado.", file=sys.stderr)
+
+    resultados = []
+    print(f"{n_pedidos} pedidos, {latency:.0f} ms de latência, concorrência {jobscli.concorrencia_http}:", file=sys.stderr)
+    try:
+        for motor in motores:
+            inicio = time.perf_counter()
+            ok = correr_motor(motor, pedidos)
+            tempo = time.perf_counter() - inicio
+            resultados.append({"nome": f"http_{motor}", "tamanho": n_pedidos, "tempo_s": round(tempo, 6),
+                               "pedidos": ok, "bytes": 0, "pico_memoria_bytes": None})
+            print(f"  {motor:<8} {tempo:>8.3f}s {n_pedidos / tempo:>9.1f} pedidos/s "
+                  f"{resultados[0]['tempo_s'] / tempo:>6.1f}x   ({ok}/{n_pedidos} ok)", file=sys.stderr)
+    finally:
+        servidor.shutdown()
+
+    if output:
+        relatorio = {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "latencia_ms": latency,
+            "concorrencia": jobscli.concorrencia_http,
+            "resultados": resultados,
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados em '{output}'.", file=sys.stderr)
+
+
+@app.command()
+def duplicates(
+    trials: int = typer.Option(200, "--trials", help="Anúncios por caso."),
+    min_recall: float = typer.Option(0.95, "--min-recall", help="Deteção mínima exigida nos casos marcados com *."),
+    max_false: float = typer.Option(0.01, "--max-false", help="Máximo de anúncios distintos dados como repetidos."),
+):
+    # Cada caso edita um anúncio e verifica se a versão editada é dada como repetida (sem_repetidos, a mesma
+    # assinatura do armazém). Os falsos positivos são anúncios diferentes da mesma empresa.
+    rnd = random.Random(42)
+    falhas = 0
+    print(f"{'palavras':>8} {'edições':>8} {'detetados':>10}")
+    for palavras, edicoes, exigido in [(40, 1, True), (40, 3, True), (40, 10, False),
+                                       (250, 1, True), (250, 3, True), (250, 10, True), (250, 25, False)]:
+        detetados = 0
+        for _ in range(trials):
+            empresa = [f.format(area="dados", local="Lisboa", n=rnd.randint(5, 50), regime="híbrido")
+                       for f in rnd.sample(FRASES_EMPRESA, 4)]
+            texto = anuncio_realista(rnd, empresa, palavras)
+            detetados += repetido(texto, editar_anuncio(rnd, texto, edicoes))
+        taxa = detetados / trials
+        marca = "*" if exigido else " "
+        if exigido and taxa < min_recall:
+            falhas += 1
+            marca = "*  <-- abaixo de {:.0%}".format(min_recall)
+        print(f"{palavras:>8} {edicoes:>8} {taxa:>10.1%} {marca}")
+
+    pares = falsos = 0
+    for _ in range(max(1, trials // 10)):
+        empresa = [f.format(area="dados", local="Lisboa", n=rnd.randint(5, 50), regime="híbrido")
+                   for f in rnd.sample(FRASES_EMPRESA, 4)]
+        anuncios = [anuncio_realista(rnd, empresa, rnd.choice([40, 250])) for _ in range(10)]
+        for i in range(len(anuncios)):
+            for j in range(i + 1, len(anuncios)):
+                pares += 1
+                falsos += repetido(anuncios[i], anuncios[j])
+    print(f"Falsos positivos: {falsos}/{pares} pares de anúncios distintos da mesma empresa ({falsos / pares:.2%}).")
+    if falsos / pares > max_false:
+        falhas += 1
+    if falhas:
+        raise typer.Exit(1)
+
+
+def contar_diretamente(jobs: list, zonas: list, tipos: list, data_de: Optional[str], data_ate: Optional[str],
+                       dimensoes: list) -> list:
+    # Referência sem cubo: cada job conta uma vez em cada grupo onde tem pelo menos uma zona/tipo aceite.
+    contagens = {}
+    for job in jobs:
+        chaves = set()
+        for zona, tipo, empresa, dia in jobscli.factos_job(job):
+            if not any(jobscli.normalizar_texto(z) in jobscli.normalizar_texto(zona) for z in zonas):
+                continue
+            if tipos and not any(jobscli.normalizar_texto(t) in jobscli.normalizar_texto(tipo) for t in tipos):
+                continue
+            if (data_de and dia < data_de) or (data_ate and dia > data_ate):
+                continue
+            valores = {"zona": zona, "tipo_trabalho": tipo, "empresa": empresa, "dia": dia}
+            chaves.add(tuple(valores[d] for d in dimensoes))
+        for chave in chaves:
+            contagens[chave] = contagens.get(chave, 0) + 1
+    return [dict(zip(dimensoes, chave), vagas=vagas) for chave, vagas in contagens.items()]
+
+
+@app.command()
+def statistics(
+    n_jobs: int = typer.Option(1000, "--jobs", help="Jobs no catálogo."),
+):
+    # O cubo do armazém (--offline) e os caminhos em memória têm de contar cada job uma vez por grupo, também
+    # quando tem várias zonas (as fixtures têm 1-2) e vários tipos (um em cada três jobs recebe um segundo).
+    jobs = catalogo(gerar_fixtures()["jobs"], n_jobs)
+    for i, job in enumerate(jobs):
+        if i % 3 == 0:
+            job["types"] = job["types"] + [{"id": 2, "name": next(t for t in TIPOS if t != job["types"][0]["name"])}]
+    varias_zonas = sum(len(job["locations"]) > 1 for job in jobs)
+    print(f"{n_jobs} jobs, {varias_zonas} com várias zonas.")
+
+    consultas = [
+        (["Lisboa", "Porto"], [], None, None, ["zona", "tipo_trabalho"]),
+        (["Lisboa", "Porto"], [], None, None, ["tipo_trabalho"]),
+        (["Lisboa", "Porto", "Braga"], [], None, None, ["empresa"]),
+        (["Lisboa", "Porto"], [], None, None, ["dia"]),
+        (["Lisboa", "Porto"], ["part", "full"], "2026-03-01", "2026-06-30", ["tipo_trabalho"]),
+        (["a"], [], None, None, ["zona"]),
+    ]
+    falhas = 0
+    with tempfile.TemporaryDirectory(prefix="jobscli-bench-") as pasta:
+        preparar_ambiente(pasta, TransporteSimulado(jobs, gerar_fixtures(n_jobs=1)["teamlyzer"]))
+        silenciosa(lambda: correr_comando(["sync", "--full"]))()
+        jobscli.cache_ativa = False
+        for zonas, tipos, data_de, data_ate, dimensoes in consultas:
+            esperado = contar_diretamente(jobs, zonas, tipos, data_de, data_ate, dimensoes)
+            for nome, workers, offline in [("offline", 1, True), ("online", 1, False), ("workers", 2, False)]:
+                obtido = jobscli.calcular_estatisticas(zonas, tipos, data_de, data_ate, dimensoes, offline,
+                                                       todas=True, workers=workers)
+                iguais = sorted(map(str, obtido)) == sorted(map(str, esperado))
+                falhas += not iguais
+                print(f"  {nome:<8} {','.join(zonas):<20} {','.join(dimensoes):<20} "
+                      f"{sum(g['vagas'] for g in obtido):>6} {'ok' if iguais else 'DIFERENTE'}")
+        preparar_ambiente(pasta, TransporteSimulado([], {}))
+    if falhas:
+        raise typer.Exit(1)
+
+
+@app.command()
+def record(
+    pasta: str = typer.Argument(..., help="Pasta onde guardar as fixtures."),
+    pages: int = typer.Option(5, "--pages", help="Páginas da lista do itjobs.pt a gravar."),
+    cargo: str = typer.Option("backend", "--role", help="Cargo usado para gravar as páginas de skills do Teamlyzer."),
+):
+    jobs = list(jobscli.iterar_ofertas(pages, ordenado=True))
+    empresa = next((jobscli.nome_e_slug_empresa(job) for job in jobs if jobscli.nome_e_slug_empresa(job)[0]), None)
+    url_empresa = jobscli.encontrar_url_empresa_teamlyzer(*empresa) if empresa else None
+    if not url_empresa:
+        print("Não foi possível encontrar uma empresa do itjobs.pt no Teamlyzer.")
+        raise typer.Exit(1)
+
+    base = jobscli.TEAMLYZER_BASE_URL
+    role = jobscli.resolver_cargo_teamlyzer(cargo) or cargo
+    urls = {
+        "ranking": jobscli.TEAMLYZER_RANKING_URL,
+        "empresa": url_empresa,
+        "beneficios": url_empresa.rstrip("/") + "/benefits-and-values",
+        "salario": url_empresa.rstrip("/") + "/salary-reviews",
+        "cargos": f"{base}/companies/jobs?order=most_relevant",
+        "tags": f"{base}/companies/jobs?profession_role={role}&order=most_relevant",
+    }
+
+    os.makedirs(os.path.join(pasta, "teamlyzer"), exist_ok=True)
+    with open(os.path.join(pasta, "itjobs_jobs.json"), "w", encoding="utf-8") as f:
+        json.dump(jobs, f, ensure_ascii=False)
+    for nome, url in urls.items():
+        with open(os.path.join(pasta, "teamlyzer", f"{nome}.html"), "w", encoding="utf-8") as f:
+            f.write(jobscli.obter_html_teamlyzer(url))
+    print(f"Fixtures gravadas em '{pasta}': {len(jobs)} jobs e {len(urls)} páginas do Teamlyzer.")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,16 +1,112 @@
-import typer
-import requests
+from __future__ import annotations
+
 import json
+import os
+import socket
+import sys
+
+DADOS_DIR = os.environ.get("JOBSCLI_HOME", os.path.join(os.path.expanduser("~"), ".jobscli"))
+SOCKET_DAEMON = os.path.join(DADOS_DIR, "jobscli.sock")
+# Comandos que não terminam: correm sempre no próprio processo.
+COMANDOS_SEM_DAEMON = ("serve", "serve-http", "watch")
+# Opções globais (ver opcoes_globais) que consomem o argumento seguinte.
+OPCOES_GLOBAIS_COM_VALOR = ("--engine", "--concurrency", "--trace")
+
+
+def subcomando_de(argv: list) -> Optional[str]:
+    # O nome do comando vem depois das opções globais (ex: jobscli.py --no-cache serve-http).
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        i += 2 if argv[i] in OPCOES_GLOBAIS_COM_VALOR else 1
+    return argv[i] if i < len(argv) else None
+
+
+def encaminhar_para_daemon(argv: list):
+    # Se houver um daemon (jobscli.py serve) a correr, é ele que executa o comando: evita pagar
+    # o arranque do Python + typer/requests/bs4 em cada invocação. Devolve None se não houver daemon.
+    comando = subcomando_de(argv)
+    if comando is None or comando in COMANDOS_SEM_DAEMON or os.environ.get("JOBSCLI_NO_DAEMON") or not os.path.exists(SOCKET_DAEMON):
+        return None
+    try:
+        cliente = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        cliente.connect(SOCKET_DAEMON)
+    except OSError:
+        return None
+    pedido = {"argv": argv, "cwd": os.getcwd(), "stdin": sys.stdin.read() if "-" in argv else None}
+    with cliente:
+        cliente.sendall(json.dumps(pedido).encode("utf-8"))
+        cliente.shutdown(socket.SHUT_WR)
+        dados = b"".join(iter(lambda: cliente.recv(65536), b""))
+    resposta = json.loads(dados)
+    sys.stdout.write(resposta["stdout"])
+    sys.stderr.write(resposta["stderr"])
+    return resposta["codigo"]
+
+
+if __name__ == "__main__":
+    codigo_daemon = encaminhar_para_daemon(sys.argv[1:])
+    if codigo_daemon is not None:
+        sys.exit(codigo_daemon)
+
+import typer
 import csv
 import re
-import sys
-from datetime import datetime
+import functools
+import hashlib
+import importlib.util
+import io
+import math
+import queue
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime, timedelta
+from html import unescape
+from itertools import chain, islice
 from operator import itemgetter
-from bs4 import BeautifulSoup
-from typing import Optional
-from urllib.parse import quote
+from textwrap import indent
+from typing import TYPE_CHECKING, List, Optional
+from urllib.parse import quote, urlparse
 import unicodedata
 
+if TYPE_CHECKING:
+    import bs4
+    import requests
+    import sqlite3
+
+
+# requests, bs4, sqlite3, asyncio e os executores são importados dentro das funções que os usam (o import é
+# thread-safe): um comando offline não paga o arranque do requests/bs4. O httpx (opcional) só quando o motor
+# async é realmente usado.
+HTTPX_DISPONIVEL = importlib.util.find_spec("httpx") is not None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PARSER_HTML = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+def carregar_json(dados):
+    # Com o orjson instalado os bytes/str são descodificados diretamente, sem passar pelo json da stdlib.
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+def json_resposta(resp):
+    if orjson is None:
+        return resp.json()
+    try:
+        return orjson.loads(resp.content)
+    except orjson.JSONDecodeError:
+        # Corpo inválido: deixa o requests levantar o erro de sempre (é um RequestException).
+        return resp.json()
+
 app = typer.Typer()
 list_app = typer.Typer()
 
@@ -31,39 +127,1249 @@ TEAMLYZER_HEADERS = {
 TEAMLYZER_RANKING_URL = "https://pt.teamlyzer.com/companies/ranking"
 TEAMLYZER_BASE_URL = "https://pt.teamlyzer.com"
 
-def exportar_csv(ofertas, ficheiro):
+LIMITE_PAGINA = 200
 
-    with open(ficheiro, "w", newline="", encoding="utf-8") as csvfile:
-        fieldnames = ["titulo", "empresa", "descricao", "data_publicacao", "salario", "localizacao"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+CACHE_DB = os.path.join(DADOS_DIR, "cache_http.sqlite3")
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+CACHE_TTL_DEFAULT = 3600
+CACHE_TTL_POR_HOST = {
+    "api.itjobs.pt": 300,
+    "pt.teamlyzer.com": 24 * 3600,
+}
 
-        for job in ofertas:
+TIMEOUT_DEFAULT = 15
+MAX_TENTATIVAS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+# Pedidos por segundo e rajada máxima permitidos por host.
+LIMITE_TAXA_POR_HOST = {
+    "api.itjobs.pt": (10.0, 20),
+    "pt.teamlyzer.com": (3.0, 6),
+}
+LIMITE_TAXA_DEFAULT = (10.0, 20)
+CONCORRENCIA_DEFAULT = 16
+
+motor_http = "auto"
+concorrencia_http = CONCORRENCIA_DEFAULT
+
+
+# Instrumentação (--profile / --trace): fases, pedidos HTTP e parsing ficam registados como spans.
+# Com as duas opções desligadas, Fase e medido não fazem nada além de testar uma flag.
+
+perfil_ativo = False
+_spans = []
+_inicio_perfil = 0.0
+
+
+class Fase:
+    __slots__ = ("nome", "categoria", "args", "inicio")
+
+    def __init__(self, nome: str, categoria: str = "fase", **args):
+        self.nome = nome
+        self.categoria = categoria
+        self.args = args
+
+    def __enter__(self):
+        if perfil_ativo:
+            self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if perfil_ativo:
+            if tipo is not None:
+                self.args["erro"] = tipo.__name__
+            _spans.append((self.nome, self.categoria, self.inicio, time.perf_counter(),
+                           threading.get_ident(), self.args))
+        return False
+
+
+def medido(funcao):
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        if not perfil_ativo:
+            return funcao(*args, **kwargs)
+        with Fase(funcao.__name__):
+            return funcao(*args, **kwargs)
+    return envolvida
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))] if ordenados else 0.0
+
+
+def mostrar_perfil(comando: Optional[str]):
+    total = time.perf_counter() - _inicio_perfil
+    fases, http, parse, espera = {}, [], {}, 0.0
+    for nome, categoria, inicio, fim, _, args in _spans:
+        if categoria == "http":
+            http.append((fim - inicio, args))
+        elif categoria == "espera":
+            espera += fim - inicio
+        else:
+            alvo = parse if categoria == "parse" else fases
+            chamadas, soma = alvo.get(nome, (0, 0.0))
+            alvo[nome] = (chamadas + 1, soma + fim - inicio)
+
+    print(f"\nPerfil de '{comando or ''}': {total:.3f}s no total", file=sys.stderr)
+    for titulo, tabela in (("Fases", fases), ("Parsing", parse)):
+        if not tabela:
+            continue
+        print(f"  {titulo} (tempo inclusivo):", file=sys.stderr)
+        for nome, (chamadas, soma) in sorted(tabela.items(), key=lambda x: x[1][1], reverse=True):
+            print(f"    {nome:<34} {chamadas:>6}x {soma:>9.3f}s {soma / chamadas * 1000:>9.1f} ms/chamada",
+                  file=sys.stderr)
+
+    if http:
+        latencias = [d for d, _ in http]
+        por_host = {}
+        for _, args in http:
+            por_host[args.get("host", "?")] = por_host.get(args.get("host", "?"), 0) + 1
+        recebidos = sum(args.get("bytes", 0) for _, args in http)
+        erros = sum(1 for _, args in http if "erro" in args or args.get("status", 200) >= 400)
+        print(
+            f"  HTTP: {len(http)} pedidos ({', '.join(f'{h}: {n}' for h, n in por_host.items())}), "
+            f"{erros} com erro, {recebidos / 1024:.1f} KiB recebidos",
+            file=sys.stderr,
+        )
+        print(
+            f"    latência média {sum(latencias) / len(latencias) * 1000:.0f} ms, "
+            f"p50 {percentil(latencias, 0.5) * 1000:.0f} ms, p95 {percentil(latencias, 0.95) * 1000:.0f} ms, "
+            f"máx {max(latencias) * 1000:.0f} ms; espera por limite de taxa {espera:.3f}s",
+            file=sys.stderr,
+        )
+    else:
+        print("  HTTP: nenhum pedido à rede.", file=sys.stderr)
+
+    pedidos = sum(estatisticas_cache.values())
+    if pedidos:
+        taxa = (estatisticas_cache["hits"] + estatisticas_cache["revalidados"]) / pedidos
+        print(
+            f"  Cache HTTP: {estatisticas_cache['hits']} hits, {estatisticas_cache['revalidados']} revalidados, "
+            f"{estatisticas_cache['misses']} misses (taxa de acerto {taxa:.0%})",
+            file=sys.stderr,
+        )
+
+
+def escrever_rastreio(ficheiro: str, comando: Optional[str]):
+    # Formato "Trace Event" do Chrome (chrome://tracing, Perfetto): um evento completo ("X") por span.
+    pid = os.getpid()
+    threads = {threading.main_thread().ident: 0}
+    eventos = [{
+        "name": comando or "jobscli", "cat": "comando", "ph": "X", "ts": 0,
+        "dur": round((time.perf_counter() - _inicio_perfil) * 1e6), "pid": pid, "tid": 0,
+    }]
+    for nome, categoria, inicio, fim, thread, args in _spans:
+        eventos.append({
+            "name": nome,
+            "cat": categoria,
+            "ph": "X",
+            "ts": round((inicio - _inicio_perfil) * 1e6),
+            "dur": round((fim - inicio) * 1e6),
+            "pid": pid,
+            "tid": threads.setdefault(thread, len(threads)),
+            "args": args,
+        })
+    try:
+        with open(ficheiro, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        print(f"Rastreio com {len(eventos)} spans guardado em '{ficheiro}'.", file=sys.stderr)
+    except OSError as e:
+        print(f"Não foi possível guardar o rastreio em '{ficheiro}': {e}", file=sys.stderr)
+
+
+# Transporte HTTP partilhado: sessões keep-alive por host, timeouts, retry com backoff e rate limiting.
+
+class BaldeTokens:
+    def __init__(self, taxa: float, capacidade: int):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.atualizado = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reservar(self) -> float:
+        # Consome um token se houver; caso contrário devolve quanto tempo falta esperar.
+        with self.lock:
+            agora = time.monotonic()
+            self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+            self.atualizado = agora
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.taxa
+
+    def adquirir(self):
+        espera = self.reservar()
+        while espera > 0:
+            time.sleep(espera)
+            espera = self.reservar()
+
+    async def adquirir_async(self):
+        import asyncio
+
+        espera = self.reservar()
+        while espera > 0:
+            await asyncio.sleep(espera)
+            espera = self.reservar()
+
+
+_sessoes = {}
+_baldes = {}
+_transporte_lock = threading.Lock()
+
+
+def balde_para(host: str) -> BaldeTokens:
+    with _transporte_lock:
+        if host not in _baldes:
+            _baldes[host] = BaldeTokens(*LIMITE_TAXA_POR_HOST.get(host, LIMITE_TAXA_DEFAULT))
+        return _baldes[host]
+
+
+def sessao_para(host: str):
+    import requests
+
+    balde = balde_para(host)
+    with _transporte_lock:
+        if host not in _sessoes:
+            sessao = requests.Session()
+            adaptador = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(concorrencia_http, 10))
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            _sessoes[host] = sessao
+        return _sessoes[host], balde
+
+
+def tempo_de_espera(tentativa: int, resp: Optional[requests.Response] = None) -> float:
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    # Backoff exponencial com "full jitter".
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentativa))
+
+
+def enviar_pedido(url: str, headers: Optional[dict] = None, timeout: Optional[float] = None) -> requests.Response:
+    import requests
+
+    host = urlparse(url).hostname or ""
+    sessao, balde = sessao_para(host)
+    for tentativa in range(MAX_TENTATIVAS):
+        ultima = tentativa == MAX_TENTATIVAS - 1
+        with Fase("limite de taxa", "espera", host=host):
+            balde.adquirir()
+        try:
+            with Fase(f"GET {host}", "http", host=host, url=url, tentativa=tentativa) as fase:
+                resp = sessao.get(url, headers=headers, timeout=timeout or TIMEOUT_DEFAULT)
+                fase.args.update(status=resp.status_code, bytes=len(resp.content))
+        except (requests.ConnectionError, requests.Timeout):
+            if ultima:
+                raise
+            time.sleep(tempo_de_espera(tentativa))
+            continue
+        if resp.status_code not in STATUS_REPETIVEIS or ultima:
+            return resp
+        time.sleep(tempo_de_espera(tentativa, resp))
+
+
+async def enviar_pedido_async(cliente, url: str, headers: Optional[dict] = None,
+                              timeout: Optional[float] = None) -> requests.Response:
+    import asyncio
+    import httpx
+    import requests
+
+    host = urlparse(url).hostname or ""
+    balde = balde_para(host)
+    for tentativa in range(MAX_TENTATIVAS):
+        ultima = tentativa == MAX_TENTATIVAS - 1
+        with Fase("limite de taxa", "espera", host=host):
+            await balde.adquirir_async()
+        try:
+            with Fase(f"GET {host}", "http", host=host, url=url, tentativa=tentativa) as fase:
+                r = await cliente.get(url, headers=headers, timeout=timeout or TIMEOUT_DEFAULT)
+                fase.args.update(status=r.status_code, bytes=len(r.content))
+        except httpx.TransportError as e:
+            # Os chamadores só conhecem as exceções do requests.
+            if ultima:
+                raise requests.ConnectionError(f"{e.__class__.__name__}: {e}")
+            await asyncio.sleep(tempo_de_espera(tentativa))
+            continue
+        resp = resposta_requests(str(r.url), r.status_code, dict(r.headers), r.content)
+        if resp.status_code not in STATUS_REPETIVEIS or ultima:
+            return resp
+        await asyncio.sleep(tempo_de_espera(tentativa, resp))
+
+
+# Cache persistente de respostas HTTP (TTL por host, revalidação ETag/Last-Modified, LRU por tamanho).
+
+cache_ativa = True
+estatisticas_cache = {"hits": 0, "revalidados": 0, "misses": 0}
+_cache_lock = threading.Lock()
+_cache_con = None
+
+
+def abrir_cache() -> sqlite3.Connection:
+    import sqlite3
+
+    global _cache_con
+    if _cache_con is None:
+        os.makedirs(DADOS_DIR, exist_ok=True)
+        _cache_con = sqlite3.connect(CACHE_DB, check_same_thread=False)
+        _cache_con.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                cabecalhos TEXT NOT NULL,
+                corpo BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                guardado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL,
+                tamanho INTEGER NOT NULL
+            )
+        """)
+        _cache_con.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (ultimo_acesso)")
+        _cache_con.execute("""
+            CREATE TABLE IF NOT EXISTS extraidos (
+                url TEXT NOT NULL,
+                extrator TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                valor TEXT NOT NULL,
+                PRIMARY KEY (url, extrator)
+            )
+        """)
+    return _cache_con
+
+
+def ttl_cache(url: str) -> int:
+    return CACHE_TTL_POR_HOST.get(urlparse(url).hostname or "", CACHE_TTL_DEFAULT)
+
+
+def resposta_requests(url: str, status: int, cabecalhos: dict, corpo: bytes) -> requests.Response:
+    # O corpo já vem descomprimido, por isso não se guardam os cabeçalhos de transporte.
+    import requests
+
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = requests.structures.CaseInsensitiveDict({
+        k: v for k, v in cabecalhos.items()
+        if k.lower() not in ("content-encoding", "content-length", "transfer-encoding", "connection")
+    })
+    resp._content = corpo
+    resp.url = url
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    return resp
+
+
+def resposta_da_cache(url: str, status: int, cabecalhos: str, corpo: bytes) -> requests.Response:
+    return resposta_requests(url, status, json.loads(cabecalhos), corpo)
+
+
+def guardar_na_cache(url: str, resp: requests.Response):
+    # O corpo guardado já vem descomprimido, por isso não se guardam os cabeçalhos de transporte.
+    cabecalhos = {
+        k: v for k, v in resp.headers.items()
+        if k.lower() not in ("content-encoding", "content-length", "transfer-encoding", "connection")
+    }
+    corpo = resp.content
+    agora = time.time()
+    with _cache_lock:
+        con = abrir_cache()
+        con.execute(
+            "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, resp.status_code, json.dumps(cabecalhos), corpo, resp.headers.get("ETag"),
+             resp.headers.get("Last-Modified"), agora, agora, len(corpo)),
+        )
+        total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total > CACHE_MAX_BYTES:
+            alvo = total - int(CACHE_MAX_BYTES * 0.9)
+            for chave, tamanho in con.execute(
+                "SELECT url, tamanho FROM respostas ORDER BY ultimo_acesso"
+            ).fetchall():
+                if alvo <= 0:
+                    break
+                con.execute("DELETE FROM respostas WHERE url = ?", (chave,))
+                alvo -= tamanho
+        con.commit()
+
+
+def esquecer_resposta(url: str):
+    # Uma página guardada que afinal não tem o conteúdo esperado volta a ser pedida na próxima chamada.
+    if not cache_ativa or not os.path.exists(CACHE_DB):
+        return
+    with _cache_lock:
+        con = abrir_cache()
+        con.execute("DELETE FROM respostas WHERE url = ?", (preparar_url(url),))
+        con.commit()
+
+
+def preparar_url(url: str, params: Optional[dict] = None) -> str:
+    import requests
+
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+def consultar_cache(url: str, headers: Optional[dict] = None, revalidar: bool = False):
+    # Devolve (resposta fresca ou None, linha da cache, cabeçalhos do pedido condicional). Com revalidar=True
+    # nunca há resposta fresca: a entrada guardada só serve para o pedido condicional (ETag/Last-Modified).
+    with _cache_lock:
+        row = abrir_cache().execute(
+            "SELECT status, cabecalhos, corpo, etag, last_modified, guardado_em FROM respostas WHERE url = ?",
+            (url,),
+        ).fetchone()
+
+    cab_pedido = dict(headers or {})
+    if row:
+        status, cabecalhos, corpo, etag, last_modified, guardado_em = row
+        agora = time.time()
+        if not revalidar and agora - guardado_em < ttl_cache(url):
+            with _cache_lock:
+                _cache_con.execute("UPDATE respostas SET ultimo_acesso = ? WHERE url = ?", (agora, url))
+                _cache_con.commit()
+            estatisticas_cache["hits"] += 1
+            return resposta_da_cache(url, status, cabecalhos, corpo), row, cab_pedido
+        if etag:
+            cab_pedido["If-None-Match"] = etag
+        if last_modified:
+            cab_pedido["If-Modified-Since"] = last_modified
+
+    return None, row, cab_pedido
+
+
+def concluir_pedido(url: str, row, resp: requests.Response) -> requests.Response:
+    if row and resp.status_code == 304:
+        status, cabecalhos, corpo = row[:3]
+        agora = time.time()
+        with _cache_lock:
+            _cache_con.execute(
+                "UPDATE respostas SET guardado_em = ?, ultimo_acesso = ? WHERE url = ?", (agora, agora, url)
+            )
+            _cache_con.commit()
+        estatisticas_cache["revalidados"] += 1
+        return resposta_da_cache(url, status, cabecalhos, corpo)
+
+    estatisticas_cache["misses"] += 1
+    if resp.status_code == 200:
+        guardar_na_cache(url, resp)
+    return resp
+
+
+def pedido_get(url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+               timeout: Optional[float] = None, revalidar: bool = False) -> requests.Response:
+    url = preparar_url(url, params)
+    if not cache_ativa:
+        return enviar_pedido(url, headers=headers, timeout=timeout)
+
+    fresca, row, cab_pedido = consultar_cache(url, headers, revalidar)
+    if fresca is not None:
+        return fresca
+    return concluir_pedido(url, row, enviar_pedido(url, headers=cab_pedido, timeout=timeout))
+
+
+async def pedido_get_async(cliente, semaforo, url: str, params: Optional[dict] = None,
+                           headers: Optional[dict] = None, timeout: Optional[float] = None,
+                           revalidar: bool = False) -> requests.Response:
+    url = preparar_url(url, params)
+    row, cab_pedido = None, headers
+    if cache_ativa:
+        fresca, row, cab_pedido = consultar_cache(url, headers, revalidar)
+        if fresca is not None:
+            return fresca
+
+    async with semaforo:
+        resp = await enviar_pedido_async(cliente, url, headers=cab_pedido, timeout=timeout)
+    return concluir_pedido(url, row, resp) if cache_ativa else resp
+
+
+# Motor de pedidos em paralelo: um pool de threads, ou asyncio + httpx com --engine async.
+# Cada pedido é um tuplo (url, params, headers, timeout[, revalidar]); os resultados saem como
+# (índice, resposta ou exceção). Nunca há mais de concorrencia_http pedidos em curso: os seguintes só
+# partem à medida que os resultados são consumidos, e fechar o iterador cancela o que falta.
+
+def motor_async_disponivel() -> bool:
+    return motor_http == "async" and HTTPX_DISPONIVEL
+
+
+def _entregar(fila: queue.Queue, parar: threading.Event, item) -> bool:
+    # Bloqueia enquanto a fila estiver cheia; desiste se o consumidor fechou o iterador.
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _correr_motor_async(pedidos: list, fila: queue.Queue, parar: threading.Event):
+    import asyncio
+    import httpx
+
+    async def principal():
+        semaforo = asyncio.Semaphore(concorrencia_http)
+        limites = httpx.Limits(max_connections=concorrencia_http, max_keepalive_connections=concorrencia_http)
+        proximos = enumerate(pedidos)
+        async with httpx.AsyncClient(limits=limites, follow_redirects=True) as cliente:
+            async def trabalhador():
+                # Os trabalhadores partilham o iterador: cada um só tira um pedido quando acaba o anterior.
+                for i, pedido in proximos:
+                    if parar.is_set():
+                        return
+                    try:
+                        resultado = await pedido_get_async(cliente, semaforo, *pedido)
+                    except Exception as e:
+                        resultado = e
+                    try:
+                        fila.put_nowait((i, resultado))
+                    except queue.Full:
+                        if not await asyncio.to_thread(_entregar, fila, parar, (i, resultado)):
+                            return
+
+            async def vigiar():
+                while not parar.is_set():
+                    await asyncio.sleep(0.05)
+
+            trabalhadores = [asyncio.create_task(trabalhador())
+                             for _ in range(max(1, min(concorrencia_http, len(pedidos))))]
+            vigia = asyncio.create_task(vigiar())
+            todos = asyncio.gather(*trabalhadores)
+            await asyncio.wait([todos, vigia], return_when=asyncio.FIRST_COMPLETED)
+            # Fecho antecipado: cancela os pedidos ainda em curso.
+            for tarefa in trabalhadores + [vigia]:
+                tarefa.cancel()
+            await asyncio.gather(todos, vigia, return_exceptions=True)
 
-            empresa = job.get("company")
-            if isinstance(empresa, dict):
-                empresa = empresa.get("name", "N/A")
-            else:
-                empresa = empresa or "N/A"
+    try:
+        asyncio.run(principal())
+    finally:
+        _entregar(fila, parar, None)
+
+
+def _iterar_async(pedidos: list):
+    fila = queue.Queue(maxsize=max(1, concorrencia_http))
+    parar = threading.Event()
+    motor = threading.Thread(target=_correr_motor_async, args=(pedidos, fila, parar), daemon=True)
+    motor.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is None:
+                return
+            yield item
+    finally:
+        parar.set()
+
+
+def _iterar_threads(pedidos: list):
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    janela = max(1, min(concorrencia_http, len(pedidos)))
+    pool = ThreadPoolExecutor(max_workers=janela)
+    proximos = enumerate(pedidos)
+    em_curso = {pool.submit(pedido_get, *pedido): i for i, pedido in islice(proximos, janela)}
+    try:
+        while em_curso:
+            feitos, _ = wait(em_curso, return_when=FIRST_COMPLETED)
+            for fut in feitos:
+                i = em_curso.pop(fut)
+                # Repõe a janela antes de entregar o resultado, para o pool não parar enquanto o chamador o processa.
+                for j, pedido in islice(proximos, 1):
+                    em_curso[pool.submit(pedido_get, *pedido)] = j
+                try:
+                    resultado = fut.result()
+                except Exception as e:
+                    resultado = e
+                yield i, resultado
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iterar_em_paralelo(pedidos: list, ordenado: bool = False):
+    if not pedidos:
+        return
+    motor = _iterar_async(pedidos) if motor_async_disponivel() else _iterar_threads(pedidos)
+    try:
+        if not ordenado:
+            yield from motor
+            return
+        pendentes = {}
+        proximo = 0
+        for i, resultado in motor:
+            pendentes[i] = resultado
+            while proximo in pendentes:
+                yield proximo, pendentes.pop(proximo)
+                proximo += 1
+    finally:
+        motor.close()
+
+
+def obter_em_paralelo(pedidos: list) -> list:
+    resultados = [None] * len(pedidos)
+    for i, resultado in iterar_em_paralelo(pedidos):
+        resultados[i] = resultado
+    return resultados
+
+
+def mostrar_estatisticas_cache():
+    entradas, tamanho = 0, 0
+    if os.path.exists(CACHE_DB):
+        with _cache_lock:
+            entradas, tamanho = abrir_cache().execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+            ).fetchone()
+    pedidos = sum(estatisticas_cache.values())
+    taxa = (estatisticas_cache["hits"] + estatisticas_cache["revalidados"]) / pedidos if pedidos else 0.0
+    print(
+        f"Cache HTTP: {estatisticas_cache['hits']} hits, {estatisticas_cache['revalidados']} revalidados (304), "
+        f"{estatisticas_cache['misses']} misses, taxa de acerto {taxa:.0%}; "
+        f"{entradas} entradas, {tamanho / 1024:.1f} KiB em disco.",
+        file=sys.stderr,
+    )
+
+
+@app.callback()
+def opcoes_globais(
+    ctx: typer.Context,
+    no_cache: bool = typer.Option(False, "--no-cache", help="Não usa a cache de respostas HTTP."),
+    cache_stats: bool = typer.Option(False, "--cache-stats", help="Mostra estatísticas da cache HTTP no fim."),
+    engine: str = typer.Option("auto", "--engine", help="Motor de pedidos em paralelo: auto (threads), async (requer httpx) ou threads."),
+    concurrency: int = typer.Option(CONCORRENCIA_DEFAULT, "--concurrency", help="Máximo de pedidos HTTP em simultâneo."),
+    profile: bool = typer.Option(False, "--profile", help="Mostra no fim tempos por fase, pedidos HTTP, cache e parsing."),
+    trace: Optional[str] = typer.Option(None, "--trace", help="Guarda os spans num ficheiro JSON (formato Chrome trace)."),
+):
+    global cache_ativa, motor_http, concorrencia_http, perfil_ativo, _inicio_perfil
+    perfil_ativo = profile or bool(trace)
+    _spans.clear()
+    _inicio_perfil = time.perf_counter()
+    if profile:
+        ctx.call_on_close(lambda: mostrar_perfil(ctx.invoked_subcommand))
+    if trace:
+        ctx.call_on_close(lambda: escrever_rastreio(trace, ctx.invoked_subcommand))
+    cache_ativa = not no_cache
+    motor_http = engine.lower()
+    concorrencia_http = max(1, concurrency)
+    if motor_http == "async" and not HTTPX_DISPONIVEL:
+        print("Aviso: o motor async requer o pacote httpx; a usar threads.", file=sys.stderr)
+    if cache_stats:
+        ctx.call_on_close(mostrar_estatisticas_cache)
+
+
+# Obtenção paginada e concorrente da lista de ofertas do itjobs.pt.
+
+def pedido_pagina_itjobs(pagina: int, limite: int = LIMITE_PAGINA, revalidar: bool = False) -> tuple:
+    return API_LIST_URL, {"api_key": API_KEY, "limit": limite, "page": pagina}, headers, 15, revalidar
+
+
+@medido
+def obter_pagina_itjobs(pagina: int, limite: int = LIMITE_PAGINA, revalidar: bool = False) -> dict:
+    # revalidar=True (sync): a página vem sempre do servidor, ou da cache só depois de um 304.
+    resp = pedido_get(*pedido_pagina_itjobs(pagina, limite, revalidar))
+    resp.raise_for_status()
+    return json_resposta(resp)
+
+
+def iterar_ofertas(max_paginas: Optional[int] = 1, limite: int = LIMITE_PAGINA,
+                   ordenado: bool = False, avisar: bool = True, revalidar: bool = False):
+    # Devolve as ofertas à medida que as páginas chegam (max_paginas=None percorre todas).
+    paginas = iterar_paginas_itjobs(max_paginas, limite, ordenado, avisar, revalidar=revalidar)
+    try:
+        for dados in paginas:
+            yield from dados.get("results", [])
+    finally:
+        paginas.close()
+
+
+def iterar_paginas_itjobs(max_paginas: Optional[int] = 1, limite: int = LIMITE_PAGINA,
+                          ordenado: bool = False, avisar: bool = True, brutas: bool = False,
+                          revalidar: bool = False):
+    # As páginas da lista à medida que chegam. Com brutas=True as páginas pedidas em paralelo vêm como
+    # os bytes da resposta, para serem descodificadas noutro processo (ver mapear_reduzir).
+    primeira = obter_pagina_itjobs(1, limite, revalidar)
+    resultados = primeira.get("results", [])
+    yield primeira
+
+    total = primeira.get("total")
+    if total is None:
+        # Sem total conhecido, percorre as páginas em série até uma vir incompleta.
+        pagina = 1
+        while len(resultados) == limite and (max_paginas is None or pagina < max_paginas):
+            pagina += 1
+            dados = obter_pagina_itjobs(pagina, limite, revalidar)
+            resultados = dados.get("results", [])
+            yield dados
+        return
+
+    n_paginas = math.ceil(total / limite)
+    if max_paginas is not None and n_paginas > max_paginas:
+        if avisar:
+            print(f"Aviso: apenas {max_paginas * limite} de {total} ofertas analisadas (use --max-pages ou --all).",
+                  file=sys.stderr)
+        n_paginas = max_paginas
+    if n_paginas <= 1:
+        return
+
+    pedidos = [pedido_pagina_itjobs(p, limite, revalidar) for p in range(2, n_paginas + 1)]
+    paginas = iterar_em_paralelo(pedidos, ordenado)
+    try:
+        for _, resp in paginas:
+            if isinstance(resp, Exception):
+                raise resp
+            resp.raise_for_status()
+            yield resp.content if brutas else json_resposta(resp)
+    finally:
+        paginas.close()
+
+
+def paginas_pedidas(max_pages: Optional[int], todas: bool) -> Optional[int]:
+    if todas:
+        return None
+    return max(max_pages or 1, 1)
+
+
+# Armazém local (SQLite) das ofertas, sincronizado com o comando sync.
+
+ARMAZEM_DB = os.path.join(DADOS_DIR, "jobs.sqlite3")
+
+
+def abrir_armazem() -> sqlite3.Connection:
+    import sqlite3
+
+    os.makedirs(DADOS_DIR, exist_ok=True)
+    con = sqlite3.connect(ARMAZEM_DB)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            published_at TEXT,
+            updated_at TEXT,
+            data TEXT NOT NULL,
+            regime TEXT
+        )
+    """)
+    if "regime" not in {row[1] for row in con.execute("PRAGMA table_info(jobs)")}:
+        con.execute("ALTER TABLE jobs ADD COLUMN regime TEXT")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_published ON jobs (published_at)")
+    con.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT)")
+    con.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+            titulo, corpo, empresa, locais, tipos, regime,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS empresas_teamlyzer (
+            slug TEXT PRIMARY KEY,
+            href TEXT NOT NULL,
+            nome TEXT,
+            chave TEXT
+        )
+    """)
+    # Um facto por job × zona × tipo: as estatísticas contam jobs distintos (COUNT(DISTINCT id)).
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS factos_estatisticas (
+            id INTEGER NOT NULL,
+            zona TEXT NOT NULL,
+            zona_norm TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            tipo_norm TEXT NOT NULL,
+            empresa TEXT NOT NULL,
+            dia TEXT NOT NULL,
+            unico INTEGER NOT NULL,
+            PRIMARY KEY (id, zona, tipo)
+        ) WITHOUT ROWID
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_factos_dia ON factos_estatisticas (dia)")
+    con.execute("CREATE TABLE IF NOT EXISTS cargos_teamlyzer (valor TEXT PRIMARY KEY, texto TEXT NOT NULL)")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS tags_cargo (
+            cargo TEXT NOT NULL,
+            skill TEXT NOT NULL,
+            contagem INTEGER NOT NULL,
+            PRIMARY KEY (cargo, skill)
+        )
+    """)
+    # Ocorrências das skills por job (calculadas uma vez, à entrada) e os totais diários que delas derivam.
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS skills_job (
+            id INTEGER NOT NULL,
+            dia TEXT NOT NULL,
+            skill TEXT NOT NULL,
+            ocorrencias INTEGER NOT NULL,
+            PRIMARY KEY (id, skill)
+        )
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_skills_job_dia ON skills_job (dia)")
+    # Salário normalizado (bruto mensal) de cada job e, por empresa, o intervalo do Teamlyzer.
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS salarios_job (
+            id INTEGER PRIMARY KEY,
+            chave TEXT NOT NULL,
+            empresa TEXT NOT NULL,
+            empresa_norm TEXT NOT NULL,
+            slug TEXT,
+            minimo REAL,
+            maximo REAL,
+            medio REAL,
+            periodo TEXT
+        )
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_salarios_medio ON salarios_job (medio)")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS salarios_empresa (
+            chave TEXT PRIMARY KEY,
+            texto TEXT,
+            minimo REAL,
+            maximo REAL,
+            medio REAL,
+            obtido_em REAL NOT NULL
+        )
+    """)
+    # Assinatura do conteúdo de cada job (MinHash, ver minhash) e o grupo de anúncios repetidos a que pertence
+    # (o id mais baixo do grupo); as faixas da assinatura têm tabela própria e as alterações de conteúdo
+    # ficam registadas à parte.
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS conteudo_job (
+            id INTEGER PRIMARY KEY,
+            empresa TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            assinatura BLOB NOT NULL,
+            grupo INTEGER NOT NULL,
+            versoes INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    # Uma só árvore (a chave primária serve de índice às consultas por faixa); as faixas de um job que muda
+    # de texto são apagadas a partir da assinatura anterior.
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS faixas_conteudo (
+            empresa TEXT NOT NULL,
+            faixa INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            PRIMARY KEY (empresa, faixa, id)
+        ) WITHOUT ROWID
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_conteudo_grupo ON conteudo_job (grupo)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_conteudo_hash ON conteudo_job (empresa, hash)")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS alteracoes_job (
+            id INTEGER NOT NULL,
+            em TEXT NOT NULL,
+            hash_anterior TEXT NOT NULL,
+            hash_novo TEXT NOT NULL
+        )
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_alteracoes_id ON alteracoes_job (id)")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS skills_diarias (
+            dia TEXT NOT NULL,
+            skill TEXT NOT NULL,
+            ocorrencias INTEGER NOT NULL,
+            PRIMARY KEY (dia, skill)
+        )
+    """)
+    return con
+
+
+def data_alteracao(job: dict) -> str:
+    return max(job.get("updatedAt") or "", job.get("publishedAt") or "")
+
+
+def documento_indice(job: dict, regime: str) -> tuple:
+    # Texto já normalizado (sem acentos, minúsculas) de cada coluna do índice de pesquisa.
+    empresa, _ = nome_e_slug_empresa(job)
+    return (
+        job["id"],
+        normalizar_texto(job.get("title")),
+        normalizar_texto(texto_de_html(job.get("body"))),
+        normalizar_texto(empresa),
+        normalizar_texto(" ; ".join(loc.get("name", "") for loc in job.get("locations", []))),
+        normalizar_texto(" ; ".join(t.get("name", "") for t in job.get("types", []))),
+        normalizar_texto(regime),
+    )
+
+
+def indexar_ofertas(con: sqlite3.Connection, ofertas: list, regimes: dict) -> list:
+    documentos = [documento_indice(job, regimes[job["id"]]) for job in ofertas]
+    con.executemany("DELETE FROM jobs_fts WHERE rowid = ?", [(job["id"],) for job in ofertas])
+    con.executemany(
+        "INSERT INTO jobs_fts (rowid, titulo, corpo, empresa, locais, tipos, regime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        documentos,
+    )
+    return documentos
+
+
+@medido
+def reindexar_armazem(con: sqlite3.Connection):
+    con.execute("DELETE FROM jobs_fts")
+    ofertas, regimes = [], {}
+    for data, regime in con.execute("SELECT data, regime FROM jobs"):
+        job = carregar_json(data)
+        ofertas.append(job)
+        regimes[job["id"]] = regime or regime_job(job)
+    indexar_ofertas(con, ofertas, regimes)
+
+
+@medido
+def guardar_ofertas(con: sqlite3.Connection, ofertas, regimes: Optional[dict] = None) -> int:
+    # O regime é calculado à entrada (ou recebido já classificado) e fica persistido com o job.
+    ofertas = [job for job in ofertas if job.get("id") is not None]
+    regimes = regimes or {}
+    regimes = {job["id"]: regimes.get(job["id"]) or regime_job(job) for job in ofertas}
+    linhas = [
+        (job["id"], job.get("publishedAt"), job.get("updatedAt"), json.dumps(job, ensure_ascii=False),
+         regimes[job["id"]])
+        for job in ofertas
+    ]
+    con.executemany(
+        "INSERT INTO jobs (id, published_at, updated_at, data, regime) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET published_at = excluded.published_at, "
+        "updated_at = excluded.updated_at, data = excluded.data, regime = excluded.regime",
+        linhas,
+    )
+    documentos = indexar_ofertas(con, ofertas, regimes)
+    atualizar_skills_jobs(con, ofertas)
+    atualizar_salarios_jobs(con, ofertas)
+    # O texto normalizado do índice serve também para detetar anúncios repetidos.
+    atualizar_conteudos(con, [(doc[0], doc[3], doc[1] + " " + doc[2]) for doc in documentos],
+                        {job["id"]: data_alteracao(job) for job in ofertas})
+    return len(linhas)
+
+
+def ler_meta(con: sqlite3.Connection, chave: str) -> Optional[str]:
+    row = con.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+    return row[0] if row else None
+
+
+def escrever_meta(con: sqlite3.Connection, chave: str, valor: str):
+    con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, valor))
+
+
+def iterar_ofertas_locais(mais_recentes: bool = False, dia_de: Optional[str] = None,
+                          dia_ate: Optional[str] = None):
+    # Com dia_de/dia_ate só são lidas (e descodificadas) as ofertas publicadas nesse intervalo.
+    if not os.path.exists(ARMAZEM_DB):
+        print("Armazém local vazio. Corra primeiro: python jobscli.py sync", file=sys.stderr)
+        return
+    con = abrir_armazem()
+    try:
+        ordem = "published_at DESC, id DESC" if mais_recentes else "id"
+        filtro, params = "", ()
+        if dia_de or dia_ate:
+            filtro, params = "WHERE substr(published_at, 1, 10) BETWEEN ? AND ? ", (dia_de or "", dia_ate or "9999")
+        for (data,) in con.execute(f"SELECT data FROM jobs {filtro}ORDER BY {ordem}", params):
+            yield carregar_json(data)
+    finally:
+        con.close()
+
+
+def obter_oferta_local(job_id: int) -> Optional[dict]:
+    if not os.path.exists(ARMAZEM_DB):
+        return None
+    con = abrir_armazem()
+    try:
+        row = con.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        con.close()
+    return carregar_json(row[0]) if row else None
+
+
+LOTE_IDS = 500
+
+
+def ofertas_locais_por_id(ids: list):
+    # Os dicts completos de uma lista de ids, pela mesma ordem, lidos em lotes.
+    con = abrir_armazem()
+    try:
+        for i in range(0, len(ids), LOTE_IDS):
+            lote = ids[i:i + LOTE_IDS]
+            marcas = ", ".join("?" * len(lote))
+            dados = dict(con.execute(f"SELECT id, data FROM jobs WHERE id IN ({marcas})", lote))
+            for job_id in lote:
+                if job_id in dados:
+                    yield carregar_json(dados[job_id])
+    finally:
+        con.close()
+
+
+# Representação compacta das ofertas em memória: só os campos que os filtros usam, com as strings
+# repetidas (empresas, localidades, tipos) partilhadas entre jobs; o corpo HTML fica no armazém.
+
+_tuplos_partilhados = {}
+
+
+def tuplo_partilhado(nomes) -> tuple:
+    tuplo = tuple(sys.intern(nome) for nome in nomes)
+    return _tuplos_partilhados.setdefault(tuplo, tuplo)
+
+
+class Job:
+    # Só o que o filtro de part-time do catálogo compacto lê; o resto (corpo incluído) fica no armazém.
+    __slots__ = ("id", "empresa", "locais", "tipos")
 
-            descricao = BeautifulSoup(job.get("body", "") or "", "html.parser").get_text(" ", strip=True) or "N/A"
+    def __init__(self, id: int, empresa: str, locais: tuple, tipos: tuple):
+        self.id = id
+        self.empresa = empresa
+        self.locais = locais
+        self.tipos = tipos
+
+    def __repr__(self) -> str:
+        return f"Job({self.id}, {self.empresa!r}, {self.locais!r})"
+
+
+def job_compacto(job: dict) -> Job:
+    empresa, _ = nome_e_slug_empresa(job)
+    return Job(
+        job["id"],
+        sys.intern(empresa or ""),
+        tuplo_partilhado(loc.get("name") or "" for loc in job.get("locations", [])),
+        tuplo_partilhado(t.get("name") or "" for t in job.get("types", [])),
+    )
+
+
+_catalogo_local = None
+_chave_catalogo = None
+
+
+def catalogo_local() -> list:
+    # Todos os jobs do armazém em forma compacta (por id); só é reconstruído quando o ficheiro muda,
+    # o que no serve/serve-http poupa a releitura do armazém em cada pedido.
+    global _catalogo_local, _chave_catalogo
+    if not os.path.exists(ARMAZEM_DB):
+        print("Armazém local vazio. Corra primeiro: python jobscli.py sync", file=sys.stderr)
+        return []
+    estado = os.stat(ARMAZEM_DB)
+    chave = (ARMAZEM_DB, estado.st_mtime_ns, estado.st_size)
+    if chave != _chave_catalogo:
+        con = abrir_armazem()
+        try:
+            _catalogo_local = [job_compacto(carregar_json(data)) for (data,) in con.execute("SELECT data FROM jobs ORDER BY id")]
+        finally:
+            con.close()
+        _chave_catalogo = chave
+    return _catalogo_local
+
+
+# Índice de texto (FTS5): consultas booleanas, frases (posicionais) e prefixos, ordenadas por bm25.
+
+COLUNAS_INDICE = ("titulo", "corpo", "empresa", "locais", "tipos", "regime")
+PESOS_INDICE = (10.0, 1.0, 5.0, 3.0, 2.0, 2.0)
+_RE_TOKENS_CONSULTA = re.compile(r'"[^"]*"\*?|[()]|[^\s()"]+')
+
+
+def termo_fts(texto: str, prefixo: bool = False) -> str:
+    # Uma palavra ou frase normalizada; com mais de um token vira frase (tokens consecutivos).
+    tokens = re.findall(r"[a-z0-9]+", normalizar_texto(texto))
+    if not tokens:
+        return ""
+    termo = tokens[0] if len(tokens) == 1 else '"' + " ".join(tokens) + '"'
+    return termo + ("*" if prefixo else "")
+
+
+def consulta_fts(texto: str) -> str:
+    # Aceita AND/OR/NOT, parênteses, "frases", prefixos (python*) e colunas (empresa:acme).
+    partes = []
+    for token in _RE_TOKENS_CONSULTA.findall(texto):
+        if token in ("AND", "OR", "NOT", "(", ")"):
+            # Em FTS5 o NOT é binário: "a AND NOT b" escreve-se "a NOT b".
+            if token == "NOT" and partes and partes[-1] == "AND":
+                partes.pop()
+            partes.append(token)
+            continue
+        coluna = ""
+        if ":" in token and not token.startswith('"'):
+            nome, _, token = token.partition(":")
+            if nome.lower() in COLUNAS_INDICE:
+                coluna = nome.lower() + " : "
+            if not token:
+                partes.append(coluna.strip())
+                continue
+        prefixo = token.endswith("*")
+        termo = termo_fts(token.rstrip("*").strip('"'), prefixo)
+        if termo:
+            partes.append(coluna + termo)
+    return " ".join(partes)
+
+
+def filtro_coluna(coluna: str, valor: str) -> str:
+    termo = termo_fts(valor, prefixo=True)
+    return f"{coluna} : {termo}" if termo else ""
+
+
+def procurar_indice(consulta: str, limite: int, por_relevancia: bool = True):
+    con = abrir_armazem()
+    try:
+        ordem = f"bm25(jobs_fts, {', '.join(map(str, PESOS_INDICE))})" if por_relevancia else "j.published_at DESC"
+        sql = (
+            "SELECT j.data FROM jobs_fts JOIN jobs j ON j.id = jobs_fts.rowid "
+            f"WHERE jobs_fts MATCH ? ORDER BY {ordem} LIMIT ?"
+        )
+        for (data,) in con.execute(sql, (consulta, limite)).fetchall():
+            yield carregar_json(data)
+    finally:
+        con.close()
+
+
+def obter_regime_local(job_id: int) -> Optional[str]:
+    if not os.path.exists(ARMAZEM_DB):
+        return None
+    con = abrir_armazem()
+    try:
+        row = con.execute("SELECT regime FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        con.close()
+    return row[0] if row else None
+
+
+def obter_ofertas(offline: bool, max_pages: Optional[int] = None, todas: bool = False):
+    if offline:
+        return iterar_ofertas_locais()
+    return iterar_ofertas(paginas_pedidas(max_pages, todas))
+
+
+# Exportação em streaming: as ofertas passam uma a uma pelo stdout e pelos ficheiros pedidos.
+
+CAMPOS_EXPORTACAO = ["titulo", "empresa", "descricao", "data_publicacao", "salario", "localizacao"]
+FORMATOS_EXPORTACAO = ("csv", "jsonl", "parquet")
+LOTE_PARQUET = 1000
+
+_RE_TAGS = re.compile(r"<[^>]*>")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def texto_de_html(conteudo: Optional[str]) -> str:
+    # Remove as tags sem construir a árvore HTML (muito mais leve que o BeautifulSoup por linha).
+    return _RE_ESPACOS.sub(" ", unescape(_RE_TAGS.sub(" ", conteudo or ""))).strip()
+
+
+def linha_oferta(job: dict) -> dict:
+    empresa = job.get("company")
+    if isinstance(empresa, dict):
+        empresa = empresa.get("name", "N/A")
+    else:
+        empresa = empresa or "N/A"
+
+    locais = [loc.get("name", "").strip() for loc in job.get("locations", []) if loc.get("name")]
+
+    return {
+        "titulo": job.get("title", "N/A"),
+        "empresa": empresa,
+        "descricao": texto_de_html(job.get("body")) or "N/A",
+        "data_publicacao": job.get("publishedAt", "N/A"),
+        "salario": job.get("wage") or "N/A",
+        "localizacao": ", ".join(locais) if locais else "N/A",
+    }
+
+
+def formato_de(ficheiro: str, formato: Optional[str] = None) -> str:
+    # Sem --format, o formato vem da extensão; uma extensão desconhecida é um erro (não cai em CSV).
+    if formato:
+        if formato.lower() not in FORMATOS_EXPORTACAO:
+            raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS_EXPORTACAO)})")
+        return formato.lower()
+    extensao = os.path.splitext(ficheiro)[1].lstrip(".").lower()
+    if extensao not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Extensão desconhecida em --output: '{ficheiro}' "
+                         f"(use .{', .'.join(FORMATOS_EXPORTACAO)} ou indique --format)")
+    return extensao
+
+
+class EscritorExportacao:
+    def __init__(self, ficheiro: str, formato: str = "csv"):
+        if formato not in FORMATOS_EXPORTACAO:
+            raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS_EXPORTACAO)})")
+        self.ficheiro = ficheiro
+        self.formato = formato
+        self.lote = []
+        self.parquet = None
+
+        if formato == "parquet":
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ValueError("O formato parquet requer o pacote pyarrow (pip install pyarrow).")
+            self.pa = pyarrow
+            esquema = pyarrow.schema([(campo, pyarrow.string()) for campo in CAMPOS_EXPORTACAO])
+            self.parquet = pyarrow.parquet.ParquetWriter(ficheiro, esquema)
+        else:
+            self.f = open(ficheiro, "w", newline="", encoding="utf-8")
+            if formato == "csv":
+                self.writer = csv.DictWriter(self.f, fieldnames=CAMPOS_EXPORTACAO)
+                self.writer.writeheader()
+
+    def escrever(self, linha: dict):
+        if self.formato == "csv":
+            self.writer.writerow(linha)
+        elif self.formato == "jsonl":
+            self.f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+        else:
+            self.lote.append(linha)
+            if len(self.lote) >= LOTE_PARQUET:
+                self.descarregar()
+
+    def descarregar(self):
+        if self.lote:
+            colunas = {campo: [str(linha[campo]) for linha in self.lote] for campo in CAMPOS_EXPORTACAO}
+            self.parquet.write_table(self.pa.table(colunas, schema=self.parquet.schema))
+            self.lote = []
+
+    def fechar(self):
+        if self.parquet is not None:
+            self.descarregar()
+            self.parquet.close()
+        else:
+            self.f.close()
+
+    def mensagem(self) -> str:
+        if self.formato == "csv":
+            return f"CSV '{self.ficheiro}' criado com sucesso!"
+        return f"Ficheiro {self.formato.upper()} '{self.ficheiro}' criado com sucesso!"
+
+
+def exportacoes_pedidas(csv_file: Optional[str], output: Optional[str], formato: Optional[str]) -> list:
+    exportacoes = []
+    if csv_file:
+        exportacoes.append((csv_file, "csv"))
+    if output:
+        exportacoes.append((output, formato_de(output, formato)))
+    return exportacoes
 
 
-            salario = job.get("wage") or "N/A"
+def emitir_ofertas(ofertas, jsonl: bool = False, exportacoes=()) -> int:
+    # Um único passo sobre o gerador: JSON no stdout (array indentado ou JSONL) e linhas para cada ficheiro.
+    escritores = [EscritorExportacao(ficheiro, formato) for ficheiro, formato in exportacoes]
+    n = 0
+    try:
+        for job in ofertas:
+            if jsonl:
+                sys.stdout.write(json.dumps(job, ensure_ascii=False) + "\n")
+            else:
+                sys.stdout.write("[\n" if n == 0 else ",\n")
+                sys.stdout.write(indent(json.dumps(job, indent=2, ensure_ascii=False), "  "))
+            if escritores:
+                linha = linha_oferta(job)
+                for escritor in escritores:
+                    escritor.escrever(linha)
+            n += 1
+    finally:
+        if not jsonl:
+            sys.stdout.write("\n]\n" if n else "[]\n")
+        for escritor in escritores:
+            escritor.fechar()
+
+    for escritor in escritores:
+        print(escritor.mensagem())
+    return n
 
-            locais = [loc.get("name", "").strip() for loc in job.get("locations", []) if loc.get("name")]
-            localizacao = ", ".join(locais) if locais else "N/A"
 
-            writer.writerow({
-                "titulo": job.get("title", "N/A"),
-                "empresa": empresa,
-                "descricao": descricao,
-                "data_publicacao": job.get("publishedAt", "N/A"),
-                "salario": salario,
-                "localizacao": localizacao,
-            })
+def exportar_csv(ofertas, ficheiro):
+    escritor = EscritorExportacao(ficheiro, "csv")
+    try:
+        for job in ofertas:
+            escritor.escrever(linha_oferta(job))
+    finally:
+        escritor.fechar()
 
-    print(f"CSV '{ficheiro}' criado com sucesso!")
+    print(escritor.mensagem())
 
 
 ### TP1 ###
@@ -71,100 +1377,194 @@ def exportar_csv(ofertas, ficheiro):
 #a) Listar os N trabalhos mais recentes publicados no itjobs.pt.
 
 @app.command()
-def top(n: int, csv_file: Optional[str] = typer.Option(None, "--csv")):
+def top(
+    n: int,
+    csv_file: Optional[str] = typer.Option(None, "--csv"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Exporta para ficheiro (csv, jsonl ou parquet, pela extensão)."),
+    formato: Optional[str] = typer.Option(None, "--format", help="Força o formato do --output (csv, jsonl, parquet)."),
+    jsonl: bool = typer.Option(False, "--jsonl", help="Escreve no stdout um job JSON por linha."),
+    offline: bool = typer.Option(False, "--offline", help="Responde a partir do armazém local (ver sync)."),
+):
+
+    import requests
 
     if n <= 0:
             print("O número de ofertas tem de ser maior que 0.")
             return
     
-    params = {"api_key": API_KEY,"limit": n}
-
-    resp = requests.get(API_LIST_URL, headers=headers, params=params)
-    if resp.status_code != 200:
-        print("Erro no pedido:", resp.status_code)
-        return
-
-    resultados = resp.json().get("results", [])
-    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    limite = min(n, LIMITE_PAGINA)
+    if offline:
+        fonte = iterar_ofertas_locais(mais_recentes=True)
+    else:
+        fonte = iterar_ofertas(math.ceil(n / limite), limite, ordenado=True, avisar=False)
 
-    if csv_file:
-        exportar_csv(resultados, csv_file)
+    try:
+        emitir_ofertas(islice(fonte, n), jsonl, exportacoes_pedidas(csv_file, output, formato))
+    except requests.RequestException as e:
+        print(f"Erro ao aceder à API do itjobs.pt: {e}")
+    except ValueError as e:
+        print(e)
+    finally:
+        fonte.close()
 
 #b) Listar trabalhos do tipo PART-TIME publicados por uma empresa numa localidade.
 
 @app.command()
-def search(localidade: str, empresa: str, n: int, csv_file: Optional[str] = typer.Option(None, "--csv")):
+def search(
+    localidade: str,
+    empresa: str,
+    n: int,
+    csv_file: Optional[str] = typer.Option(None, "--csv"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Exporta para ficheiro (csv, jsonl ou parquet, pela extensão)."),
+    formato: Optional[str] = typer.Option(None, "--format", help="Força o formato do --output (csv, jsonl, parquet)."),
+    jsonl: bool = typer.Option(False, "--jsonl", help="Escreve no stdout um job JSON por linha."),
+    max_pages: Optional[int] = typer.Option(None, "--max-pages", help="Número máximo de páginas a obter (por omissão 1)."),
+    todas: bool = typer.Option(False, "--all", help="Percorre todas as páginas do itjobs.pt."),
+    offline: bool = typer.Option(False, "--offline", help="Responde a partir do armazém local (ver sync)."),
+    query: Optional[str] = typer.Option(None, "--query", "-q", help='Texto livre/booleano no índice local (ex: \'python AND NOT "java"\').'),
+    regime: Optional[str] = typer.Option(None, "--regime", help="Filtra por regime (remoto, híbrido, presencial)."),
+    any_type: bool = typer.Option(False, "--any-type", help="Não restringe a ofertas PART-TIME."),
+):
+    import requests
+
     if n <= 0:
         print("O número de ofertas tem de ser maior que 0.")
         return
 
-    params = {"api_key": API_KEY, "limit": 200}
-
-    resp = requests.get(API_LIST_URL, headers=headers, params=params)
-    if resp.status_code != 200:
-        print("Erro no pedido:", resp.status_code)
+    try:
+        exportacoes = exportacoes_pedidas(csv_file, output, formato)
+    except ValueError as e:
+        print(e)
         return
 
-    resultados = resp.json().get("results", [])
+    if query or regime or any_type:
+        if not offline:
+            print("--query, --regime e --any-type usam o índice local: corra sync e use --offline.")
+            return
+        search_indice(localidade, empresa, n, query, regime, any_type, jsonl, exportacoes)
+        return
 
-    loc_lower = localidade.lower()
-    emp_lower = empresa.lower()
+    if offline:
+        fonte = filtrados = part_time_locais(localidade, empresa, n)
+    else:
+        fonte = obter_ofertas(False, max_pages, todas)
+        filtrados = islice(filtrar_part_time(fonte, localidade, empresa), n)
+    try:
+        primeiro = next(filtrados, None)
+        if primeiro is None:
+            print("Não foram encontrados trabalhos PART-TIME para essa empresa/localidade.")
+            return
 
-    def is_part_time(job):
-        tipos = job.get("types", [])
-        return any(re.search(r"\bpart[- ]?time\b", t.get("name", ""), re.I) for t in tipos)
+        emitir_ofertas(chain([primeiro], filtrados), jsonl, exportacoes)
+    except requests.RequestException as e:
+        print(f"Erro ao aceder à API do itjobs.pt: {e}")
+    except ValueError as e:
+        print(e)
+    finally:
+        fonte.close()
 
-    filtrados = []
-    for job in resultados:
-        locais = job.get("locations", [])
-        nome_emp = job.get("company", {}).get("name", "")
+_RE_PART_TIME = re.compile(r"\bpart[- ]?time\b", re.I)
 
-        tem_localidade = any(loc_lower in loc.get("name", "").lower() for loc in locais)
-        tem_empresa = emp_lower in nome_emp.lower()
 
-        if tem_localidade and tem_empresa and is_part_time(job):
-            filtrados.append(job)
+def filtro_part_time(localidade: str, empresa: str, so_part_time: bool = True):
+    # Predicado sobre (empresa, locais, tipos); cada valor distinto só é testado uma vez (nos Jobs
+    # compactos os tuplos são partilhados, por isso a memória fica com poucas entradas).
+    loc_lower = localidade.lower()
+    emp_lower = empresa.lower()
+    empresa_ok, locais_ok, tipos_ok = {}, {}, {}
+
+    def aceita(nome_empresa: str, locais: tuple, tipos: tuple) -> bool:
+        ok = empresa_ok.get(nome_empresa)
+        if ok is None:
+            ok = empresa_ok[nome_empresa] = emp_lower in nome_empresa.lower()
+        if not ok:
+            return False
+        ok = locais_ok.get(locais)
+        if ok is None:
+            ok = locais_ok[locais] = any(loc_lower in loc.lower() for loc in locais)
+        if not ok:
+            return False
+        ok = tipos_ok.get(tipos)
+        if ok is None:
+            ok = tipos_ok[tipos] = not so_part_time or any(_RE_PART_TIME.search(t) for t in tipos)
+        return ok
+
+    return aceita
+
+
+def filtrar_part_time(fonte, localidade: str, empresa: str):
+    aceita = filtro_part_time(localidade, empresa)
+    for job in fonte:
+        nome_empresa = nome_e_slug_empresa(job)[0] or ""
+        locais = tuple(loc.get("name") or "" for loc in job.get("locations", []))
+        tipos = tuple(t.get("name") or "" for t in job.get("types", []))
+        if aceita(nome_empresa, locais, tipos):
+            yield job
+
+
+def part_time_locais(localidade: str, empresa: str, n: int):
+    # O filtro corre sobre o catálogo compacto; só os n jobs escolhidos são lidos por inteiro.
+    aceita = filtro_part_time(localidade, empresa)
+    ids = [job.id for job in islice((j for j in catalogo_local() if aceita(j.empresa, j.locais, j.tipos)), n)]
+    yield from ofertas_locais_por_id(ids)
+
+
+def fonte_indice(localidade: str, empresa: str, n: int, query: Optional[str], regime: Optional[str],
+                 any_type: bool):
+    clausulas = [filtro_coluna("locais", localidade), filtro_coluna("empresa", empresa)]
+    if not any_type:
+        clausulas.append('tipos : ("part time" OR parttime)')
+    if regime:
+        clausulas.append(filtro_coluna("regime", regime).rstrip("*"))
+    if query:
+        clausulas.append(consulta_fts(query))
+    clausulas = [c for c in clausulas if c]
+
+    if not clausulas:
+        yield from islice(iterar_ofertas_locais(mais_recentes=True), n)
+    else:
+        yield from procurar_indice(" AND ".join(f"({c})" for c in clausulas), n, por_relevancia=bool(query))
 
-    filtrados = filtrados[:n]
 
-    if not filtrados:
-        print("Não foram encontrados trabalhos PART-TIME para essa empresa/localidade.")
-        return
+def search_indice(localidade: str, empresa: str, n: int, query: Optional[str], regime: Optional[str],
+                  any_type: bool, jsonl: bool, exportacoes: list):
+    import sqlite3
 
-    print(json.dumps(filtrados, indent=2, ensure_ascii=False))
+    fonte = fonte_indice(localidade, empresa, n, query, regime, any_type)
 
-    if csv_file:
-        exportar_csv(filtrados, csv_file)
+    try:
+        primeiro = next(fonte, None)
+        if primeiro is None:
+            print("Não foram encontrados trabalhos para essa pesquisa.")
+            return
+        emitir_ofertas(chain([primeiro], fonte), jsonl, exportacoes)
+    except sqlite3.OperationalError as e:
+        print(f"Consulta inválida: {e}")
+    except ValueError as e:
+        print(e)
+    finally:
+        fonte.close()
 
 # c) Extrair o regime de trabalho de um determinado job id.
 
+_RE_REMOTO = re.compile(r"remoto|remote|teletrabalho")
+_RE_HIBRIDO = re.compile(r"híbrido|hibrido|hybrid")
+_RE_PRESENCIAL = re.compile(r"presencial|on[- ]?site|onsite")
+
+
 def detectar_regime(texto: str) -> str:
     t = texto.lower()
-    if re.search(r"remoto|remote|teletrabalho", t):
+    if _RE_REMOTO.search(t):
         return "remoto"
-    if re.search(r"híbrido|hibrido|hybrid", t):
+    if _RE_HIBRIDO.search(t):
         return "híbrido"
-    if re.search(r"presencial|on[- ]?site|onsite", t):
+    if _RE_PRESENCIAL.search(t):
         return "presencial"
     return "outro"
 
 
-@app.command()
-def type(job_id: int):
-    params = {"api_key": API_KEY, "id": job_id}
-
-    resp = requests.get(API_GET_URL, headers=headers, params=params)
-    if resp.status_code != 200:
-        print("Erro no pedido:", resp.status_code)
-        return
-
-    job = resp.json()
-
-    if isinstance(job, dict) and "error" in job:
-        print("Erro da API:", job["error"].get("message", "Erro desconhecido"))
-        return
-
-    texto = job.get("title", "") + " " + job.get("body", "")
+def regime_job(job: dict) -> str:
+    texto = (job.get("title") or "") + " " + (job.get("body") or "")
     regime = detectar_regime(texto)
 
     if regime == "outro":
@@ -176,134 +1576,776 @@ def type(job_id: int):
         elif allow_remote is False and locations:
             regime = "presencial"
 
-    print(regime)
- 
-# d) Contar ocorrências de skills nas descrições entre duas datas (YYYY-MM-DD).
+    return regime
 
-@app.command()
-def skills(data_inicial: str, data_final: str):
-    try:
-        di, df = map(datetime.fromisoformat, (data_inicial, data_final))
-    except ValueError:
-        print("Datas inválidas. Usa o formato YYYY-MM-DD.")
-        return
 
-    if di > df:
-        print("A data inicial tem de ser anterior ou igual à data final.")
-        return
+def regime_de_campos(campos: tuple) -> str:
+    titulo, corpo, allow_remote, tem_locais = campos
+    return regime_job({
+        "title": titulo,
+        "body": corpo,
+        "allowRemote": allow_remote,
+        "locations": [None] if tem_locais else [],
+    })
 
-    params = {"api_key": API_KEY, "limit": 200}
-    resp = requests.get(API_LIST_URL, headers=headers, params=params)
-    if resp.status_code != 200:
-        print("Erro no pedido:", resp.status_code)
-        return
 
-    resultados = resp.json().get("results", [])
+def classificar_textos(lote: list) -> list:
+    # Corre nos processos do pool: recebe só os campos necessários para reduzir o custo de serialização.
+    return [regime_de_campos(campos) for campos in lote]
 
-    lista_skills = ["python", "java", "javascript", "sql", "docker"]
-    contagens = dict.fromkeys(lista_skills, 0)
 
-    for job in resultados:
-        pub_str = job.get("publishedAt", "")[:10]
-        if not pub_str:
-            continue
+LOTE_CLASSIFICACAO = 500
+MINIMO_PARA_PROCESSOS = 2000
+
+
+@medido
+def classificar_ofertas(ofertas: list, workers: Optional[int] = None) -> dict:
+    from concurrent.futures import ProcessPoolExecutor
+
+    campos = [
+        (job.get("title"), job.get("body"), job.get("allowRemote"), bool(job.get("locations")))
+        for job in ofertas
+    ]
+    if len(campos) < MINIMO_PARA_PROCESSOS or workers == 1:
+        regimes = classificar_textos(campos)
+    else:
+        lotes = [campos[i:i + LOTE_CLASSIFICACAO] for i in range(0, len(campos), LOTE_CLASSIFICACAO)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            regimes = [regime for resultado in pool.map(classificar_textos, lotes) for regime in resultado]
+    return {job["id"]: regime for job, regime in zip(ofertas, regimes)}
+
+
+def type_lote(ids: List[int], todos: bool, workers: Optional[int], reclassificar: bool):
+    import requests
+
+    inicio = time.perf_counter()
+    con = abrir_armazem()
+    if todos:
+        ids = [row[0] for row in con.execute("SELECT id FROM jobs ORDER BY id")]
+
+    # 1) O que já está classificado no armazém não volta a ser classificado.
+    regimes = {}
+    por_classificar = []
+    locais = set()
+    for i in range(0, len(ids), 900):
+        parte = ids[i:i + 900]
+        marcadores = ",".join("?" * len(parte))
+        for job_id, data, regime in con.execute(
+            f"SELECT id, data, regime FROM jobs WHERE id IN ({marcadores})", parte
+        ):
+            locais.add(job_id)
+            if regime and not reclassificar:
+                regimes[job_id] = regime
+            else:
+                por_classificar.append(carregar_json(data))
 
+    # 2) Os que faltam vêm da API em paralelo.
+    em_falta = [job_id for job_id in ids if job_id not in locais]
+    novos = []
+    for i, resp in iterar_em_paralelo([pedido_job_itjobs(job_id) for job_id in em_falta]):
         try:
-            data_pub = datetime.fromisoformat(pub_str)
-        except ValueError:
+            if isinstance(resp, Exception):
+                raise resp
+            resp.raise_for_status()
+            job = json_resposta(resp)
+        except requests.RequestException as e:
+            print(f"Job {em_falta[i]}: erro ao aceder à API do itjobs.pt: {e}", file=sys.stderr)
             continue
-
-        if not (di <= data_pub <= df):
+        if isinstance(job, dict) and "error" in job:
+            print(f"Job {em_falta[i]}: {job['error'].get('message', 'Erro desconhecido')}", file=sys.stderr)
             continue
+        novos.append(job)
 
-        texto = (job.get("title", "") + " " + job.get("body", "")).lower()
-        for s in lista_skills:
-            contagens[s] += len(re.findall(rf"\b{s}\b", texto))
+    # 3) Classificação em paralelo (processos) e persistência.
+    classificados = classificar_ofertas(por_classificar + novos, workers)
+    con.executemany(
+        "UPDATE jobs SET regime = ? WHERE id = ?",
+        [(classificados[job["id"]], job["id"]) for job in por_classificar],
+    )
+    guardar_ofertas(con, novos, classificados)
+    con.commit()
+    con.close()
+    regimes.update(classificados)
+
+    for job_id in ids:
+        if job_id in regimes:
+            print(json.dumps({"id": job_id, "regime": regimes[job_id]}, ensure_ascii=False))
+
+    duracao = time.perf_counter() - inicio
+    n = len(classificados)
+    print(
+        f"{len(regimes)} jobs ({n} classificados, {len(regimes) - n} já persistidos) em {duracao:.2f}s "
+        f"({len(regimes) / duracao if duracao else 0:.0f} jobs/s).",
+        file=sys.stderr,
+    )
 
-    ordenado = sorted(contagens.items(), key=itemgetter(1), reverse=True)
-    resultado_json = [{skill: count} for skill, count in ordenado if count > 0]
 
-    print(json.dumps(resultado_json, indent=2, ensure_ascii=False))
+@app.command()
+def type(
+    job_ids: Optional[List[int]] = typer.Argument(None, help="Job id (ou vários com --batch)."),
+    offline: bool = typer.Option(False, "--offline", help="Responde a partir do armazém local (ver sync)."),
+    batch: bool = typer.Option(False, "--batch", help="Classifica vários ids (ou todo o armazém) e persiste o regime."),
+    ficheiro: Optional[str] = typer.Option(None, "--file", "-f", help="Ficheiro com job ids para --batch ('-' para stdin)."),
+    todos: bool = typer.Option(False, "--all-stored", help="Com --batch, classifica todo o armazém local."),
+    workers: Optional[int] = typer.Option(None, "--workers", help="Processos para a classificação em lote."),
+    reclassificar: bool = typer.Option(False, "--reclassify", help="Ignora os regimes já persistidos."),
+):
+    if batch:
+        ids = ler_ids(job_ids, ficheiro)
+        if not ids and not todos:
+            print("Indique job ids, --file ou --all-stored.")
+            return
+        type_lote(ids, todos, workers, reclassificar)
+        return
 
+    if not job_ids or len(job_ids) != 1:
+        print("Indique um único job id (ou use --batch).")
+        return
+    job_id = job_ids[0]
 
-### TP2 ###
+    if offline:
+        regime = obter_regime_local(job_id)
+        if regime:
+            print(regime)
+            return
+        job = obter_oferta_local(job_id)
+        if job is None:
+            print(f"Job {job_id} não existe no armazém local.")
+            return
+    else:
+        params = {"api_key": API_KEY, "id": job_id}
 
-#a) Procura a empresa na página de ranking do Teamlyzer e devolve o URL da página da empresa (ou None).
+        resp = pedido_get(API_GET_URL, headers=headers, params=params)
+        if resp.status_code != 200:
+            print("Erro no pedido:", resp.status_code)
+            return
 
-def obter_html_teamlyzer(url: str) -> str:
-    resp = requests.get(
-        url,
-        headers={
-            **TEAMLYZER_HEADERS,
-            "Accept-Language": "pt-PT,pt;q=0.9,en;q=0.8",
-            "Referer": TEAMLYZER_BASE_URL + "/",
-        },
-        timeout=20,
-    )
-    resp.raise_for_status()
-    return resp.text
+        job = json_resposta(resp)
 
+    if isinstance(job, dict) and "error" in job:
+        print("Erro da API:", job["error"].get("message", "Erro desconhecido"))
+        return
 
-def encontrar_url_empresa_teamlyzer(nome_empresa: str, slug: Optional[str] = None) -> Optional[str]:
-    if slug:
-        candidate_url = f"{TEAMLYZER_BASE_URL}/companies/{slug}"
-        try:
-            resp = requests.get(candidate_url, headers=TEAMLYZER_HEADERS, timeout=10)
-            if resp.status_code == 200:
-                return candidate_url
-        except Exception:
-            pass
+    print(regime_job(job))
+ 
+# d) Contar ocorrências de skills nas descrições entre duas datas (YYYY-MM-DD).
 
+SKILLS_DEFAULT = ["python", "java", "javascript", "sql", "docker"]
+
+
+def regex_trie(palavras) -> str:
+    # Alternativa fatorizada por prefixos comuns, para o motor de regex não testar cada skill em cada posição.
+    trie = {}
+    for palavra in palavras:
+        no = trie
+        for ch in palavra:
+            no = no.setdefault(ch, {})
+        no[""] = True
+
+    def construir(no) -> str:
+        fim = "" in no
+        ramos = [re.escape(ch) + construir(filho) for ch, filho in sorted(no.items()) if ch]
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        if fim:
+            return "(?:" + corpo + ")?"
+        return corpo
+
+    return construir(trie)
+
+
+class ContadorSkills:
+    def __init__(self, sinonimos: dict):
+        # sinonimos: forma encontrada no texto -> skill canónica (ambas em minúsculas)
+        self.sinonimos = sinonimos
+        self.skills = list(dict.fromkeys(sinonimos.values()))
+        # Mesmas fronteiras que \b para skills que começam/acabam em letra, mas também aceita "c++" ou "c#".
+        self.padrao = re.compile(r"(?<!\w)(" + regex_trie(sinonimos) + r")(?!\w)")
+
+    def contar(self, texto: str, contagens: dict):
+        for m in self.padrao.finditer(texto):
+            skill = self.sinonimos[m.group(1)]
+            contagens[skill] = contagens.get(skill, 0) + 1
+
+
+_RE_COMENTARIO = re.compile(r"(?:^|\s)#")
+
+
+def carregar_skills(ficheiro: Optional[str]) -> ContadorSkills:
+    # Formato: uma skill por linha, opcionalmente com sinónimos ("javascript: js, ecmascript").
+    if not ficheiro:
+        return ContadorSkills({s: s for s in SKILLS_DEFAULT})
+
+    sinonimos = {}
+    with open(ficheiro, encoding="utf-8") as f:
+        for linha in f:
+            # "#" só abre comentário no início da linha ou depois de um espaço ("c#: csharp" é uma skill).
+            linha = _RE_COMENTARIO.split(linha, 1)[0].strip().lower()
+            if not linha:
+                continue
+            skill, _, resto = linha.partition(":")
+            skill = skill.strip()
+            sinonimos.setdefault(skill, skill)
+            for sinonimo in resto.split(","):
+                if sinonimo.strip():
+                    sinonimos[sinonimo.strip()] = skill
+    return ContadorSkills(sinonimos)
+
+
+def dia_publicacao(job: dict) -> Optional[str]:
+    pub_str = (job.get("publishedAt") or "")[:10]
+    if not pub_str:
+        return None
     try:
-        html = obter_html_teamlyzer(TEAMLYZER_RANKING_URL)
-    except Exception as e:
-        print(f"Não foi possível aceder ao ranking do Teamlyzer: {e}")
+        datetime.fromisoformat(pub_str)
+    except ValueError:
         return None
+    return pub_str
 
-    soup = BeautifulSoup(html, "html.parser")
-    alvo = (nome_empresa or "").strip().lower()
-    slug_norm = (slug or "").lower()
 
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        if not href.startswith("/companies/") or href == "/companies/ranking":
+def texto_skills(job: dict) -> str:
+    return ((job.get("title") or "") + " " + (job.get("body") or "")).lower()
+
+
+@medido
+def contar_skills_por_dia(ofertas, contador: ContadorSkills, di: datetime, df: datetime) -> dict:
+    # dia (YYYY-MM-DD) -> {skill: ocorrências}, a partir do texto das ofertas.
+    inicio, fim = di.strftime("%Y-%m-%d"), df.strftime("%Y-%m-%d")
+    por_dia = {}
+    for job in ofertas:
+        dia = dia_publicacao(job)
+        if dia is None or not (inicio <= dia <= fim):
             continue
+        contador.contar(texto_skills(job), por_dia.setdefault(dia, {}))
+    return por_dia
 
-        texto = link.get_text(" ", strip=True).lower()
 
-        if slug_norm and slug_norm in href.lower():
-            return TEAMLYZER_BASE_URL + href
-        if alvo and alvo in texto:
-            return TEAMLYZER_BASE_URL + href
+def totais_skills(por_dia: dict, skills: list, top: Optional[int] = None) -> list:
+    contagens = dict.fromkeys(skills, 0)
+    for contagens_dia in por_dia.values():
+        for skill, n in contagens_dia.items():
+            contagens[skill] = contagens.get(skill, 0) + n
 
-    return None
+    ordenado = sorted(contagens.items(), key=itemgetter(1), reverse=True)
+    resultado = [{skill: count} for skill, count in ordenado if count > 0]
+    return resultado[:top] if top else resultado
 
-def extrair_beneficios_teamlyzer(url_empresa: str) -> Optional[str]:
-    url_b = url_empresa.rstrip("/") + "/benefits-and-values"
-    try:
-        html = obter_html_teamlyzer(url_b)
-    except Exception:
-        return None
 
-    soup = BeautifulSoup(html, "html.parser")
+# Execução map-reduce: o catálogo é partido em fatias (intervalos de ids do armazém ou páginas da API),
+# cada fatia é agregada num processo do pool e os parciais são somados.
 
-    h_benef = soup.find("h2", class_="text-muted", string=re.compile(r"Benefícios e vantagens", re.I))
-    if not h_benef:
-        return None
+FATIAS_POR_WORKER = 4
 
-    beneficios = []
-    for node in h_benef.find_all_next():
-        if node.name == "h2" and "valores e cultura" in node.get_text(" ", strip=True).lower():
-            break
 
-        if node.name == "h3":
-            b = node.find("b")
-            if b:
-                t = b.get_text(" ", strip=True)
-                if t:
-                    beneficios.append(t)
+def mapear_reduzir(funcao, tarefas, juntar, workers: int, total: dict) -> dict:
+    # As tarefas são submetidas à medida que o gerador as produz (páginas ainda a chegar, por exemplo);
+    # os parciais são juntados pela ordem de submissão, tal como o caminho em série os percorreria.
+    from concurrent.futures import ProcessPoolExecutor
 
-        if node.name == "div" and "flex_details" in (node.get("class") or []):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pendentes = [pool.submit(funcao, *argumentos) for argumentos in tarefas]
+        for futuro in pendentes:
+            juntar(total, futuro.result())
+    return total
+
+
+def juntar_contagens(total: dict, parcial: dict):
+    for chave, n in parcial.items():
+        total[chave] = total.get(chave, 0) + n
+
+
+def juntar_por_dia(total: dict, parcial: dict):
+    for dia, contagens in parcial.items():
+        juntar_contagens(total.setdefault(dia, {}), contagens)
+
+
+def fatias_armazem(n: int) -> list:
+    # Intervalos de ids [de, até] com o mesmo número de ofertas cada um.
+    if not os.path.exists(ARMAZEM_DB):
+        print("Armazém local vazio. Corra primeiro: python jobscli.py sync", file=sys.stderr)
+        return []
+    con = abrir_armazem()
+    try:
+        ids = [job_id for (job_id,) in con.execute("SELECT id FROM jobs ORDER BY id")]
+    finally:
+        con.close()
+    tamanho = max(1, math.ceil(len(ids) / n))
+    return [(ids[i], ids[min(i + tamanho, len(ids)) - 1]) for i in range(0, len(ids), tamanho)]
+
+
+def ofertas_da_pagina(pagina) -> list:
+    # A primeira página (e as pedidas em série) já vêm descodificadas; as restantes vêm em bytes.
+    if isinstance(pagina, bytes):
+        pagina = carregar_json(pagina)
+    return pagina.get("results", [])
+
+
+def skills_de_fatia(db: str, id_de: int, id_ate: int, contador: ContadorSkills, di: datetime, df: datetime) -> dict:
+    # Corre nos processos do pool: cada um abre o armazém só para leitura e lê apenas a sua fatia.
+    import sqlite3
+
+    con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    try:
+        sql = ("SELECT data FROM jobs WHERE id BETWEEN ? AND ? "
+               "AND substr(published_at, 1, 10) BETWEEN ? AND ?")
+        linhas = con.execute(sql, (id_de, id_ate, di.strftime("%Y-%m-%d"), df.strftime("%Y-%m-%d")))
+        return contar_skills_por_dia((carregar_json(data) for (data,) in linhas), contador, di, df)
+    finally:
+        con.close()
+
+
+def skills_de_pagina(pagina, contador: ContadorSkills, di: datetime, df: datetime) -> dict:
+    return contar_skills_por_dia(ofertas_da_pagina(pagina), contador, di, df)
+
+
+@medido
+def skills_por_dia_paralelo(offline: bool, contador: ContadorSkills, di: datetime, df: datetime, workers: int,
+                            max_pages: Optional[int] = None, todas: bool = False) -> dict:
+    if offline:
+        funcao = skills_de_fatia
+        tarefas = ((ARMAZEM_DB, de, ate, contador, di, df) for de, ate in fatias_armazem(workers * FATIAS_POR_WORKER))
+    else:
+        funcao = skills_de_pagina
+        paginas = iterar_paginas_itjobs(paginas_pedidas(max_pages, todas), brutas=True)
+        tarefas = ((pagina, contador, di, df) for pagina in paginas)
+    return mapear_reduzir(funcao, tarefas, juntar_por_dia, workers, {})
+
+
+# Rollups diários das skills por omissão, mantidos pelo armazém local (guardar_ofertas/sync).
+
+_contador_rollups = None
+
+
+def contador_rollups() -> ContadorSkills:
+    global _contador_rollups
+    if _contador_rollups is None:
+        _contador_rollups = carregar_skills(None)
+    return _contador_rollups
+
+
+def assinatura_rollups() -> str:
+    # Muda quando muda a lista de skills por omissão (ou a regex que as conta): obriga a recalcular os rollups.
+    contador = contador_rollups()
+    return hashlib.sha1(json.dumps([sorted(contador.sinonimos.items()), contador.padrao.pattern]).encode("utf-8")).hexdigest()
+
+
+def reagregar_dias(con: sqlite3.Connection, dias):
+    dias = sorted(dias)
+    for i in range(0, len(dias), 900):
+        parte = dias[i:i + 900]
+        marcadores = ",".join("?" * len(parte))
+        con.execute(f"DELETE FROM skills_diarias WHERE dia IN ({marcadores})", parte)
+        con.execute(
+            "INSERT INTO skills_diarias (dia, skill, ocorrencias) "
+            f"SELECT dia, skill, SUM(ocorrencias) FROM skills_job WHERE dia IN ({marcadores}) GROUP BY dia, skill",
+            parte,
+        )
+
+
+def atualizar_skills_jobs(con: sqlite3.Connection, ofertas: list):
+    # Só os dias tocados por estes jobs (antes e depois da atualização) são reagregados.
+    contador = contador_rollups()
+    ids = [job["id"] for job in ofertas]
+    dias = set()
+    for i in range(0, len(ids), 900):
+        parte = ids[i:i + 900]
+        marcadores = ",".join("?" * len(parte))
+        dias.update(dia for (dia,) in con.execute(
+            f"SELECT DISTINCT dia FROM skills_job WHERE id IN ({marcadores})", parte))
+        con.execute(f"DELETE FROM skills_job WHERE id IN ({marcadores})", parte)
+
+    linhas = []
+    for job in ofertas:
+        dia = dia_publicacao(job)
+        if dia is None:
+            continue
+        contagens = {}
+        contador.contar(texto_skills(job), contagens)
+        linhas.extend((job["id"], dia, skill, n) for skill, n in contagens.items())
+        dias.add(dia)
+    con.executemany("INSERT INTO skills_job (id, dia, skill, ocorrencias) VALUES (?, ?, ?, ?)", linhas)
+    reagregar_dias(con, dias)
+
+
+@medido
+def reconstruir_rollups(con: sqlite3.Connection):
+    con.execute("DELETE FROM skills_job")
+    con.execute("DELETE FROM skills_diarias")
+    lote = []
+    for (data,) in con.execute("SELECT data FROM jobs"):
+        lote.append(carregar_json(data))
+        if len(lote) == 5000:
+            atualizar_skills_jobs(con, lote)
+            lote = []
+    atualizar_skills_jobs(con, lote)
+    escrever_meta(con, "skills_rollups", assinatura_rollups())
+
+
+def garantir_rollups(con: sqlite3.Connection):
+    # Armazéns antigos (ou com outra lista de skills por omissão) são recalculados uma vez.
+    if ler_meta(con, "skills_rollups") != assinatura_rollups():
+        reconstruir_rollups(con)
+        con.commit()
+
+
+@medido
+def skills_por_dia_local(di: datetime, df: datetime, unicas: bool = False) -> dict:
+    con = abrir_armazem()
+    try:
+        garantir_rollups(con)
+        if unicas:
+            # Os rollups contam todos os jobs: sem repetidos soma-se skills_job só dos representantes.
+            garantir_conteudos(con)
+            sql = ("SELECT s.dia, s.skill, SUM(s.ocorrencias) FROM skills_job s "
+                   "JOIN conteudo_job c ON c.id = s.id AND c.grupo = s.id "
+                   "WHERE s.dia BETWEEN ? AND ? GROUP BY s.dia, s.skill")
+        else:
+            sql = "SELECT dia, skill, ocorrencias FROM skills_diarias WHERE dia BETWEEN ? AND ?"
+        por_dia = {}
+        for dia, skill, n in con.execute(sql, (di.strftime("%Y-%m-%d"), df.strftime("%Y-%m-%d"))):
+            por_dia.setdefault(dia, {})[skill] = n
+        return por_dia
+    finally:
+        con.close()
+
+
+def inicio_periodo(dia: str, intervalo: str) -> str:
+    d = datetime.fromisoformat(dia)
+    if intervalo == "week":
+        d -= timedelta(days=d.weekday())
+    elif intervalo == "month":
+        d = d.replace(day=1)
+    return d.strftime("%Y-%m-%d")
+
+
+def proximo_periodo(inicio: str, intervalo: str) -> str:
+    d = datetime.fromisoformat(inicio)
+    if intervalo == "day":
+        d += timedelta(days=1)
+    elif intervalo == "week":
+        d += timedelta(weeks=1)
+    else:
+        d = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return d.strftime("%Y-%m-%d")
+
+
+def tendencia_skills(por_dia: dict, skills: list, intervalo: str) -> list:
+    # Uma entrada por período (dia, semana a começar à segunda ou mês), sem buracos entre o primeiro e o último.
+    periodos = {}
+    for dia, contagens in por_dia.items():
+        destino = periodos.setdefault(inicio_periodo(dia, intervalo), {})
+        for skill, n in contagens.items():
+            destino[skill] = destino.get(skill, 0) + n
+    if not periodos:
+        return []
+
+    serie = []
+    periodo, ultimo = min(periodos), max(periodos)
+    while periodo <= ultimo:
+        contagens = periodos.get(periodo, {})
+        serie.append({"periodo": periodo, **{skill: contagens.get(skill, 0) for skill in skills}})
+        periodo = proximo_periodo(periodo, intervalo)
+    return serie
+
+
+@app.command()
+def skills(
+    data_inicial: str,
+    data_final: str,
+    skills_file: Optional[str] = typer.Option(None, "--skills-file", help="Ficheiro com skills e sinónimos (skill: sin1, sin2)."),
+    max_pages: Optional[int] = typer.Option(None, "--max-pages", help="Número máximo de páginas a obter (por omissão 1)."),
+    todas: bool = typer.Option(False, "--all", help="Percorre todas as páginas do itjobs.pt."),
+    offline: bool = typer.Option(False, "--offline", help="Responde a partir do armazém local (ver sync)."),
+    interval: Optional[str] = typer.Option(None, "--interval", help="Série temporal por day, week ou month."),
+    top: Optional[int] = typer.Option(None, "--top", help="Só as N skills mais frequentes."),
+    unique: bool = typer.Option(False, "--unique", help="Conta uma só vez os anúncios repetidos (mesma empresa, texto quase igual)."),
+    workers: int = typer.Option(1, "--workers", help="Processos para contar as skills em paralelo, por fatias (1 = em série)."),
+):
+    import requests
+
+    if interval and interval not in FREQUENCIAS_INTERVALO:
+        print(f"Intervalo inválido: {interval} (use {', '.join(FREQUENCIAS_INTERVALO)}).")
+        return
+
+    try:
+        di, df = map(datetime.fromisoformat, (data_inicial, data_final))
+    except ValueError:
+        print("Datas inválidas. Usa o formato YYYY-MM-DD.")
+        return
+
+    if di > df:
+        print("A data inicial tem de ser anterior ou igual à data final.")
+        return
+
+    try:
+        contador = carregar_skills(skills_file)
+    except OSError as e:
+        print(f"Não foi possível ler o ficheiro de skills: {e}")
+        return
+
+    try:
+        if offline and not skills_file:
+            # Com as skills por omissão, o armazém já tem os totais por dia: não há texto a percorrer.
+            por_dia = skills_por_dia_local(di, df, unique)
+        elif workers > 1 and not unique:
+            por_dia = skills_por_dia_paralelo(offline, contador, di, df, workers, max_pages, todas)
+        else:
+            if offline:
+                ofertas = iterar_ofertas_locais(dia_de=di.strftime("%Y-%m-%d"), dia_ate=df.strftime("%Y-%m-%d"))
+            else:
+                ofertas = obter_ofertas(False, max_pages, todas)
+            por_dia = contar_skills_por_dia(sem_repetidos(ofertas) if unique else ofertas, contador, di, df)
+    except requests.RequestException as e:
+        print(f"Erro ao aceder à API do itjobs.pt: {e}")
+        return
+
+    resultado_json = totais_skills(por_dia, contador.skills, top)
+    if interval:
+        skills_serie = [skill for item in resultado_json for skill in item]
+        resultado_json = {
+            "intervalo": interval,
+            "skills": skills_serie,
+            "serie": tendencia_skills(por_dia, skills_serie, interval),
+        }
+
+    print(json.dumps(resultado_json, indent=2, ensure_ascii=False))
+
+
+### TP2 ###
+
+#a) Procura a empresa na página de ranking do Teamlyzer e devolve o URL da página da empresa (ou None).
+
+def pedido_teamlyzer(url: str) -> tuple:
+    cabecalhos = {
+        **TEAMLYZER_HEADERS,
+        "Accept-Language": "pt-PT,pt;q=0.9,en;q=0.8",
+        "Referer": TEAMLYZER_BASE_URL + "/",
+    }
+    return url, None, cabecalhos, 20
+
+
+@medido
+def obter_html_teamlyzer(url: str) -> str:
+    resp = pedido_get(*pedido_teamlyzer(url))
+    resp.raise_for_status()
+    return resp.text
+
+
+# Camada de scraping: parser mais rápido quando existe (lxml), parsing parcial e memo dos registos extraídos.
+
+def sopa(html: str, apenas: Optional[bs4.SoupStrainer] = None) -> bs4.BeautifulSoup:
+    import bs4
+
+    with Fase("BeautifulSoup", "parse", parser=PARSER_HTML, bytes=len(html), parcial=apenas is not None):
+        return bs4.BeautifulSoup(html, PARSER_HTML, parse_only=apenas)
+
+
+def extrair_memorizado(extrator: str, url: str, html: str, funcao):
+    # Se a página não mudou (mesmo hash) devolve o registo já extraído sem voltar a fazer parsing.
+    if not cache_ativa:
+        with Fase(f"extrair {extrator}", "parse", url=url):
+            return funcao(html)
+
+    h = hashlib.sha1(html.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        row = abrir_cache().execute(
+            "SELECT hash, valor FROM extraidos WHERE url = ? AND extrator = ?", (url, extrator)
+        ).fetchone()
+    if row and row[0] == h:
+        return json.loads(row[1])
+
+    with Fase(f"extrair {extrator}", "parse", url=url):
+        valor = funcao(html)
+    with _cache_lock:
+        _cache_con.execute(
+            "INSERT OR REPLACE INTO extraidos (url, extrator, hash, valor) VALUES (?, ?, ?, ?)",
+            (url, extrator, h, json.dumps(valor, ensure_ascii=False)),
+        )
+        _cache_con.commit()
+    return valor
+
+
+def html_da_resposta(resp) -> Optional[str]:
+    # Resultado do motor em paralelo: None se o pedido falhou.
+    if isinstance(resp, Exception) or resp.status_code >= 400:
+        return None
+    return resp.text
+
+
+INDICE_EMPRESAS_TTL = 7 * 24 * 3600
+SUFIXOS_EMPRESA = {"lda", "sa", "unipessoal", "ltd", "inc", "sgps"}
+
+_indice_empresas = None
+_indice_empresas_em = 0.0
+_indice_lock = threading.Lock()
+
+
+def tokens_empresa(nome: str) -> list:
+    return [t for t in re.findall(r"[a-z0-9]+", normalizar_texto(nome)) if t not in SUFIXOS_EMPRESA]
+
+
+def extrair_empresas_ranking(html: str) -> list:
+    import bs4
+
+    soup = sopa(html, bs4.SoupStrainer("a", href=True))
+    empresas = {}
+
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if not href.startswith("/companies/") or href == "/companies/ranking":
+            continue
+
+        partes = href.split("/")
+        slug = partes[2].lower() if len(partes) > 2 else ""
+        nome = link.get_text(" ", strip=True)
+        if slug and (slug not in empresas or not empresas[slug][1]):
+            empresas[slug] = (href, nome)
+
+    return [[slug, href, nome] for slug, (href, nome) in empresas.items()]
+
+
+@medido
+def atualizar_indice_empresas(con: sqlite3.Connection) -> int:
+    html = obter_html_teamlyzer(TEAMLYZER_RANKING_URL)
+    empresas = extrair_memorizado("ranking", TEAMLYZER_RANKING_URL, html, extrair_empresas_ranking)
+    con.execute("DELETE FROM empresas_teamlyzer")
+    con.executemany(
+        "INSERT INTO empresas_teamlyzer (slug, href, nome, chave) VALUES (?, ?, ?, ?)",
+        [(slug, href, nome, " ".join(tokens_empresa(nome))) for slug, href, nome in empresas],
+    )
+    escrever_meta(con, "indice_empresas_em", str(time.time()))
+    con.commit()
+    return len(empresas)
+
+
+@medido
+def carregar_indice_empresas() -> dict:
+    # Índice em memória: slug -> href, chave normalizada -> slug e token -> slugs (para aproximações).
+    # O memo de processo (serve, serve-http, daemon) também expira ao fim de INDICE_EMPRESAS_TTL.
+    global _indice_empresas, _indice_empresas_em
+    with _indice_lock:
+        if _indice_empresas is not None and time.time() - _indice_empresas_em <= INDICE_EMPRESAS_TTL:
+            return _indice_empresas
+
+        con = abrir_armazem()
+        try:
+            atualizado_em = float(ler_meta(con, "indice_empresas_em") or 0)
+            if time.time() - atualizado_em > INDICE_EMPRESAS_TTL:
+                try:
+                    atualizar_indice_empresas(con)
+                except Exception as e:
+                    print(f"Não foi possível aceder ao ranking do Teamlyzer: {e}")
+                # Mesmo sem rede, só se volta a tentar depois de outro TTL.
+                atualizado_em = time.time()
+            rows = con.execute("SELECT slug, href, nome, chave FROM empresas_teamlyzer").fetchall()
+        finally:
+            con.close()
+
+        indice = {"href": {}, "nome": {}, "chave": {}, "tokens": {}}
+        for slug, href, nome, chave in rows:
+            indice["href"][slug] = href
+            indice["nome"][slug] = nome
+            if chave:
+                indice["chave"].setdefault(chave, slug)
+            for token in set(chave.split()):
+                indice["tokens"].setdefault(token, set()).add(slug)
+
+        _indice_empresas = indice
+        _indice_empresas_em = atualizado_em
+        return indice
+
+
+def procurar_empresa_indice(nome_empresa: Optional[str], slug: Optional[str] = None) -> Optional[str]:
+    indice = carregar_indice_empresas()
+
+    if slug and slug.lower() in indice["href"]:
+        return TEAMLYZER_BASE_URL + indice["href"][slug.lower()]
+
+    alvo = tokens_empresa(nome_empresa or "")
+    if not alvo:
+        return None
+
+    encontrado = indice["chave"].get(" ".join(alvo))
+    if encontrado:
+        return TEAMLYZER_BASE_URL + indice["href"][encontrado]
+
+    # Aproximação: candidatos que partilham tokens, preferindo os que contêm todos os do alvo.
+    alvo_set = set(alvo)
+    candidatos = set()
+    for token in alvo_set:
+        candidatos |= indice["tokens"].get(token, set())
+
+    melhor = None
+    melhor_score = (False, 0.0)
+    for candidato in candidatos:
+        tokens_cand = set(tokens_empresa(indice["nome"][candidato]))
+        score = (alvo_set <= tokens_cand, len(alvo_set & tokens_cand) / len(alvo_set | tokens_cand))
+        if score > melhor_score:
+            melhor_score = score
+            melhor = candidato
+
+    if melhor and (melhor_score[0] or melhor_score[1] >= 0.5):
+        return TEAMLYZER_BASE_URL + indice["href"][melhor]
+    return None
+
+
+@medido
+def encontrar_url_empresa_teamlyzer(nome_empresa: str, slug: Optional[str] = None) -> Optional[str]:
+    url_empresa = procurar_empresa_indice(nome_empresa, slug)
+    if url_empresa:
+        return url_empresa
+
+    # Empresas fora do ranking: ainda se tenta a página direta pelo slug.
+    if slug:
+        candidate_url = f"{TEAMLYZER_BASE_URL}/companies/{slug}"
+        try:
+            with Fase("sonda do slug no Teamlyzer", slug=slug):
+                resp = pedido_get(candidate_url, headers=TEAMLYZER_HEADERS, timeout=10)
+            if resp.status_code == 200:
+                return candidate_url
+        except Exception:
+            pass
+
+    return None
+
+def extrair_beneficios_teamlyzer(url_empresa: str) -> Optional[str]:
+    url_b = url_empresa.rstrip("/") + "/benefits-and-values"
+    try:
+        html = obter_html_teamlyzer(url_b)
+    except Exception:
+        return None
+
+    return extrair_memorizado("beneficios", url_b, html, beneficios_de_html)
+
+
+_RE_BENEFICIOS = re.compile(r"Benefícios e vantagens", re.I)
+_RE_SALARIO_MEDIO = re.compile(r"Salário médio bruto", re.I)
+_RE_INTERVALO_SALARIO = re.compile(r"([0-9\.\s]+€)\s*-\s*([0-9\.\s]+€)")
+
+
+def beneficios_de_html(html: str) -> Optional[str]:
+    import bs4
+
+    soup = sopa(html, bs4.SoupStrainer(["h2", "h3", "div"]))
+
+    h_benef = soup.find("h2", class_="text-muted", string=_RE_BENEFICIOS)
+    if not h_benef:
+        return None
+
+    beneficios = []
+    for node in h_benef.find_all_next(["h2", "h3", "div"]):
+        if node.name == "h2" and "valores e cultura" in node.get_text(" ", strip=True).lower():
+            break
+
+        if node.name == "h3":
+            b = node.find("b")
+            if b:
+                t = b.get_text(" ", strip=True)
+                if t:
+                    beneficios.append(t)
+
+        if node.name == "div" and "flex_details" in (node.get("class") or []):
             t = node.get_text(" ", strip=True)
             if t:
                 beneficios.append(t)
@@ -326,9 +2368,13 @@ def extrair_salario_medio_teamlyzer(url_empresa: str) -> Optional[str]:
     except Exception:
         return None
 
-    soup = BeautifulSoup(html, "html.parser")
+    return extrair_memorizado("salario", url_s, html, salario_medio_de_html)
+
 
-    for bloco in soup.find_all(string=re.compile(r"Salário médio bruto", re.I)):
+def salario_medio_de_html(html: str) -> Optional[str]:
+    soup = sopa(html)
+
+    for bloco in soup.find_all(string=_RE_SALARIO_MEDIO):
         container = bloco.parent
 
         for _ in range(3):
@@ -336,7 +2382,7 @@ def extrair_salario_medio_teamlyzer(url_empresa: str) -> Optional[str]:
                 break
             texto = container.get_text(" ", strip=True)
 
-            m = re.search(r"([0-9\.\s]+€)\s*-\s*([0-9\.\s]+€)", texto)
+            m = _RE_INTERVALO_SALARIO.search(texto)
             if m:
                 a = re.sub(r"\s+", " ", m.group(1)).strip()
                 b = re.sub(r"\s+", " ", m.group(2)).strip()
@@ -348,19 +2394,15 @@ def extrair_salario_medio_teamlyzer(url_empresa: str) -> Optional[str]:
 
 
 
-def extrair_info_empresa_teamlyzer(url_empresa: str) -> dict:
-    try:
-        html = obter_html_teamlyzer(url_empresa)
-    except Exception as e:
-        print(f"Erro ao aceder à página da empresa no Teamlyzer: {e}")
-        return {
-            "teamlyzer_rating": None,
-            "teamlyzer_description": None,
-            "teamlyzer_benefits": None,
-            "teamlyzer_salary": None,
-        }
+def paginas_empresa_teamlyzer(url_empresa: str) -> list:
+    base = url_empresa.rstrip("/")
+    return [url_empresa, base + "/benefits-and-values", base + "/salary-reviews"]
+
 
-    soup = BeautifulSoup(html, "html.parser")
+def info_empresa_de_html(html: str) -> dict:
+    import bs4
+
+    soup = sopa(html, bs4.SoupStrainer("meta"))
 
     rating = None
     meta_rating = soup.find("meta", {"itemprop": "ratingValue"})
@@ -391,46 +2433,127 @@ def extrair_info_empresa_teamlyzer(url_empresa: str) -> dict:
         if "reviews e opiniões" in dlow or "teamlyzer" in dlow:
             description = None
 
-    benefits = extrair_beneficios_teamlyzer(url_empresa)
-    salary = extrair_salario_medio_teamlyzer(url_empresa)
+    return {"teamlyzer_rating": rating, "teamlyzer_description": description}
 
-    return {
-        "teamlyzer_rating": rating,
-        "teamlyzer_description": description,
-        "teamlyzer_benefits": benefits,
-        "teamlyzer_salary": salary,
-    }
 
+@medido
+def montar_info_empresa(respostas: list) -> dict:
+    # respostas: página da empresa, benefícios e salário (ver paginas_empresa_teamlyzer).
+    resp_empresa, resp_beneficios, resp_salario = respostas
 
-@app.command()
-def get(job_id: int, csv_file: Optional[str] = typer.Option(None, "--csv", help="Se indicado, exporta os dados do job enriquecido para um ficheiro CSV.")):
+    html = html_da_resposta(resp_empresa)
+    if html is None:
+        erro = resp_empresa if isinstance(resp_empresa, Exception) else f"HTTP {resp_empresa.status_code}"
+        print(f"Erro ao aceder à página da empresa no Teamlyzer: {erro}")
+        return {
+            "teamlyzer_rating": None,
+            "teamlyzer_description": None,
+            "teamlyzer_benefits": None,
+            "teamlyzer_salary": None,
+        }
+
+    info = dict(extrair_memorizado("empresa", resp_empresa.url, html, info_empresa_de_html))
+
+    html_beneficios = html_da_resposta(resp_beneficios)
+    html_salario = html_da_resposta(resp_salario)
+    info["teamlyzer_benefits"] = (
+        extrair_memorizado("beneficios", resp_beneficios.url, html_beneficios, beneficios_de_html)
+        if html_beneficios else None
+    )
+    info["teamlyzer_salary"] = (
+        extrair_memorizado("salario", resp_salario.url, html_salario, salario_medio_de_html)
+        if html_salario else None
+    )
+    return info
+
+
+@medido
+def extrair_info_empresa_teamlyzer(url_empresa: str) -> dict:
+    # A página da empresa, os benefícios e o salário são pedidos em paralelo.
+    pedidos = [pedido_teamlyzer(url) for url in paginas_empresa_teamlyzer(url_empresa)]
+    return montar_info_empresa(obter_em_paralelo(pedidos))
+
+
+CAMPOS_CSV_GET = [
+    "id",
+    "title",
+    "company",
+    "teamlyzer_url",
+    "teamlyzer_rating",
+    "teamlyzer_description",
+    "teamlyzer_benefits",
+    "teamlyzer_salary",
+]
+
+
+def pedido_job_itjobs(job_id: int) -> tuple:
+    return API_GET_URL, {"api_key": API_KEY, "id": job_id}, headers, 10
+
+
+@medido
+def obter_job_itjobs(job_id: int) -> dict:
+    resp = pedido_get(*pedido_job_itjobs(job_id))
+    resp.raise_for_status()
+    return json_resposta(resp)
+
+
+def nome_e_slug_empresa(job: dict):
+    company = job.get("company")
+    if isinstance(company, dict):
+        return company.get("name"), company.get("slug")
+    return (str(company) if company else None), None
+
+
+@medido
+def enriquecer_empresa(nome_empresa: str, slug_empresa: Optional[str]) -> Optional[dict]:
+    url_empresa = encontrar_url_empresa_teamlyzer(nome_empresa, slug_empresa)
+    if not url_empresa:
+        return None
+
+    info = extrair_info_empresa_teamlyzer(url_empresa)
+    info["teamlyzer_url"] = url_empresa
+    return info
+
+
+def linha_csv_get(job: dict) -> dict:
+    nome_empresa, _ = nome_e_slug_empresa(job)
+    linha = {campo: job.get(campo) for campo in CAMPOS_CSV_GET}
+    linha["id"] = job.get("id", "N/A")
+    linha["title"] = job.get("title", "N/A")
+    linha["company"] = nome_empresa or "N/A"
+    return linha
+
+
+def ler_ids(job_ids: Optional[List[int]], ficheiro: Optional[str]) -> List[int]:
+    ids = list(job_ids or [])
+    if ficheiro:
+        f = sys.stdin if ficheiro == "-" else open(ficheiro, encoding="utf-8")
+        try:
+            for token in re.split(r"[\s,;]+", f.read()):
+                if token.isdigit():
+                    ids.append(int(token))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    return list(dict.fromkeys(ids))
+
+
+def get_um(job_id: int, csv_file: Optional[str]):
+    import requests
 
-    params = {"api_key": API_KEY, "id": job_id}
     try:
-        resp = requests.get(API_GET_URL, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
+        job = obter_job_itjobs(job_id)
     except requests.RequestException as e:
         print(f"Erro ao aceder à API do itjobs.pt: {e}")
         mostrar_comandos()
         return
 
-    job = resp.json()
-
     if isinstance(job, dict) and "error" in job:
         print("Erro da API itjobs.pt:", job["error"].get("message", "Erro desconhecido"))
         mostrar_comandos()
         return
 
-    company = job.get("company")
-    slug_empresa = None
-
-    if isinstance(company, dict):
-        nome_empresa = company.get("name")
-        slug_empresa = company.get("slug")
-        nome_empresa_str = nome_empresa or "N/A"
-    else:
-        nome_empresa = str(company) if company else None
-        nome_empresa_str = nome_empresa or "N/A"
+    nome_empresa, slug_empresa = nome_e_slug_empresa(job)
 
     if not nome_empresa:
         print("Não foi possível determinar o nome da empresa para este job.")
@@ -438,16 +2561,14 @@ def get(job_id: int, csv_file: Optional[str] = typer.Option(None, "--csv", help=
         mostrar_comandos()
         return
 
-    url_empresa = encontrar_url_empresa_teamlyzer(nome_empresa, slug_empresa)
-    if not url_empresa:
+    info_teamlyzer = enriquecer_empresa(nome_empresa, slug_empresa)
+    if not info_teamlyzer:
         print(f"Empresa '{nome_empresa}' não encontrada no Teamlyzer. JSON original do job:")
         print(json.dumps(job, indent=2, ensure_ascii=False))
         mostrar_comandos()
         return
 
-    info_teamlyzer = extrair_info_empresa_teamlyzer(url_empresa)
     job.update(info_teamlyzer)
-    job["teamlyzer_url"] = url_empresa
 
     print(json.dumps(job, indent=2, ensure_ascii=False))
 
@@ -455,28 +2576,9 @@ def get(job_id: int, csv_file: Optional[str] = typer.Option(None, "--csv", help=
     if csv_file:
         try:
             with open(csv_file, "w", newline="", encoding="utf-8") as f:
-                fieldnames = [
-                    "id",
-                    "title",
-                    "company",
-                    "teamlyzer_url",
-                    "teamlyzer_rating",
-                    "teamlyzer_description",
-                    "teamlyzer_benefits",
-                    "teamlyzer_salary",
-                ]
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer = csv.DictWriter(f, fieldnames=CAMPOS_CSV_GET)
                 writer.writeheader()
-                writer.writerow({
-                    "id": job.get("id", "N/A"),
-                    "title": job.get("title", "N/A"),
-                    "company": nome_empresa_str,
-                    "teamlyzer_url": url_empresa,
-                    "teamlyzer_rating": job.get("teamlyzer_rating"),
-                    "teamlyzer_description": job.get("teamlyzer_description"),
-                    "teamlyzer_benefits": job.get("teamlyzer_benefits"),
-                    "teamlyzer_salary": job.get("teamlyzer_salary"),
-                })
+                writer.writerow(linha_csv_get(job))
             print(f"CSV '{csv_file}' criado com sucesso!")
         except Exception as e:
             print(f"Erro ao criar CSV '{csv_file}': {e}")
@@ -485,87 +2587,396 @@ def get(job_id: int, csv_file: Optional[str] = typer.Option(None, "--csv", help=
     mostrar_comandos()
 
 
-#b) Conta vagas por zona e por tipo de trabalho. Pode ainda exportar CSV: Zona | Tipo de Trabalho | Nº de vagas.
-
-@app.command()
-def statistics(
-    zone: str = typer.Argument(..., help="Zona/Região a analisar"),
-    csv_file: Optional[str] = typer.Option(None, "--csv", help="Exportar para CSV")
-):
-    params = {"api_key": API_KEY, "limit": 200}
-    try:
-        resp = requests.get(API_LIST_URL, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        print(f"Erro ao aceder à API do itjobs.pt: {e}")
-        mostrar_comandos()
-        return
-
-    resultados = resp.json().get("results", [])
-    zona_norm = zone.lower()
-
-    contagens = {}
+@medido
+def enriquecer_lote(ids: List[int], erros: Optional[dict] = None) -> list:
+    # Devolve os jobs enriquecidos pela ordem dos ids; as falhas ficam em erros (id -> mensagem).
+    import requests
 
-    for job in resultados:
-        titulo = job.get("title", "N/A")
-        for loc in job.get("locations", []):
-            nome_loc = loc.get("name", "").lower()
-            if zona_norm in nome_loc:
-                chave = (loc.get("name", "N/A"), titulo)
-                contagens[chave] = contagens.get(chave, 0) + 1
-
-    if not contagens:
-        print("Não foram encontradas vagas para essa zona.")
-        mostrar_comandos()
-        return
+    erros = {} if erros is None else erros
 
-    resultado = [
-        {"zona": z, "tipo_trabalho": tipo, "vagas": count}
-        for (z, tipo), count in contagens.items()
-    ]
-    resultado.sort(key=lambda x: x["vagas"], reverse=True)
+    # 1) Jobs do itjobs.pt em paralelo.
+    jobs = {}
+    for i, resp in iterar_em_paralelo([pedido_job_itjobs(job_id) for job_id in ids]):
+        job_id = ids[i]
+        try:
+            if isinstance(resp, Exception):
+                raise resp
+            resp.raise_for_status()
+            job = json_resposta(resp)
+        except requests.RequestException as e:
+            erros[job_id] = f"erro ao aceder à API do itjobs.pt: {e}"
+            continue
+        if isinstance(job, dict) and "error" in job:
+            erros[job_id] = job["error"].get("message", "Erro desconhecido")
+            continue
+        jobs[job_id] = job
+
+    # 2) Cada empresa é procurada no Teamlyzer uma única vez e as suas páginas vão todas no mesmo lote.
+    urls_empresas = {}
+    for job in jobs.values():
+        nome_empresa, slug_empresa = nome_e_slug_empresa(job)
+        chave = slug_empresa or normalizar_texto(nome_empresa or "")
+        if nome_empresa and chave not in urls_empresas:
+            urls_empresas[chave] = encontrar_url_empresa_teamlyzer(nome_empresa, slug_empresa)
+
+    chaves = [chave for chave, url in urls_empresas.items() if url]
+    pedidos = [pedido_teamlyzer(url) for chave in chaves for url in paginas_empresa_teamlyzer(urls_empresas[chave])]
+    respostas = obter_em_paralelo(pedidos)
+
+    info_por_empresa = {}
+    for k, chave in enumerate(chaves):
+        info = montar_info_empresa(respostas[3 * k:3 * k + 3])
+        info["teamlyzer_url"] = urls_empresas[chave]
+        info_por_empresa[chave] = info
 
-    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    resultado = []
+    for job_id in ids:
+        job = jobs.get(job_id)
+        if job is None:
+            continue
+        nome_empresa, slug_empresa = nome_e_slug_empresa(job)
+        if nome_empresa:
+            info = info_por_empresa.get(slug_empresa or normalizar_texto(nome_empresa))
+            if info:
+                job.update(info)
+        resultado.append(job)
+    return resultado
+
+
+def get_lote(ids: List[int], csv_file: Optional[str]):
+    erros = {}
+    jobs = enriquecer_lote(ids, erros)
+    for job_id, mensagem in erros.items():
+        print(f"Job {job_id}: {mensagem}", file=sys.stderr)
+
+    # Saída em JSONL (stdout) e, opcionalmente, num único CSV.
+    linhas = []
+    for job in jobs:
+        print(json.dumps(job, ensure_ascii=False))
+        linhas.append(linha_csv_get(job))
 
     if csv_file:
         try:
             with open(csv_file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Zona", "Tipo de Trabalho", "Nº de vagas"])
-                for row in resultado:
-                    writer.writerow([row["zona"], row["tipo_trabalho"], row["vagas"]])
-            print(f"CSV '{csv_file}' criado com sucesso!")
+                writer = csv.DictWriter(f, fieldnames=CAMPOS_CSV_GET)
+                writer.writeheader()
+                writer.writerows(linhas)
+            print(f"CSV '{csv_file}' criado com sucesso!", file=sys.stderr)
         except Exception as e:
-            print("Erro ao criar CSV:", e)
+            print(f"Erro ao criar CSV '{csv_file}': {e}", file=sys.stderr)
 
 
-    mostrar_comandos()
-
+@app.command()
+def get(
+    job_ids: Optional[List[int]] = typer.Argument(None, help="Um ou mais job ids."),
+    ficheiro: Optional[str] = typer.Option(None, "--file", "-f", help="Ficheiro com job ids (um por linha, '-' para stdin)."),
+    csv_file: Optional[str] = typer.Option(None, "--csv", help="Se indicado, exporta os dados do(s) job(s) enriquecido(s) para um ficheiro CSV."),
+):
+    ids = ler_ids(job_ids, ficheiro)
+    if not ids:
+        print("Indique pelo menos um job id.")
+        mostrar_comandos()
+        return
 
-#c) Determinar as top n skills mais relevantes para um determinado cargo profissional"
+    if len(ids) == 1 and not ficheiro:
+        get_um(ids[0], csv_file)
+    else:
+        get_lote(ids, csv_file)
 
 
-def normalizar_texto(s: str) -> str:
-    s = unicodedata.normalize("NFKD", s or "")
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    return re.sub(r"\s+", " ", s.lower()).strip()
+#b) Conta vagas por zona e por tipo de trabalho. Pode ainda exportar CSV: Zona | Tipo de Trabalho | Nº de vagas.
 
+# Factos por job (zona × tipo, com empresa e dia), reconstruídos a cada sync. Um job com várias zonas
+# ou tipos tem vários factos, por isso cada grupo conta jobs distintos e não soma células.
 
-def resolver_cargo_teamlyzer(cargo: str) -> Optional[str]:
-    url_base = f"{TEAMLYZER_BASE_URL}/companies/jobs?order=most_relevant"
-    soup = BeautifulSoup(obter_html_teamlyzer(url_base), "html.parser")
+DIMENSOES_ESTATISTICAS = {
+    "zona": "Zona",
+    "tipo_trabalho": "Tipo de Trabalho",
+    "empresa": "Empresa",
+    "dia": "Dia",
+}
+ALIASES_DIMENSAO = {"zone": "zona", "tipo": "tipo_trabalho", "type": "tipo_trabalho", "company": "empresa", "day": "dia"}
+COLUNAS_DIMENSAO = {"zona": "zona", "tipo_trabalho": "tipo", "empresa": "empresa", "dia": "dia"}
+
+
+def factos_job(job: dict) -> list:
+    # Uma linha por combinação localização × tipo do job.
+    empresa, _ = nome_e_slug_empresa(job)
+    dia = (job.get("publishedAt") or "")[:10] or "N/A"
+    zonas = [loc.get("name", "").strip() for loc in job.get("locations", []) if loc.get("name")] or ["N/A"]
+    tipos = [t.get("name", "").strip() for t in job.get("types", []) if t.get("name")] or ["N/A"]
+    return [(zona, tipo, empresa or "N/A", dia) for zona in zonas for tipo in tipos]
+
+
+def construir_cubo(ofertas) -> dict:
+    # Célula -> ids dos jobs que lá aparecem.
+    cubo = {}
+    for job in ofertas:
+        for chave in factos_job(job):
+            cubo.setdefault(chave, set()).add(job.get("id"))
+    return cubo
+
+
+def cubo_de_pagina(pagina) -> dict:
+    # Corre nos processos do pool (ver mapear_reduzir).
+    return construir_cubo(ofertas_da_pagina(pagina))
+
+
+def juntar_ids(total: dict, parcial: dict):
+    for chave, ids in parcial.items():
+        total.setdefault(chave, set()).update(ids)
+
+
+@medido
+def reconstruir_cubo(con: sqlite3.Connection) -> int:
+    # Cada facto guarda se o job representa o seu grupo de repetidos (para --unique).
+    sql = ("SELECT j.id, j.data, COALESCE(c.grupo = j.id, 1) FROM jobs j "
+           "LEFT JOIN conteudo_job c ON c.id = j.id")
+    factos = []
+    for job_id, data, representante in con.execute(sql):
+        for zona, tipo, empresa, dia in factos_job(carregar_json(data)):
+            factos.append((job_id, zona, normalizar_texto(zona), tipo, normalizar_texto(tipo), empresa, dia,
+                           representante))
+    con.execute("DELETE FROM factos_estatisticas")
+    con.executemany(
+        "INSERT OR IGNORE INTO factos_estatisticas (id, zona, zona_norm, tipo, tipo_norm, empresa, dia, unico) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        factos,
+    )
+    return len(factos)
 
-    select_role = soup.find("select", id="profession_role")
-    if not select_role:
-        return None
 
-    alvo = normalizar_texto(cargo)
+def estatisticas_locais(zonas: List[str], tipos: List[str], data_de: Optional[str], data_ate: Optional[str],
+                        group_by: List[str], unicas: bool = False) -> list:
+    # Os mesmos filtros que agregar_estatisticas, em SQL sobre os factos do armazém.
+    con = abrir_armazem()
+    try:
+        # Armazéns sincronizados antes da tabela de factos existir ainda não a têm preenchida.
+        sem_factos = con.execute("SELECT NOT EXISTS (SELECT 1 FROM factos_estatisticas)").fetchone()[0]
+        if (unicas and garantir_conteudos(con)) or sem_factos:
+            reconstruir_cubo(con)
+            con.commit()
+        condicoes = ["(" + " OR ".join("instr(zona_norm, ?) > 0" for _ in zonas) + ")"]
+        params = [normalizar_texto(z) for z in zonas]
+        if tipos:
+            condicoes.append("(" + " OR ".join("instr(tipo_norm, ?) > 0" for _ in tipos) + ")")
+            params += [normalizar_texto(t) for t in tipos]
+        if data_de:
+            condicoes.append("dia >= ?")
+            params.append(data_de)
+        if data_ate:
+            condicoes.append("dia <= ?")
+            params.append(data_ate)
+        if unicas:
+            condicoes.append("unico")
+        colunas = ", ".join(COLUNAS_DIMENSAO[d] for d in group_by)
+        sql = (f"SELECT {colunas}, COUNT(DISTINCT id) AS vagas FROM factos_estatisticas "
+               f"WHERE {' AND '.join(condicoes)} GROUP BY {colunas} ORDER BY vagas DESC")
+        return [dict(zip(group_by, row[:-1]), vagas=row[-1]) for row in con.execute(sql, params)]
+    finally:
+        con.close()
+
+
+@medido
+def agregar_estatisticas(linhas, zonas: List[str], tipos: List[str], data_de: Optional[str],
+                         data_ate: Optional[str], group_by: List[str]) -> list:
+    # linhas: (zona, tipo, empresa, dia, ids dos jobs); cada grupo conta os jobs distintos.
+    zonas_norm = [normalizar_texto(z) for z in zonas]
+    tipos_norm = [normalizar_texto(t) for t in tipos]
+    # As dimensões têm poucos valores distintos: cada zona/tipo é testado uma só vez.
+    zona_ok = {}
+    tipo_ok = {}
+
+    grupos = {}
+    for zona, tipo, empresa, dia, ids in linhas:
+        if zona not in zona_ok:
+            zn = normalizar_texto(zona)
+            zona_ok[zona] = any(z in zn for z in zonas_norm)
+        if not zona_ok[zona]:
+            continue
+        if tipos_norm:
+            if tipo not in tipo_ok:
+                tn = normalizar_texto(tipo)
+                tipo_ok[tipo] = any(t in tn for t in tipos_norm)
+            if not tipo_ok[tipo]:
+                continue
+        if (data_de and dia < data_de) or (data_ate and dia > data_ate):
+            continue
+
+        valores = {"zona": zona, "tipo_trabalho": tipo, "empresa": empresa, "dia": dia}
+        chave = tuple(valores[d] for d in group_by)
+        grupos.setdefault(chave, set()).update(ids)
+
+    resultado = [dict(zip(group_by, chave), vagas=len(ids)) for chave, ids in grupos.items()]
+    resultado.sort(key=lambda x: x["vagas"], reverse=True)
+    return resultado
+
+
+def dimensoes_de(group_by: str) -> list:
+    dimensoes = []
+    for d in group_by.split(","):
+        d = ALIASES_DIMENSAO.get(d.strip().lower(), d.strip().lower())
+        if d not in DIMENSOES_ESTATISTICAS:
+            raise ValueError(f"Dimensão desconhecida em --group-by: {d} (use {', '.join(DIMENSOES_ESTATISTICAS)})")
+        if d not in dimensoes:
+            dimensoes.append(d)
+    return dimensoes
+
+
+@medido
+def calcular_estatisticas(zonas: List[str], tipos: List[str], data_de: Optional[str], data_ate: Optional[str],
+                          dimensoes: List[str], offline: bool, max_pages: Optional[int] = None,
+                          todas: bool = False, unicas: bool = False, workers: int = 1) -> list:
+    if offline:
+        return estatisticas_locais(zonas, tipos, data_de, data_ate, dimensoes, unicas)
+    if workers > 1 and not unicas:
+        # Os repetidos cruzam páginas, por isso --unique fica sempre no caminho em série.
+        paginas = iterar_paginas_itjobs(paginas_pedidas(max_pages, todas), brutas=True)
+        cubo = mapear_reduzir(cubo_de_pagina, ((pagina,) for pagina in paginas), juntar_ids, workers, {})
+    else:
+        ofertas = obter_ofertas(False, max_pages, todas)
+        cubo = construir_cubo(sem_repetidos(ofertas) if unicas else ofertas)
+    linhas = (chave + (ids,) for chave, ids in cubo.items())
+    return agregar_estatisticas(linhas, zonas, tipos, data_de, data_ate, dimensoes)
+
+
+@app.command()
+def statistics(
+    zones: List[str] = typer.Argument(..., help="Zona(s)/Região(ões) a analisar"),
+    csv_file: Optional[str] = typer.Option(None, "--csv", help="Exportar para CSV"),
+    tipos: List[str] = typer.Option([], "--type", help="Filtra por tipo de trabalho (repetível)."),
+    data_de: Optional[str] = typer.Option(None, "--from", help="Data de publicação inicial (YYYY-MM-DD)."),
+    data_ate: Optional[str] = typer.Option(None, "--to", help="Data de publicação final (YYYY-MM-DD)."),
+    group_by: str = typer.Option("zona,tipo_trabalho", "--group-by", help="Dimensões: zona, tipo_trabalho, empresa, dia."),
+    max_pages: Optional[int] = typer.Option(None, "--max-pages", help="Número máximo de páginas a obter (por omissão 1)."),
+    todas: bool = typer.Option(False, "--all", help="Percorre todas as páginas do itjobs.pt."),
+    offline: bool = typer.Option(False, "--offline", help="Responde a partir do cubo do armazém local (ver sync)."),
+    unique: bool = typer.Option(False, "--unique", help="Conta uma só vez os anúncios repetidos (mesma empresa, texto quase igual)."),
+    workers: int = typer.Option(1, "--workers", help="Processos para agregar as páginas em paralelo (1 = em série)."),
+):
+    import requests
+
+    try:
+        for d in (data_de, data_ate):
+            if d:
+                datetime.fromisoformat(d)
+    except ValueError:
+        print("Datas inválidas. Usa o formato YYYY-MM-DD.")
+        return
+
+    try:
+        dimensoes = dimensoes_de(group_by)
+    except ValueError as e:
+        print(e)
+        return
+
+    try:
+        resultado = calcular_estatisticas(zones, tipos, data_de, data_ate, dimensoes, offline, max_pages, todas,
+                                          unique, workers)
+    except requests.RequestException as e:
+        print(f"Erro ao aceder à API do itjobs.pt: {e}")
+        mostrar_comandos()
+        return
+
+    if not resultado:
+        print("Não foram encontradas vagas para essa zona.")
+        mostrar_comandos()
+        return
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    if csv_file:
+        try:
+            with open(csv_file, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow([DIMENSOES_ESTATISTICAS[d] for d in dimensoes] + ["Nº de vagas"])
+                for row in resultado:
+                    writer.writerow([row[d] for d in dimensoes] + [row["vagas"]])
+            print(f"CSV '{csv_file}' criado com sucesso!")
+        except Exception as e:
+            print("Erro ao criar CSV:", e)
+
+
+    mostrar_comandos()
+
+
+#c) Determinar as top n skills mais relevantes para um determinado cargo profissional"
+
+
+def normalizar_texto(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", s.lower()).strip()
+
+
+def opcoes_select_de_html(html: str, id_select: str) -> Optional[list]:
+    # Só o <select> pedido é construído; devolve [valor, texto] de cada <option>.
+    import bs4
+
+    soup = sopa(html, bs4.SoupStrainer("select", id=id_select))
+    select = soup.find("select", id=id_select)
+    if not select:
+        return None
+    return [[(opt.get("value") or "").strip(), opt.get_text(" ", strip=True)] for opt in select.find_all("option")]
+
+
+def opcoes_select_teamlyzer(url: str, id_select: str) -> Optional[list]:
+    html = obter_html_teamlyzer(url)
+    return extrair_memorizado(f"select:{id_select}", url, html, lambda h: opcoes_select_de_html(h, id_select))
+
+
+# Catálogo de cargos e contagens de tags por cargo guardados no armazém local, com TTL.
+
+CATALOGO_CARGOS_TTL = 24 * 3600
+TAGS_CARGO_TTL = 24 * 3600
+
+_catalogo_cargos = None
+_catalogo_cargos_em = 0.0
+_catalogo_lock = threading.Lock()
+
+
+@medido
+def carregar_catalogo_cargos() -> list:
+    # [valor, texto] de cada cargo do <select id="profession_role">; só volta à rede depois do TTL
+    # (e o memo de processo expira com ele).
+    global _catalogo_cargos, _catalogo_cargos_em
+    with _catalogo_lock:
+        if _catalogo_cargos is not None and time.time() - _catalogo_cargos_em <= CATALOGO_CARGOS_TTL:
+            return _catalogo_cargos
+
+        con = abrir_armazem()
+        try:
+            atualizado_em = float(ler_meta(con, "catalogo_cargos_em") or 0)
+            if time.time() - atualizado_em > CATALOGO_CARGOS_TTL:
+                url_base = f"{TEAMLYZER_BASE_URL}/companies/jobs?order=most_relevant"
+                try:
+                    opcoes = opcoes_select_teamlyzer(url_base, "profession_role")
+                except Exception as e:
+                    print(f"Não foi possível aceder à lista de cargos do Teamlyzer: {e}", file=sys.stderr)
+                    opcoes = None
+                if opcoes:
+                    con.execute("DELETE FROM cargos_teamlyzer")
+                    con.executemany(
+                        "INSERT OR REPLACE INTO cargos_teamlyzer (valor, texto) VALUES (?, ?)",
+                        [(valor, texto) for valor, texto in opcoes if valor],
+                    )
+                    escrever_meta(con, "catalogo_cargos_em", str(time.time()))
+                    con.commit()
+                # Mesmo sem rede, o memo só volta a tentar depois de outro TTL.
+                atualizado_em = time.time()
+            _catalogo_cargos = [list(row) for row in con.execute("SELECT valor, texto FROM cargos_teamlyzer")]
+            _catalogo_cargos_em = atualizado_em
+        finally:
+            con.close()
+        return _catalogo_cargos
+
+
+def melhor_cargo(opcoes: list, cargo: str) -> Optional[str]:
+    alvo = normalizar_texto(cargo)
     melhor_valor = None
     melhor_score = -1
 
-    for opt in select_role.find_all("option"):
-        valor = (opt.get("value") or "").strip()
-        texto = opt.get_text(" ", strip=True)
+    for valor, texto in opcoes:
         texto = normalizar_texto(re.sub(r"\(\d+\)", "", texto))
 
         if not valor or valor == "-" or not texto:
@@ -586,24 +2997,21 @@ def resolver_cargo_teamlyzer(cargo: str) -> Optional[str]:
     return melhor_valor if melhor_score > 0 else None
 
 
-def extrair_top_skills_teamlyzer(cargo: str, top: int = 10) -> list:
-    role = resolver_cargo_teamlyzer(cargo)
-    if not role:
-        return []
+def resolver_cargo_teamlyzer(cargo: str) -> Optional[str]:
+    opcoes = carregar_catalogo_cargos()
+    if not opcoes:
+        return None
+    return melhor_cargo(opcoes, cargo)
 
-    url = f"{TEAMLYZER_BASE_URL}/companies/jobs?profession_role={quote(role)}&order=most_relevant"
-    soup = BeautifulSoup(obter_html_teamlyzer(url), "html.parser")
 
-    select_tags = soup.find("select", id="tags")
-    if not select_tags:
-        return []
+def url_tags_cargo(role: str) -> str:
+    return f"{TEAMLYZER_BASE_URL}/companies/jobs?profession_role={quote(role)}&order=most_relevant"
 
-    resultado = []
 
-    for opt in select_tags.find_all("option"):
-        skill = (opt.get("value") or "").strip()
-        texto = opt.get_text(" ", strip=True)
+def tags_de_opcoes(opcoes: list) -> list:
+    resultado = []
 
+    for skill, texto in opcoes:
         if not skill or skill == "-" or skill.lower() in {"all", "todos", "todas"}:
             continue
 
@@ -617,30 +3025,122 @@ def extrair_top_skills_teamlyzer(cargo: str, top: int = 10) -> list:
         })
 
     resultado.sort(key=lambda x: x["count"], reverse=True)
-    return resultado[:top]
+    return resultado
+
+
+@medido
+def tags_por_cargo(roles: list) -> dict:
+    # role -> lista de {"skill", "count"} (todas as tags). As frescas vêm do armazém; as restantes
+    # páginas são pedidas em paralelo, num único lote.
+    con = abrir_armazem()
+
+    def guardadas(role: str) -> list:
+        return [
+            {"skill": skill, "count": contagem}
+            for skill, contagem in con.execute(
+                "SELECT skill, contagem FROM tags_cargo WHERE cargo = ? ORDER BY contagem DESC", (role,)
+            )
+        ]
+
+    try:
+        agora = time.time()
+        resultado = {}
+        em_falta = []
+        for role in dict.fromkeys(roles):
+            atualizado_em = float(ler_meta(con, f"tags_cargo_em:{role}") or 0)
+            if agora - atualizado_em <= TAGS_CARGO_TTL:
+                resultado[role] = guardadas(role)
+            else:
+                em_falta.append(role)
+
+        urls = [url_tags_cargo(role) for role in em_falta]
+        for role, url, resp in zip(em_falta, urls, obter_em_paralelo([pedido_teamlyzer(url) for url in urls])):
+            html = html_da_resposta(resp)
+            if html is None:
+                erro = resp if isinstance(resp, Exception) else f"HTTP {resp.status_code}"
+                print(f"Cargo '{role}': erro ao aceder ao Teamlyzer: {erro}", file=sys.stderr)
+                continue
+            opcoes = extrair_memorizado("select:tags", url, html, lambda h: opcoes_select_de_html(h, "tags"))
+            tags = tags_de_opcoes(opcoes or [])
+            if not tags:
+                # Página sem o <select> das tags (layout novo, página de erro): nada fica guardado, nem a
+                # página na cache HTTP, e a próxima chamada volta a tentar. Até lá servem as tags antigas.
+                print(f"Cargo '{role}': o Teamlyzer devolveu uma página sem tags.", file=sys.stderr)
+                esquecer_resposta(url)
+                antigas = guardadas(role)
+                if antigas:
+                    resultado[role] = antigas
+                continue
+            con.execute("DELETE FROM tags_cargo WHERE cargo = ?", (role,))
+            con.executemany(
+                "INSERT OR REPLACE INTO tags_cargo (cargo, skill, contagem) VALUES (?, ?, ?)",
+                [(role, t["skill"], t["count"]) for t in tags],
+            )
+            escrever_meta(con, f"tags_cargo_em:{role}", str(agora))
+            resultado[role] = tags
+        con.commit()
+        return resultado
+    finally:
+        con.close()
+
+
+@medido
+def skills_de_cargos(cargos: list, top: int = 10) -> dict:
+    # cargo pedido -> top skills ([] se o cargo não existir no Teamlyzer).
+    roles = {cargo: resolver_cargo_teamlyzer(cargo) for cargo in cargos}
+    tags = tags_por_cargo([role for role in roles.values() if role])
+    return {cargo: tags.get(role, [])[:top] if role else [] for cargo, role in roles.items()}
+
+
+def extrair_top_skills_teamlyzer(cargo: str, top: int = 10) -> list:
+    return skills_de_cargos([cargo], top)[cargo]
+
+
+def matriz_cargos_skills(resultados: dict) -> dict:
+    # Colunas: a união das top skills de todos os cargos, pela soma das contagens.
+    totais = {}
+    for lista in resultados.values():
+        for item in lista:
+            totais[item["skill"]] = totais.get(item["skill"], 0) + item["count"]
+    colunas = sorted(totais, key=totais.get, reverse=True)
+    return {
+        "skills": colunas,
+        "matriz": {
+            cargo: {**dict.fromkeys(colunas, 0), **{item["skill"]: item["count"] for item in lista}}
+            for cargo, lista in resultados.items() if lista
+        },
+        "nao_encontrados": [cargo for cargo, lista in resultados.items() if not lista],
+    }
 
 
 @list_app.command("skills")
 def list_skills(
-    job: str = typer.Argument(..., help="Cargo profissional (ex: 'data scientist')"),
+    jobs: List[str] = typer.Argument(..., help="Cargo(s) profissional(ais) (ex: 'data scientist' backend)"),
     top: int = typer.Option(10, "--top", help="Número de skills"),
     csv_file: Optional[str] = typer.Option(None, "--csv", help="Exportar CSV"),
 ):
-    resultado = extrair_top_skills_teamlyzer(job, top)
+    resultados = skills_de_cargos(list(dict.fromkeys(jobs)), top)
 
-    if not resultado:
+    if not any(resultados.values()):
         print("Não foi possível encontrar o cargo ou as skills.")
         return
 
-    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if len(resultados) == 1:
+        print(json.dumps(next(iter(resultados.values())), indent=2, ensure_ascii=False))
+    else:
+        matriz = matriz_cargos_skills(resultados)
+        for cargo in matriz["nao_encontrados"]:
+            print(f"Cargo '{cargo}' não encontrado no Teamlyzer.", file=sys.stderr)
+        print(json.dumps(matriz, indent=2, ensure_ascii=False))
 
     if csv_file:
         try:
             with open(csv_file, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
                 writer.writerow(["job", "skill", "count"])
-                for item in resultado:
-                    writer.writerow([job, item["skill"], item["count"]])
+                for job, resultado in resultados.items():
+                    for item in resultado:
+                        writer.writerow([job, item["skill"], item["count"]])
             print(f"CSV '{csv_file}' criado com sucesso!")
         except Exception as e:
             print(f"Erro ao criar CSV: {e}")
@@ -649,6 +3149,1255 @@ def list_skills(
 app.add_typer(list_app, name="list")
 
 
+### Armazém local ###
+
+LOTE_SYNC = 1000
+SYNC_JANELA_PAGINAS = 5
+
+
+def ofertas_alteradas(con: sqlite3.Connection, resultados: list) -> list:
+    # As ofertas que o armazém não tem ou cuja versão guardada é anterior (updatedAt/publishedAt).
+    ids = [job["id"] for job in resultados if job.get("id") is not None]
+    guardadas = dict(con.execute(
+        "SELECT id, MAX(COALESCE(updated_at, ''), COALESCE(published_at, '')) FROM jobs "
+        f"WHERE id IN ({', '.join('?' * len(ids))})", ids,
+    )) if ids else {}
+    return [job for job in resultados
+            if job.get("id") is not None and data_alteracao(job) > guardadas.get(job["id"], "")]
+
+
+@app.command()
+def sync(
+    full: bool = typer.Option(False, "--full", help="Ignora a marca de água e sincroniza todo o catálogo."),
+    janela: int = typer.Option(SYNC_JANELA_PAGINAS, "--window",
+                               help="Páginas sem alterações relidas depois da marca de água (anúncios antigos editados)."),
+):
+    import requests
+
+    con = abrir_armazem()
+    marca = None if full else ler_meta(con, "marca_agua")
+
+    try:
+        if marca is None:
+            # Guarda à medida que as páginas chegam, sem ter o catálogo inteiro em memória.
+            ofertas = iterar_ofertas(None, revalidar=True)
+            n = 0
+            while True:
+                lote = list(islice(ofertas, LOTE_SYNC))
+                if not lote:
+                    break
+                n += guardar_ofertas(con, lote)
+        else:
+            # A lista vem ordenada por publicação, da mais recente para a mais antiga, e um anúncio antigo
+            # editado não sobe na lista. Cada página é comparada com as versões guardadas; depois da marca
+            # de água (publicação) ainda se relêem `janela` páginas seguidas sem alterações antes de parar.
+            # Edições mais antigas do que isso só entram com --full.
+            n = 0
+            pagina = 1
+            limpas = 0
+            while True:
+                resultados = obter_pagina_itjobs(pagina, revalidar=True).get("results", [])
+                alterados = ofertas_alteradas(con, resultados)
+                n += guardar_ofertas(con, alterados)
+                antigas = all((job.get("publishedAt") or "") <= marca for job in resultados)
+                limpas = limpas + 1 if antigas and not alterados else 0
+                if limpas >= max(1, janela) or len(resultados) < LIMITE_PAGINA:
+                    break
+                pagina += 1
+    except requests.RequestException as e:
+        con.rollback()
+        con.close()
+        print(f"Erro ao aceder à API do itjobs.pt: {e}")
+        return
+
+    # A marca de água segue a ordem da lista (publicação): todas as ofertas publicadas até ela foram lidas.
+    nova_marca = con.execute("SELECT MAX(published_at) FROM jobs").fetchone()[0]
+    if nova_marca:
+        escrever_meta(con, "marca_agua", nova_marca)
+    if con.execute("SELECT COUNT(*) FROM jobs_fts").fetchone()[0] != con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]:
+        reindexar_armazem(con)
+    garantir_conteudos(con)
+    reconstruir_cubo(con)
+    garantir_rollups(con)
+    garantir_salarios(con)
+    total = con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    con.commit()
+    con.close()
+
+    print(f"Sincronização concluída: {n} ofertas novas/atualizadas, {total} no armazém local.")
+
+
+### Vigilância de novas ofertas ###
+
+WATCH_VISTOS = os.path.join(DADOS_DIR, "watch_vistos.bin")
+WATCH_FATOR_INTERVALO = 1.5
+
+
+class IdsVistos:
+    # Os ids do itjobs são inteiros densos: um bit por id chega (alguns KiB para todo o catálogo).
+    __slots__ = ("bits", "alterado")
+
+    def __init__(self, bits: bytes = b""):
+        self.bits = bytearray(bits)
+        self.alterado = False
+
+    def __contains__(self, job_id: int) -> bool:
+        byte = job_id >> 3
+        return 0 <= byte < len(self.bits) and bool(self.bits[byte] & (1 << (job_id & 7)))
+
+    def add(self, job_id: int):
+        if job_id < 0 or job_id in self:
+            return
+        byte = job_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (job_id & 7)
+        self.alterado = True
+
+    def __len__(self) -> int:
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    @classmethod
+    def ler(cls, ficheiro: str) -> Optional[IdsVistos]:
+        try:
+            with open(ficheiro, "rb") as f:
+                return cls(f.read())
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, ficheiro: str):
+        if not self.alterado:
+            return
+        os.makedirs(os.path.dirname(ficheiro) or ".", exist_ok=True)
+        temporario = ficheiro + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(self.bits)
+        os.replace(temporario, ficheiro)
+        self.alterado = False
+
+
+class Vigia:
+    # Sonda a primeira página da lista (mais recentes primeiro) com pedido condicional; só desce às
+    # páginas seguintes enquanto forem todas novidade.
+    def __init__(self, vistos: IdsVistos, max_paginas: int):
+        self.vistos = vistos
+        self.max_paginas = max_paginas
+        self.validadores = {}
+        self.assinatura = None
+
+    def pedir_pagina(self, pagina: int, condicional: bool = False) -> requests.Response:
+        url, params, cabecalhos, timeout, _ = pedido_pagina_itjobs(pagina)
+        if condicional:
+            cabecalhos = {**cabecalhos, **self.validadores}
+        # Sem a cache HTTP: dentro do TTL devolveria sempre a mesma página.
+        return enviar_pedido(preparar_url(url, params), headers=cabecalhos, timeout=timeout)
+
+    def sondar(self) -> Optional[list]:
+        # Devolve as ofertas ainda não vistas (mais recentes primeiro), ou None se nada mudou.
+        resp = self.pedir_pagina(1, condicional=True)
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+        assinatura = hashlib.sha1(resp.content).digest()
+        if assinatura == self.assinatura:
+            return None
+        self.assinatura = assinatura
+        self.validadores = {
+            cabecalho: valor
+            for cabecalho, valor in (("If-None-Match", resp.headers.get("ETag")),
+                                     ("If-Modified-Since", resp.headers.get("Last-Modified")))
+            if valor
+        }
+
+        novas = []
+        pagina, resultados = 1, json_resposta(resp).get("results", [])
+        while True:
+            frescas = [job for job in resultados if job.get("id") is not None and job["id"] not in self.vistos]
+            novas.extend(frescas)
+            if len(frescas) < len(resultados) or len(resultados) < LIMITE_PAGINA or pagina >= self.max_paginas:
+                return novas
+            pagina += 1
+            resp = self.pedir_pagina(pagina)
+            resp.raise_for_status()
+            resultados = json_resposta(resp).get("results", [])
+
+
+def filtro_watch(localidade: str, empresa: str, any_type: bool, regime: Optional[str]):
+    # Os mesmos critérios do search: localidade/empresa por substring, part-time e regime por prefixo.
+    aceita = filtro_part_time(localidade, empresa, so_part_time=not any_type)
+    regime_norm = normalizar_texto(regime) if regime else ""
+
+    def filtro(job: dict) -> bool:
+        nome_empresa = nome_e_slug_empresa(job)[0] or ""
+        locais = tuple(loc.get("name") or "" for loc in job.get("locations", []))
+        tipos = tuple(t.get("name") or "" for t in job.get("types", []))
+        if not aceita(nome_empresa, locais, tipos):
+            return False
+        return not regime_norm or normalizar_texto(regime_job(job)).startswith(regime_norm)
+
+    return filtro
+
+
+def enviar_webhook(url: str, job: dict):
+    import requests
+
+    sessao, _ = sessao_para(urlparse(url).hostname or "")
+    try:
+        resp = sessao.post(url, json=job, timeout=TIMEOUT_DEFAULT)
+        resp.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Webhook: não foi possível enviar o job {job.get('id')}: {e}", file=sys.stderr)
+
+
+@app.command()
+def watch(
+    localidade: str = typer.Argument("", help="Localidade (substring; vazio aceita todas)."),
+    empresa: str = typer.Argument("", help="Empresa (substring; vazio aceita todas)."),
+    any_type: bool = typer.Option(False, "--any-type", help="Não restringe a ofertas PART-TIME."),
+    regime: Optional[str] = typer.Option(None, "--regime", help="Filtra por regime (remoto, híbrido, presencial)."),
+    interval: float = typer.Option(60.0, "--interval", help="Intervalo mínimo entre sondagens (segundos)."),
+    max_interval: float = typer.Option(900.0, "--max-interval", help="Intervalo máximo, atingido quando nada muda."),
+    max_pages: int = typer.Option(5, "--max-pages", help="Páginas percorridas por sondagem quando só há novidades."),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Acrescenta as novas ofertas (JSONL) a este ficheiro."),
+    webhook: Optional[str] = typer.Option(None, "--webhook", help="Envia cada nova oferta em JSON (POST) para este URL."),
+    state: str = typer.Option(WATCH_VISTOS, "--state", help="Ficheiro com os ids já vistos."),
+    initial: bool = typer.Option(False, "--initial", help="Na primeira sondagem emite também as ofertas já publicadas."),
+    once: bool = typer.Option(False, "--once", help="Faz uma única sondagem e termina (para usar no cron)."),
+):
+    import requests
+
+    import signal
+
+    if interval <= 0 or max_interval < interval:
+        print("Intervalos inválidos: é preciso 0 < --interval <= --max-interval.")
+        return
+
+    vistos = IdsVistos.ler(state)
+    # Sem estado anterior, a primeira sondagem só marca o que já existe (a não ser com --initial).
+    emitir = initial or vistos is not None
+    vigia = Vigia(vistos or IdsVistos(), max(1, max_pages))
+    aceita = filtro_watch(localidade, empresa, any_type, regime)
+
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    destino = open(output, "a", encoding="utf-8") if output else None
+    intervalo = interval
+    try:
+        while not parar.is_set():
+            try:
+                novas = vigia.sondar()
+            except requests.RequestException as e:
+                print(f"Erro ao aceder à API do itjobs.pt: {e}", file=sys.stderr)
+                intervalo = min(intervalo * 2, max_interval)
+            else:
+                # Com novidades volta ao intervalo mínimo; sem elas o intervalo cresce até ao máximo.
+                intervalo = interval if novas else min(intervalo * WATCH_FATOR_INTERVALO, max_interval)
+                for job in reversed(novas or []):
+                    vigia.vistos.add(job["id"])
+                    if not emitir or not aceita(job):
+                        continue
+                    linha = json.dumps(job, ensure_ascii=False) + "\n"
+                    if destino:
+                        destino.write(linha)
+                        destino.flush()
+                    if webhook:
+                        enviar_webhook(webhook, job)
+                    if not destino and not webhook:
+                        sys.stdout.write(linha)
+                        sys.stdout.flush()
+                vigia.vistos.guardar(state)
+                emitir = True
+
+            if once:
+                break
+            parar.wait(intervalo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if destino:
+            destino.close()
+
+
+### Anúncios repetidos ###
+
+# MinHash das palavras e dos pares de palavras consecutivas do título + descrição normalizados: a fração
+# de baldes com o mesmo mínimo estima a semelhança de Jaccard entre os dois conjuntos. Usa-se uma só permutação
+# (cada termo cai num de BALDES_MINHASH baldes e fica o menor hash de cada um), com os baldes vazios
+# preenchidos a partir do balde ocupado seguinte. Os candidatos saem das faixas (LSH): grupos de
+# LINHAS_FAIXA baldes guardados com índice, por isso só se compara com anúncios que partilhem uma faixa.
+# Com 32 faixas de 4 baldes, dois anúncios com semelhança 0.7 partilham pelo menos uma faixa em mais de
+# 99.9% dos casos. O limiar foi calibrado com anúncios editados (ver benchmark.py duplicates).
+BALDES_MINHASH = 128
+LINHAS_FAIXA = 4
+SEMELHANCA_REPETIDO = 0.7
+MAXIMO_TERMOS_MEMORIZADOS = 400_000
+VERSAO_CONTEUDOS = "1"
+_MASCARA_BALDE = 0xFFFF
+_PRIMO_FAIXA = 0x9E3779B97F4A7C15
+
+_RE_PALAVRA = re.compile(r"[a-z0-9]+")
+
+
+_hash_termos = {}
+
+
+def hash_termo(termo: str) -> int:
+    return int.from_bytes(hashlib.blake2b(termo.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(texto: str) -> array:
+    # As palavras dão tolerância a edições; os pares distinguem anúncios feitos com o mesmo vocabulário.
+    palavras = _RE_PALAVRA.findall(texto)
+    termos = set(palavras).union(map(" ".join, zip(palavras, palavras[1:])))
+    if not termos:
+        return array("H", bytes(2 * BALDES_MINHASH))
+    # O vocabulário repete-se muito: só os termos novos são calculados.
+    novos = termos.difference(_hash_termos)
+    if novos:
+        if len(_hash_termos) + len(novos) > MAXIMO_TERMOS_MEMORIZADOS:
+            _hash_termos.clear()
+            novos = termos
+        _hash_termos.update((termo, hash_termo(termo)) for termo in novos)
+    # O resto da divisão escolhe o balde e o quociente é o valor: percorrendo os hashes por ordem
+    # decrescente, o último valor escrito em cada balde é o mínimo.
+    minimos = {h % BALDES_MINHASH: h // BALDES_MINHASH for h in sorted(map(_hash_termos.__getitem__, termos), reverse=True)}
+    ocupados = sorted(minimos)
+    valores = []
+    for i in range(BALDES_MINHASH):
+        if i in minimos:
+            valores.append(minimos[i] & _MASCARA_BALDE)
+            continue
+        k = bisect_left(ocupados, i)
+        j = ocupados[k] if k < len(ocupados) else ocupados[0] + BALDES_MINHASH
+        valores.append((minimos[j % BALDES_MINHASH] + (j - i) * _PRIMO_FAIXA) & _MASCARA_BALDE)
+    return array("H", valores)
+
+
+def faixas_minhash(assinatura: array) -> list:
+    # Um inteiro por faixa (com o número da faixa misturado, para faixas diferentes não coincidirem).
+    faixas = []
+    for k in range(BALDES_MINHASH // LINHAS_FAIXA):
+        valor = k
+        for v in assinatura[k * LINHAS_FAIXA:(k + 1) * LINHAS_FAIXA]:
+            valor = (valor * _PRIMO_FAIXA + v) & 0x7FFFFFFFFFFFFFFF
+        faixas.append(valor)
+    return faixas
+
+
+_BIT_BALDE = sum(1 << (16 * i) for i in range(BALDES_MINHASH))
+
+
+def inteiro_assinatura(assinatura) -> int:
+    # A assinatura (array ou bytes do armazém) como um só inteiro, com um balde em cada 16 bits.
+    return int.from_bytes(assinatura, sys.byteorder)
+
+
+def semelhanca(a: int, b: int) -> float:
+    # No XOR os baldes iguais ficam a zero; dobrar cada balde sobre o seu bit mais baixo deixa um bit
+    # por balde diferente, contados de uma vez.
+    x = a ^ b
+    x |= x >> 1
+    x |= x >> 2
+    x |= x >> 4
+    x |= x >> 8
+    return 1 - (x & _BIT_BALDE).bit_count() / BALDES_MINHASH
+
+
+def texto_conteudo(job: dict) -> tuple:
+    # (empresa, texto) normalizados como no índice de pesquisa (ver documento_indice).
+    empresa, _ = nome_e_slug_empresa(job)
+    texto = normalizar_texto(job.get("title")) + " " + normalizar_texto(texto_de_html(job.get("body")))
+    return normalizar_texto(empresa), texto
+
+
+def atualizar_conteudos(con: sqlite3.Connection, linhas: list, alterados_em: Optional[dict] = None):
+    # linhas: (id, empresa normalizada, texto normalizado). Um job junta-se ao grupo dos anúncios da mesma
+    # empresa com semelhança de pelo menos SEMELHANCA_REPETIDO; o grupo fica sempre com o id mais baixo
+    # (e grupos ligados pelo novo job fundem-se).
+    alterados_em = alterados_em or {}
+    n_faixas = BALDES_MINHASH // LINHAS_FAIXA
+    sql_candidatos = (
+        "SELECT id, grupo, assinatura FROM conteudo_job WHERE id IN "
+        f"(SELECT id FROM faixas_conteudo WHERE empresa = ? AND faixa IN ({', '.join('?' * n_faixas)}))"
+    )
+    for job_id, empresa, texto in linhas:
+        assinatura_texto = hashlib.sha1(texto.encode("utf-8")).hexdigest()
+        anterior = con.execute("SELECT hash, versoes, empresa, assinatura FROM conteudo_job WHERE id = ?",
+                               (job_id,)).fetchone()
+        if anterior and anterior[0] == assinatura_texto:
+            continue
+        if anterior:
+            con.executemany("DELETE FROM faixas_conteudo WHERE empresa = ? AND faixa = ? AND id = ?",
+                            [(anterior[2], faixa, job_id) for faixa in faixas_minhash(array("H", anterior[3]))])
+            con.execute("INSERT INTO alteracoes_job (id, em, hash_anterior, hash_novo) VALUES (?, ?, ?, ?)",
+                        (job_id, alterados_em.get(job_id) or datetime.now().isoformat(timespec="seconds"),
+                         anterior[0], assinatura_texto))
+            # O texto mudou: se representava um grupo, o grupo passa para o id seguinte.
+            seguinte = con.execute("SELECT MIN(id) FROM conteudo_job WHERE grupo = ? AND id != ?",
+                                   (job_id, job_id)).fetchone()[0]
+            if seguinte is not None:
+                con.execute("UPDATE conteudo_job SET grupo = ? WHERE grupo = ? AND id != ?", (seguinte, job_id, job_id))
+
+        assinatura = minhash(texto)
+        faixas = faixas_minhash(assinatura)
+        valor = inteiro_assinatura(assinatura)
+        # Uma cópia exata de outro anúncio entra logo no grupo dele, sem procurar candidatos.
+        copia = con.execute("SELECT grupo FROM conteudo_job WHERE empresa = ? AND hash = ? AND id != ? LIMIT 1",
+                            (empresa, assinatura_texto, job_id)).fetchone()
+        grupos = {copia[0]} if copia else set()
+        candidatos = () if copia else con.execute(sql_candidatos, (empresa, *faixas))
+        for outro_id, grupo, outra in candidatos:
+            # Basta um membro de cada grupo.
+            if outro_id == job_id or grupo in grupos:
+                continue
+            if semelhanca(valor, inteiro_assinatura(outra)) >= SEMELHANCA_REPETIDO:
+                grupos.add(grupo)
+        grupo = min(grupos | {job_id})
+        con.execute(
+            "INSERT OR REPLACE INTO conteudo_job (id, empresa, hash, assinatura, grupo, versoes) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, empresa, assinatura_texto, assinatura.tobytes(), grupo, anterior[1] + 1 if anterior else 1),
+        )
+        con.executemany("INSERT OR IGNORE INTO faixas_conteudo (empresa, faixa, id) VALUES (?, ?, ?)",
+                        [(empresa, faixa, job_id) for faixa in faixas])
+        for outro in grupos - {grupo}:
+            con.execute("UPDATE conteudo_job SET grupo = ? WHERE grupo = ?", (grupo, outro))
+
+
+@medido
+def reconstruir_conteudos(con: sqlite3.Connection):
+    # O texto já normalizado vem do índice FTS; o histórico de alterações mantém-se.
+    con.execute("DELETE FROM conteudo_job")
+    con.execute("DELETE FROM faixas_conteudo")
+    cursor = con.execute("SELECT rowid, empresa, titulo || ' ' || corpo FROM jobs_fts ORDER BY rowid")
+    for lote in iter(lambda: cursor.fetchmany(5000), []):
+        atualizar_conteudos(con, lote)
+    escrever_meta(con, "conteudos", VERSAO_CONTEUDOS)
+
+
+def garantir_conteudos(con: sqlite3.Connection) -> bool:
+    # Armazéns anteriores à deteção de repetidos (ou a outra versão dela) são recalculados uma vez.
+    # Devolve True se os grupos foram recalculados (as contagens sem repetidos do cubo ficam desatualizadas).
+    em_falta = con.execute("SELECT (SELECT COUNT(*) FROM jobs) != (SELECT COUNT(*) FROM conteudo_job)").fetchone()[0]
+    versao = ler_meta(con, "conteudos")
+    if not em_falta and versao is None:
+        escrever_meta(con, "conteudos", VERSAO_CONTEUDOS)
+    elif em_falta or versao != VERSAO_CONTEUDOS:
+        if con.execute("SELECT COUNT(*) FROM jobs_fts").fetchone()[0] != con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]:
+            reindexar_armazem(con)
+        reconstruir_conteudos(con)
+        con.commit()
+        return True
+    return False
+
+
+def sem_repetidos(ofertas):
+    # A mesma deteção em memória, para ofertas que não vêm do armazém: fica a primeira de cada grupo.
+    # Os repetidos também ficam nas faixas, para que um anúncio parecido com um deles (e não com o
+    # primeiro) caia no mesmo grupo, como no armazém.
+    faixas_vistas = {}
+    for job in ofertas:
+        empresa, texto = texto_conteudo(job)
+        assinatura = minhash(texto)
+        faixas = faixas_minhash(assinatura)
+        valor = inteiro_assinatura(assinatura)
+        candidatos = {c for f in faixas for c in faixas_vistas.get((empresa, f), ())}
+        for f in faixas:
+            faixas_vistas.setdefault((empresa, f), []).append(valor)
+        if not any(semelhanca(valor, c) >= SEMELHANCA_REPETIDO for c in candidatos):
+            yield job
+
+
+### Salários ###
+
+# Tudo é guardado como bruto mensal: os valores anuais dividem-se por 14 (12 meses + subsídios)
+# e os valores à hora multiplicam-se pelas horas de um mês de trabalho.
+MESES_SALARIO_ANO = 14
+HORAS_SALARIO_MES = 168
+# Sem período indicado, um valor a partir daqui só pode ser anual.
+SALARIO_ANUAL_MINIMO = 10000
+VERSAO_SALARIOS = "1"
+SALARIOS_EMPRESA_TTL = 7 * 24 * 3600
+PERCENTIS_SALARIO = "25,50,75,90"
+
+_RE_VALOR_SALARIO = re.compile(r"(\d{1,3}(?:[.\s]\d{3})+|\d+)(?:,\d+)?(?:\s*(k|mil)\b)?", re.I)
+_RE_SALARIO_ANUAL = re.compile(r"\b(?:ano|anual|annual|year|yearly|p\.?\s?a)\b", re.I)
+_RE_SALARIO_MENSAL = re.compile(r"\b(?:m[eê]s|mensal|mensais|month|monthly)\b", re.I)
+_RE_SALARIO_HORA = re.compile(r"\b(?:hora|hour|hourly)\b|/\s*h\b", re.I)
+
+
+def intervalo_salario(texto: Optional[str]) -> Optional[tuple]:
+    # "1.500€ - 2.000€" -> (1500.0, 2000.0, "mensal"); "30k-40k/ano" -> (30000/14, 40000/14, "anual").
+    if not texto:
+        return None
+    if _RE_SALARIO_HORA.search(texto):
+        periodo, fator, minimo_valido = "hora", HORAS_SALARIO_MES, 1
+    else:
+        periodo, fator, minimo_valido = "mensal", 1, 100
+    numeros = _RE_VALOR_SALARIO.findall(texto)
+    # Em "40-50k" o sufixo vale para os dois extremos.
+    em_milhares = any(milhares for _, milhares in numeros)
+    valores = []
+    for numero, milhares in numeros:
+        valor = float(re.sub(r"[.\s]", "", numero))
+        if milhares or (em_milhares and valor < 1000):
+            valor *= 1000
+        if valor >= minimo_valido:
+            valores.append(valor)
+    if not valores:
+        return None
+    minimo, maximo = min(valores), max(valores)
+    if periodo == "mensal" and (_RE_SALARIO_ANUAL.search(texto) or (
+            not _RE_SALARIO_MENSAL.search(texto) and maximo >= SALARIO_ANUAL_MINIMO)):
+        periodo, fator = "anual", 1 / MESES_SALARIO_ANO
+    return minimo * fator, maximo * fator, periodo
+
+
+def chave_empresa(nome: Optional[str], slug: Optional[str]) -> str:
+    return slug or normalizar_texto(nome or "")
+
+
+def linha_salario_job(job: dict) -> tuple:
+    nome, slug = nome_e_slug_empresa(job)
+    salario = intervalo_salario(job.get("wage"))
+    minimo, maximo, periodo = salario or (None, None, None)
+    medio = (minimo + maximo) / 2 if salario else None
+    return (job["id"], chave_empresa(nome, slug), nome or "N/A", normalizar_texto(nome), slug,
+            minimo, maximo, medio, periodo)
+
+
+def atualizar_salarios_jobs(con: sqlite3.Connection, ofertas: list):
+    con.executemany(
+        "INSERT OR REPLACE INTO salarios_job (id, chave, empresa, empresa_norm, slug, minimo, maximo, medio, periodo) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [linha_salario_job(job) for job in ofertas],
+    )
+
+
+@medido
+def reconstruir_salarios(con: sqlite3.Connection):
+    con.execute("DELETE FROM salarios_job")
+    lote = []
+    for (data,) in con.execute("SELECT data FROM jobs"):
+        lote.append(carregar_json(data))
+        if len(lote) == 5000:
+            atualizar_salarios_jobs(con, lote)
+            lote = []
+    atualizar_salarios_jobs(con, lote)
+    escrever_meta(con, "salarios", VERSAO_SALARIOS)
+
+
+def garantir_salarios(con: sqlite3.Connection):
+    # Armazéns anteriores à tabela (ou a outra versão do parser) são recalculados uma vez.
+    em_falta = con.execute("SELECT (SELECT COUNT(*) FROM jobs) != (SELECT COUNT(*) FROM salarios_job)").fetchone()[0]
+    if em_falta or ler_meta(con, "salarios") != VERSAO_SALARIOS:
+        reconstruir_salarios(con)
+        con.commit()
+
+
+@medido
+def atualizar_salarios_empresas(con: sqlite3.Connection) -> int:
+    # Só as empresas com ofertas sem salário, e cujo intervalo do Teamlyzer já expirou, são pedidas.
+    limite = time.time() - SALARIOS_EMPRESA_TTL
+    empresas = con.execute(
+        "SELECT chave, MIN(empresa), MIN(slug) FROM salarios_job WHERE medio IS NULL AND empresa != 'N/A' "
+        "AND chave NOT IN (SELECT chave FROM salarios_empresa WHERE obtido_em > ?) GROUP BY chave",
+        (limite,),
+    ).fetchall()
+    urls = {chave: encontrar_url_empresa_teamlyzer(nome, slug) for chave, nome, slug in empresas}
+
+    chaves = [chave for chave, url in urls.items() if url]
+    respostas = obter_em_paralelo([pedido_teamlyzer(urls[chave].rstrip("/") + "/salary-reviews") for chave in chaves])
+    textos = dict.fromkeys(urls)
+    for chave, resp in zip(chaves, respostas):
+        html = html_da_resposta(resp)
+        if html:
+            textos[chave] = extrair_memorizado("salario", resp.url, html, salario_medio_de_html)
+
+    agora = time.time()
+    linhas = []
+    for chave, texto in textos.items():
+        salario = intervalo_salario(texto)
+        minimo, maximo = salario[:2] if salario else (None, None)
+        linhas.append((chave, texto, minimo, maximo, (minimo + maximo) / 2 if salario else None, agora))
+    con.executemany("INSERT OR REPLACE INTO salarios_empresa VALUES (?, ?, ?, ?, ?, ?)", linhas)
+    con.commit()
+    return len(linhas)
+
+
+def linhas_salarios(con: sqlite3.Connection, empresa: Optional[str], minimo: Optional[float],
+                    maximo: Optional[float], teamlyzer: bool) -> list:
+    # (id, empresa, mínimo, máximo, médio, período, origem), ordenadas pelo médio (índice idx_salarios_medio).
+    fontes = ["SELECT id, empresa, empresa_norm, minimo, maximo, medio, periodo, 'itjobs' AS origem "
+              "FROM salarios_job WHERE medio IS NOT NULL"]
+    if teamlyzer:
+        # Ofertas sem salário herdam o intervalo que o Teamlyzer dá para a empresa.
+        fontes.append("SELECT s.id, s.empresa, s.empresa_norm, e.minimo, e.maximo, e.medio, 'mensal', 'teamlyzer' "
+                      "FROM salarios_job s JOIN salarios_empresa e ON e.chave = s.chave "
+                      "WHERE s.medio IS NULL AND e.medio IS NOT NULL")
+    filtros, params = [], []
+    if empresa:
+        filtros.append("instr(empresa_norm, ?) > 0")
+        params.append(normalizar_texto(empresa))
+    if minimo is not None:
+        filtros.append("maximo >= ?")
+        params.append(minimo)
+    if maximo is not None:
+        filtros.append("minimo <= ?")
+        params.append(maximo)
+    sql = (f"SELECT id, empresa, minimo, maximo, medio, periodo, origem FROM ({' UNION ALL '.join(fontes)}) "
+           f"{'WHERE ' + ' AND '.join(filtros) if filtros else ''} ORDER BY medio")
+    return con.execute(sql, params).fetchall()
+
+
+def percentil_ordenado(valores: list, p: float) -> float:
+    # Interpolação linear entre as duas posições vizinhas (o mesmo que o numpy por omissão).
+    k = (len(valores) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(valores):
+        return valores[-1]
+    return valores[i] + (valores[i + 1] - valores[i]) * (k - i)
+
+
+def resumo_salarios(linhas: list, percentis: List[float], top: int, fator: float) -> dict:
+    medios = [linha[4] * fator for linha in linhas]
+    origens = {}
+    for linha in linhas:
+        origens[linha[6]] = origens.get(linha[6], 0) + 1
+    mais_altos = sorted(linhas, key=lambda linha: (-linha[3], linha[0]))[:top]
+    return {
+        "ofertas": len(linhas),
+        "unidade": "€ bruto/ano" if fator != 1 else "€ bruto/mês",
+        "origem": origens,
+        "percentis": {f"p{p:g}": round(percentil_ordenado(medios, p), 2) for p in percentis} if medios else {},
+        "intervalo": {
+            "minimo": round(min(linha[2] for linha in linhas) * fator, 2),
+            "maximo": round(max(linha[3] for linha in linhas) * fator, 2),
+        } if linhas else None,
+        "top": [
+            {"id": job_id, "empresa": nome, "minimo": round(mn * fator, 2), "maximo": round(mx * fator, 2),
+             "periodo": periodo, "origem": origem}
+            for job_id, nome, mn, mx, _, periodo, origem in mais_altos
+        ],
+    }
+
+
+def percentis_de(texto: str) -> List[float]:
+    percentis = [float(p) for p in texto.split(",") if p.strip()]
+    if any(not 0 <= p <= 100 for p in percentis):
+        raise ValueError("Os percentis têm de estar entre 0 e 100.")
+    return percentis
+
+
+@medido
+def consultar_salarios(empresa: Optional[str], minimo: Optional[float], maximo: Optional[float],
+                       teamlyzer: bool, anual: bool) -> list:
+    fator = MESES_SALARIO_ANO if anual else 1
+    con = abrir_armazem()
+    try:
+        garantir_salarios(con)
+        if teamlyzer:
+            atualizar_salarios_empresas(con)
+        return linhas_salarios(con, empresa, None if minimo is None else minimo / fator,
+                               None if maximo is None else maximo / fator, teamlyzer)
+    finally:
+        con.close()
+
+
+@app.command()
+def salaries(
+    company: Optional[str] = typer.Option(None, "--company", help="Só as ofertas desta empresa (substring)."),
+    minimo: Optional[float] = typer.Option(None, "--min", help="Intervalos que chegam pelo menos a este valor."),
+    maximo: Optional[float] = typer.Option(None, "--max", help="Intervalos que começam até este valor."),
+    percentiles: str = typer.Option(PERCENTIS_SALARIO, "--percentiles", help="Percentis a calcular (ex: 10,50,90)."),
+    top: int = typer.Option(10, "--top", help="Número de ofertas mais bem pagas a mostrar."),
+    annual: bool = typer.Option(False, "--annual", help="Valores (e --min/--max) em bruto anual em vez de mensal."),
+    teamlyzer: bool = typer.Option(False, "--teamlyzer", help="Ofertas sem salário usam o intervalo da empresa no Teamlyzer."),
+    csv_file: Optional[str] = typer.Option(None, "--csv", help="Exporta as ofertas filtradas para CSV."),
+):
+    import requests
+
+    if not os.path.exists(ARMAZEM_DB):
+        print("Armazém local vazio. Corra primeiro: python jobscli.py sync")
+        return
+    try:
+        percentis = percentis_de(percentiles)
+    except ValueError as e:
+        print(f"Percentis inválidos: {e}")
+        return
+
+    try:
+        linhas = consultar_salarios(company, minimo, maximo, teamlyzer, annual)
+    except requests.RequestException as e:
+        print(f"Erro ao aceder ao Teamlyzer: {e}")
+        return
+
+    if not linhas:
+        print("Não foram encontradas ofertas com salário para esses filtros.")
+        return
+
+    fator = MESES_SALARIO_ANO if annual else 1
+    print(json.dumps(resumo_salarios(linhas, percentis, max(top, 0), fator), indent=2, ensure_ascii=False))
+
+    if csv_file:
+        try:
+            with open(csv_file, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["id", "empresa", "minimo", "maximo", "medio", "periodo", "origem"])
+                for job_id, nome, mn, mx, medio, periodo, origem in linhas:
+                    writer.writerow([job_id, nome, round(mn * fator, 2), round(mx * fator, 2),
+                                     round(medio * fator, 2), periodo, origem])
+            print(f"CSV '{csv_file}' criado com sucesso!")
+        except Exception as e:
+            print("Erro ao criar CSV:", e)
+
+
+### Análise colunar (numpy/pandas, opcionais) ###
+
+FREQUENCIAS_INTERVALO = {"day": "D", "week": "W", "month": "M"}
+
+
+def tabela_colunar(ofertas, contador: ContadorSkills) -> dict:
+    # Uma passagem pelos dicts para preencher colunas; as análises seguintes são todas vetorizadas.
+    import numpy as np
+    import pandas as pd
+
+    ids, datas, empresas, empresa_ids, regimes, sal_min, sal_max = [], [], [], [], [], [], []
+    locais_job, locais_nome = [], []
+    tipos_job, tipos_nome = [], []
+    skills_job, skills_col = [], []
+    indice_skill = {skill: k for k, skill in enumerate(contador.skills)}
+
+    for i, job in enumerate(ofertas):
+        ids.append(job.get("id"))
+        datas.append((job.get("publishedAt") or "")[:10] or None)
+        empresa = job.get("company") if isinstance(job.get("company"), dict) else {}
+        empresas.append(empresa.get("name") or "N/A")
+        empresa_ids.append(empresa.get("id") or 0)
+        regimes.append(regime_job(job))
+
+        salario = intervalo_salario(job.get("wage"))
+        sal_min.append(salario[0] if salario else np.nan)
+        sal_max.append(salario[1] if salario else np.nan)
+
+        for loc in job.get("locations", []):
+            locais_job.append(i)
+            locais_nome.append(loc.get("name", "N/A"))
+        for t in job.get("types", []):
+            tipos_job.append(i)
+            tipos_nome.append(t.get("name", "N/A"))
+
+        contagens = {}
+        contador.contar(((job.get("title") or "") + " " + (job.get("body") or "")).lower(), contagens)
+        for skill in contagens:
+            skills_job.append(i)
+            skills_col.append(indice_skill[skill])
+
+    n = len(ids)
+    jobs = pd.DataFrame({
+        "id": np.array(ids, dtype="int64") if n else np.array([], dtype="int64"),
+        "publicado": pd.to_datetime(pd.Series(datas, dtype="object"), errors="coerce"),
+        "empresa": pd.Categorical(empresas),
+        "empresa_id": np.array(empresa_ids, dtype="int64") if n else np.array([], dtype="int64"),
+        "regime": pd.Categorical(regimes),
+        "salario_min": np.array(sal_min, dtype="float64"),
+        "salario_max": np.array(sal_max, dtype="float64"),
+    })
+
+    locais = pd.DataFrame({"job": np.array(locais_job, dtype="int64"), "local": pd.Categorical(locais_nome)})
+    tipos = pd.crosstab(
+        pd.Series(tipos_job, dtype="int64", name="job"), pd.Series(tipos_nome, dtype="object", name="tipo")
+    ).reindex(range(n), fill_value=0).astype(bool)
+
+    matriz_skills = np.zeros((n, len(contador.skills)), dtype=bool)
+    matriz_skills[np.array(skills_job, dtype="int64"), np.array(skills_col, dtype="int64")] = True
+
+    return {
+        "jobs": jobs,
+        "locais": locais,
+        "tipos": tipos,
+        "skills": pd.DataFrame(matriz_skills, columns=contador.skills),
+    }
+
+
+def relatorio_colunar(tabela: dict, intervalo: str, top: int) -> dict:
+    import numpy as np
+
+    jobs = tabela["jobs"]
+    tipos = tabela["tipos"]
+    skills = tabela["skills"]
+    n = len(jobs)
+
+    serie = jobs["publicado"].dropna().dt.to_period(FREQUENCIAS_INTERVALO[intervalo]).value_counts().sort_index()
+    medio = ((jobs["salario_min"] + jobs["salario_max"]) / 2).dropna().to_numpy()
+    prevalencia = skills.sum(axis=0).sort_values(ascending=False).head(top)
+
+    return {
+        "total_ofertas": int(n),
+        "regimes": {k: int(v) for k, v in jobs["regime"].value_counts().items()},
+        "tipos": {k: int(v) for k, v in tipos.sum(axis=0).sort_values(ascending=False).items()},
+        "top_empresas": {k: int(v) for k, v in jobs["empresa"].value_counts().head(top).items()},
+        "top_locais": {k: int(v) for k, v in tabela["locais"]["local"].value_counts().head(top).items()},
+        "salarios": {
+            "com_salario": int(medio.size),
+            "p25": float(np.percentile(medio, 25)) if medio.size else None,
+            "mediana": float(np.median(medio)) if medio.size else None,
+            "p75": float(np.percentile(medio, 75)) if medio.size else None,
+        },
+        "serie_temporal": {p.start_time.strftime("%Y-%m-%d"): int(v) for p, v in serie.items()},
+        "regime_x_tipo": {
+            regime: {tipo: int(v) for tipo, v in linha.items() if v}
+            for regime, linha in tipos.groupby(jobs["regime"], observed=True).sum().iterrows()
+        },
+        "skills": {k: {"ofertas": int(v), "percentagem": round(100.0 * v / n, 1)} for k, v in prevalencia.items() if v},
+        "skills_x_regime": {
+            regime: {skill: int(linha[skill]) for skill in prevalencia.index if linha[skill]}
+            for regime, linha in skills.groupby(jobs["regime"], observed=True).sum().iterrows()
+        },
+    }
+
+
+@app.command()
+def report(
+    interval: str = typer.Option("month", "--interval", help="Intervalo da série temporal: day, week ou month."),
+    top: int = typer.Option(10, "--top", help="Número de empresas, locais e skills a mostrar."),
+    skills_file: Optional[str] = typer.Option(None, "--skills-file", help="Ficheiro com skills e sinónimos (skill: sin1, sin2)."),
+    max_pages: Optional[int] = typer.Option(None, "--max-pages", help="Número máximo de páginas a obter (por omissão 1)."),
+    todas: bool = typer.Option(False, "--all", help="Percorre todas as páginas do itjobs.pt."),
+    offline: bool = typer.Option(False, "--offline", help="Usa o armazém local (ver sync)."),
+):
+    import requests
+
+    try:
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+    except ImportError:
+        print("O comando report requer numpy e pandas (pip install numpy pandas).")
+        return
+
+    if interval not in FREQUENCIAS_INTERVALO:
+        print(f"Intervalo inválido: {interval} (use {', '.join(FREQUENCIAS_INTERVALO)})")
+        return
+
+    try:
+        contador = carregar_skills(skills_file)
+    except OSError as e:
+        print(f"Não foi possível ler o ficheiro de skills: {e}")
+        return
+
+    try:
+        tabela = tabela_colunar(obter_ofertas(offline, max_pages, todas), contador)
+    except requests.RequestException as e:
+        print(f"Erro ao aceder à API do itjobs.pt: {e}")
+        return
+
+    if tabela["jobs"].empty:
+        print("Não há ofertas para analisar.")
+        return
+
+    print(json.dumps(relatorio_colunar(tabela, interval, top), indent=2, ensure_ascii=False))
+
+
+### Daemon (socket Unix local) ###
+
+def executar_comando(argv: list, cwd: Optional[str] = None, entrada: Optional[str] = None) -> dict:
+    # Corre um comando do typer dentro deste processo, capturando o stdout/stderr para o cliente.
+    saida, erros = io.StringIO(), io.StringIO()
+    cwd_original, stdin_original = os.getcwd(), sys.stdin
+    for chave in estatisticas_cache:
+        estatisticas_cache[chave] = 0
+    codigo = 0
+    try:
+        if cwd:
+            os.chdir(cwd)
+        sys.stdin = io.StringIO(entrada or "")
+        with redirect_stdout(saida), redirect_stderr(erros):
+            try:
+                app(args=argv, prog_name="jobscli.py")
+            except SystemExit as e:
+                codigo = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception as e:
+                print(f"Erro: {e}", file=sys.stderr)
+                codigo = 1
+    finally:
+        sys.stdin = stdin_original
+        os.chdir(cwd_original)
+    return {"stdout": saida.getvalue(), "stderr": erros.getvalue(), "codigo": codigo}
+
+
+def aquecer_daemon():
+    # Carrega já os módulos pesados e abre a cache/armazém, para o primeiro pedido não pagar isso.
+    import bs4  # noqa: F401
+    import requests  # noqa: F401
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor  # noqa: F401
+    if HTTPX_DISPONIVEL:
+        import httpx  # noqa: F401
+    abrir_cache()
+    abrir_armazem().close()
+
+
+@app.command()
+def serve(
+    socket_path: str = typer.Option(SOCKET_DAEMON, "--socket", help="Caminho do socket Unix."),
+):
+    # Os comandos são atendidos um de cada vez (o stdout é redirecionado ao nível do processo);
+    # as sessões HTTP, a cache e os módulos já carregados ficam quentes entre pedidos.
+    import signal
+    import socketserver
+
+    if os.path.exists(socket_path):
+        try:
+            teste = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            teste.connect(socket_path)
+            teste.close()
+            print(f"Já existe um daemon a correr em {socket_path}.")
+            return
+        except OSError:
+            os.remove(socket_path)
+
+    class Atendedor(socketserver.StreamRequestHandler):
+        def handle(self):
+            pedido = json.loads(self.rfile.read())
+            resposta = executar_comando(pedido["argv"], pedido.get("cwd"), pedido.get("stdin"))
+            self.wfile.write(json.dumps(resposta, ensure_ascii=False).encode("utf-8"))
+
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    aquecer_daemon()
+    with socketserver.UnixStreamServer(socket_path, Atendedor) as servidor:
+        # Não se pode usar sys.exit no sinal: o SystemExit seria apanhado pelo comando em curso
+        # (executar_comando). O shutdown pára o ciclo assim que o pedido atual termina.
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=servidor.shutdown, daemon=True).start())
+        os.chmod(socket_path, 0o600)
+        print(f"Daemon à escuta em {socket_path} (Ctrl+C para terminar).", file=sys.stderr)
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+### API HTTP (asyncio) ###
+
+# Endpoints GET com JSON; as listas (top, search, get) saem em streaming (chunked) e aceitam
+# offset/limit. O trabalho bloqueante (requests, sqlite, bs4) corre num pool de threads partilhado,
+# com as mesmas sessões HTTP, cache e armazém para todos os pedidos.
+
+class ErroHttp(Exception):
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+
+
+RAZOES_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error", 502: "Bad Gateway"}
+LOTE_STREAMING = 200
+
+
+def parametro(params: dict, nome: str, defeito=None, obrigatorio: bool = False):
+    valores = params.get(nome)
+    if not valores:
+        if obrigatorio:
+            raise ErroHttp(400, f"Falta o parâmetro '{nome}'.")
+        return defeito
+    return valores[0]
+
+
+def parametro_int(params: dict, nome: str, defeito: Optional[int] = None, obrigatorio: bool = False):
+    valor = parametro(params, nome, None, obrigatorio)
+    if valor is None:
+        return defeito
+    try:
+        return int(valor)
+    except ValueError:
+        raise ErroHttp(400, f"O parâmetro '{nome}' tem de ser um inteiro.")
+
+
+def parametro_bool(params: dict, nome: str) -> bool:
+    return (parametro(params, nome, "") or "").lower() in {"1", "true", "yes", "sim"}
+
+
+def fatia(itens, inicio: int, fim: Optional[int]):
+    # Como o islice, mas ao ser fechado fecha também o gerador de origem (e a ligação sqlite que tenha aberta).
+    itens = iter(itens)
+    try:
+        yield from islice(itens, inicio, fim)
+    finally:
+        if hasattr(itens, "close"):
+            itens.close()
+
+
+def paginar(itens, params: dict):
+    offset = max(0, parametro_int(params, "offset", 0))
+    limit = parametro_int(params, "limit")
+    return fatia(itens, offset, None if limit is None else offset + max(0, limit))
+
+
+def api_top(params: dict):
+    n = parametro_int(params, "n", obrigatorio=True)
+    if n <= 0:
+        raise ErroHttp(400, "O número de ofertas tem de ser maior que 0.")
+    if parametro_bool(params, "offline"):
+        fonte = iterar_ofertas_locais(mais_recentes=True)
+    else:
+        limite = min(n, LIMITE_PAGINA)
+        fonte = iterar_ofertas(math.ceil(n / limite), limite, ordenado=True, avisar=False)
+    return paginar(fatia(fonte, 0, n), params)
+
+
+def api_search(params: dict):
+    localidade = parametro(params, "localidade", "")
+    empresa = parametro(params, "empresa", "")
+    n = parametro_int(params, "n", 10)
+    offline = parametro_bool(params, "offline")
+    query, regime = parametro(params, "query"), parametro(params, "regime")
+    any_type = parametro_bool(params, "any_type")
+    if query or regime or any_type:
+        if not offline:
+            raise ErroHttp(400, "query, regime e any_type usam o índice local: use offline=1.")
+        fonte = fonte_indice(localidade, empresa, n, query, regime, any_type)
+    elif offline:
+        fonte = part_time_locais(localidade, empresa, n)
+    else:
+        fonte = fatia(filtrar_part_time(
+            obter_ofertas(False, parametro_int(params, "max_pages"), parametro_bool(params, "all")),
+            localidade, empresa), 0, n)
+    return paginar(fonte, params)
+
+
+def api_type(params: dict):
+    job_id = parametro_int(params, "id", obrigatorio=True)
+    if parametro_bool(params, "offline"):
+        regime = obter_regime_local(job_id)
+        if regime:
+            return {"id": job_id, "regime": regime}
+        job = obter_oferta_local(job_id)
+        if job is None:
+            raise ErroHttp(404, f"Job {job_id} não está no armazém local.")
+    else:
+        job = obter_job_itjobs(job_id)
+        if isinstance(job, dict) and "error" in job:
+            raise ErroHttp(404, job["error"].get("message", "Erro desconhecido"))
+    return {"id": job_id, "regime": regime_job(job)}
+
+
+def api_skills(params: dict):
+    try:
+        di = datetime.fromisoformat(parametro(params, "from", obrigatorio=True))
+        df = datetime.fromisoformat(parametro(params, "to", obrigatorio=True))
+    except ValueError:
+        raise ErroHttp(400, "Datas inválidas. Usa o formato YYYY-MM-DD.")
+    unicas = parametro_bool(params, "unique")
+    if parametro_bool(params, "offline"):
+        por_dia = skills_por_dia_local(di, df, unicas)
+    else:
+        ofertas = obter_ofertas(False, parametro_int(params, "max_pages"), parametro_bool(params, "all"))
+        por_dia = contar_skills_por_dia(sem_repetidos(ofertas) if unicas else ofertas, contador_rollups(), di, df)
+    return totais_skills(por_dia, contador_rollups().skills, parametro_int(params, "top"))
+
+
+def api_statistics(params: dict):
+    zonas = params.get("zone") or params.get("zona")
+    if not zonas:
+        raise ErroHttp(400, "Falta o parâmetro 'zone'.")
+    data_de, data_ate = parametro(params, "from"), parametro(params, "to")
+    try:
+        for d in (data_de, data_ate):
+            if d:
+                datetime.fromisoformat(d)
+        dimensoes = dimensoes_de(parametro(params, "group_by", "zona,tipo_trabalho"))
+    except ValueError as e:
+        raise ErroHttp(400, str(e))
+    return calcular_estatisticas(zonas, params.get("type", []), data_de, data_ate, dimensoes,
+                                 parametro_bool(params, "offline"), parametro_int(params, "max_pages"),
+                                 parametro_bool(params, "all"), parametro_bool(params, "unique"))
+
+
+def api_get(params: dict):
+    ids = ler_ids([int(v) for v in params.get("id", []) if v.isdigit()], None)
+    if not ids:
+        raise ErroHttp(400, "Indique pelo menos um 'id'.")
+    return paginar(enriquecer_lote(ids), params)
+
+
+def api_list_skills(params: dict):
+    cargos = list(dict.fromkeys(params.get("job", [])))
+    if not cargos:
+        raise ErroHttp(400, "Falta o parâmetro 'job'.")
+    resultados = skills_de_cargos(cargos, parametro_int(params, "top", 10))
+    return resultados[cargos[0]] if len(cargos) == 1 else matriz_cargos_skills(resultados)
+
+
+def api_salaries(params: dict):
+    if not os.path.exists(ARMAZEM_DB):
+        raise ErroHttp(404, "Armazém local vazio: corra sync.")
+    try:
+        percentis = percentis_de(parametro(params, "percentiles", PERCENTIS_SALARIO))
+        minimo, maximo = (float(v) if v else None for v in (parametro(params, "min"), parametro(params, "max")))
+    except ValueError as e:
+        raise ErroHttp(400, str(e))
+    anual = parametro_bool(params, "annual")
+    linhas = consultar_salarios(parametro(params, "company"), minimo, maximo, parametro_bool(params, "teamlyzer"), anual)
+    return resumo_salarios(linhas, percentis, parametro_int(params, "top", 10), MESES_SALARIO_ANO if anual else 1)
+
+
+ROTAS_HTTP = {
+    "/top": api_top,
+    "/search": api_search,
+    "/type": api_type,
+    "/skills": api_skills,
+    "/statistics": api_statistics,
+    "/get": api_get,
+    "/list/skills": api_list_skills,
+    "/salaries": api_salaries,
+}
+
+
+def cabecalhos_http(status: int, extra: dict, manter: bool) -> bytes:
+    linhas = [f"HTTP/1.1 {status} {RAZOES_HTTP.get(status, '')}", "Content-Type: application/json; charset=utf-8",
+              f"Connection: {'keep-alive' if manter else 'close'}"]
+    linhas += [f"{k}: {v}" for k, v in extra.items()]
+    return ("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1")
+
+
+async def responder_json(escritor, status: int, corpo, manter: bool):
+    dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+    escritor.write(cabecalhos_http(status, {"Content-Length": len(dados)}, manter) + dados)
+    await escritor.drain()
+
+
+async def responder_stream(escritor, itens, manter: bool):
+    # Array JSON em chunked encoding: os itens são puxados do gerador em lotes, fora do event loop.
+    # Todos os lotes (e o fecho) correm na mesma thread dedicada: os geradores do armazém têm uma
+    # ligação sqlite aberta, que só pode ser usada na thread onde foi criada.
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    itens = iter(itens)
+    fio = ThreadPoolExecutor(max_workers=1)
+
+    def bloco(dados: bytes) -> bytes:
+        return f"{len(dados):x}\r\n".encode("latin-1") + dados + b"\r\n"
+
+    def proximo_lote() -> list:
+        return list(islice(itens, LOTE_STREAMING))
+
+    def fechar():
+        if hasattr(itens, "close"):
+            itens.close()
+
+    try:
+        lote = await loop.run_in_executor(fio, proximo_lote)
+        escritor.write(cabecalhos_http(200, {"Transfer-Encoding": "chunked"}, manter) + bloco(b"["))
+        separador = b""
+        try:
+            while lote:
+                partes = [json.dumps(job, ensure_ascii=False).encode("utf-8") for job in lote]
+                escritor.write(bloco(separador + b",".join(partes)))
+                separador = b","
+                await escritor.drain()
+                lote = await loop.run_in_executor(fio, proximo_lote)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # Os cabeçalhos já foram enviados: só resta cortar a ligação para o cliente ver o array incompleto.
+            print(f"Erro a meio de uma resposta em streaming: {e.__class__.__name__}: {e}", file=sys.stderr)
+            raise ConnectionAbortedError(str(e))
+    finally:
+        await loop.run_in_executor(fio, fechar)
+        fio.shutdown(wait=False)
+    escritor.write(bloco(b"]") + b"0\r\n\r\n")
+    await escritor.drain()
+
+
+async def atender_http(leitor, escritor, executor):
+    import asyncio
+    import requests
+    import sqlite3
+    from urllib.parse import parse_qs
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            linha = await leitor.readline()
+            if not linha:
+                break
+            try:
+                metodo, alvo, versao = linha.decode("latin-1").split()
+            except ValueError:
+                break
+            cabecalhos = {}
+            while True:
+                h = await leitor.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                nome, _, valor = h.decode("latin-1").partition(":")
+                cabecalhos[nome.strip().lower()] = valor.strip()
+            if cabecalhos.get("content-length"):
+                await leitor.readexactly(int(cabecalhos["content-length"]))
+
+            conexao = cabecalhos.get("connection", "").lower()
+            manter = conexao != "close" and (versao == "HTTP/1.1" or conexao == "keep-alive")
+            caminho, _, consulta = alvo.partition("?")
+            rota = ROTAS_HTTP.get(caminho.rstrip("/") or "/")
+            try:
+                if rota is None:
+                    raise ErroHttp(404, f"Endpoint desconhecido: {caminho} (disponíveis: {', '.join(ROTAS_HTTP)})")
+                if metodo != "GET":
+                    raise ErroHttp(405, "Só é suportado GET.")
+                params = parse_qs(consulta)
+                resultado = await loop.run_in_executor(executor, rota, params)
+                if isinstance(resultado, (list, dict)):
+                    await responder_json(escritor, 200, resultado, manter)
+                else:
+                    await responder_stream(escritor, resultado, manter)
+            except ErroHttp as e:
+                await responder_json(escritor, e.status, {"erro": str(e)}, manter)
+            except requests.RequestException as e:
+                await responder_json(escritor, 502, {"erro": f"Erro ao aceder a serviço externo: {e}"}, manter)
+            except ConnectionError:
+                # Cliente desligado, ou streaming interrompido depois dos cabeçalhos: não há resposta a dar.
+                raise
+            except (sqlite3.Error, OSError, ValueError) as e:
+                await responder_json(escritor, 500, {"erro": str(e)}, manter)
+            except Exception as e:
+                # Qualquer outro erro de um handler (ex: JSON do itjobs com outra forma) fica registado e o
+                # cliente recebe um 500 em vez de ver a ligação cair.
+                print(f"Erro ao atender {caminho}: {e.__class__.__name__}: {e}", file=sys.stderr)
+                await responder_json(escritor, 500, {"erro": "Erro interno do servidor."}, manter)
+            if not manter:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        escritor.close()
+
+
+@app.command("serve-http")
+def serve_http(
+    host: str = typer.Option("127.0.0.1", "--host", help="Endereço de escuta."),
+    port: int = typer.Option(8080, "--port", help="Porta de escuta."),
+    workers: int = typer.Option(32, "--workers", help="Threads para o trabalho bloqueante (HTTP externo, sqlite)."),
+):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    async def principal():
+        servidor = await asyncio.start_server(lambda l, e: atender_http(l, e, executor), host, port)
+        print(f"API HTTP à escuta em http://{host}:{port} ({', '.join(ROTAS_HTTP)})", file=sys.stderr)
+        async with servidor:
+            await servidor.serve_forever()
+
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 ##################################################################################
 
 
@@ -656,32 +4405,74 @@ def mostrar_comandos():
     print("------------------------------------------------------------")
     print("Pode utilizar o programa com os seguintes comandos:\n")
 
-    print(">  python jobscli.py top <n> [--csv ficheiro.csv]")
+    print(">  python jobscli.py top <n> [--csv ficheiro.csv] [-o ficheiro.jsonl|.parquet] [--jsonl]")
     print("   - Mostra os n empregos mais recentes.")
-    print("   - Se indicar --csv, exporta para CSV.\n")
+    print("   - Se indicar --csv, exporta para CSV; -o exporta em CSV, JSONL ou Parquet.\n")
 
-    print('>  python jobscli.py search <Localidade> "<Empresa>" <n> [--csv ficheiro.csv]')
+    print('>  python jobscli.py search <Localidade> "<Empresa>" <n> [--csv ficheiro.csv] [-o ficheiro] [--jsonl]')
     print("   - Lista n trabalhos part-time dessa empresa nessa localidade.")
-    print("   - Se indicar --csv, exporta para CSV.\n")
+    print("   - Se indicar --csv, exporta para CSV; -o exporta em CSV, JSONL ou Parquet.")
+    print('   - Com --offline aceita --query "texto livre/booleano", --regime e --any-type (índice local).\n')
 
     print(">  python jobscli.py type <job_id>")
-    print("   - Mostra o regime de trabalho (remoto/híbrido/presencial/outro).\n")
-
-    print(">  python jobscli.py skills <data_inicial YYYY-MM-DD> <data_final YYYY-MM-DD>")
-    print("   - Conta ocorrências de skills nas descrições nesse intervalo (output JSON).\n")
-
-    print(">  python jobscli.py statistics <Zona> [--csv ficheiro.csv]")
-    print("   - Conta vagas por zona e por tipo de trabalho.")
+    print("   - Mostra o regime de trabalho (remoto/híbrido/presencial/outro).")
+    print("   - Com --batch (ids, --file ou --all-stored) classifica em paralelo e guarda o regime no armazém.\n")
+
+    print(">  python jobscli.py skills <data_inicial YYYY-MM-DD> <data_final YYYY-MM-DD> [--skills-file skills.txt]")
+    print("                              [--interval day|week|month] [--top N] [--workers N]")
+    print("   - Conta ocorrências de skills nas descrições nesse intervalo (output JSON).")
+    print("   - --interval dá a evolução por período; com --offline usa os totais diários guardados pelo sync.")
+    print("   - --unique ignora os anúncios repetidos (mesma empresa, texto quase igual).")
+    print("   - --workers N conta as fatias do catálogo (páginas ou intervalos do armazém) em N processos.")
+    print("   - O ficheiro de skills tem uma skill por linha, com sinónimos opcionais: 'javascript: js'.\n")
+
+    print(">  python jobscli.py statistics <Zona> [<Zona> ...] [--type T] [--from D] [--to D] [--group-by zona,tipo_trabalho,empresa,dia] [--csv ficheiro.csv]")
+    print("   - Conta vagas por zona e por tipo de trabalho (ou pelas dimensões de --group-by).")
+    print("   - Com --offline responde a partir do cubo de agregados criado pelo sync.")
+    print("   - --unique conta uma só vez os anúncios repetidos (mesma empresa, texto quase igual).")
+    print("   - --workers N agrega as páginas do itjobs.pt em N processos (sem --offline nem --unique).")
     print("   - Se indicar --csv, guarda um CSV: Zona | Tipo de Trabalho | Nº de vagas.\n")
 
-    print(">  python jobscli.py get <job_id> [--csv ficheiro.csv]")
-    print("   - (TP2 a) Mostra o job enriquecido com dados do Teamlyzer.")
+    print(">  python jobscli.py get <job_id> [<job_id> ...] [--file ids.txt|-] [--csv ficheiro.csv]")
+    print("   - (TP2 a) Mostra o job enriquecido com dados do Teamlyzer (vários ids: uma linha JSON por job).")
     print("   - (TP2 d) Se indicar --csv, guarda um CSV com os campos principais.\n")
 
-    print('>  python jobscli.py list skills "<job>" [--top N] [--csv ficheiro.csv]')
+    print('>  python jobscli.py list skills "<job>" ["<job>" ...] [--top N] [--csv ficheiro.csv]')
     print("   - (TP2 c) Mostra em JSON as top N skills para esse tipo de trabalho.")
+    print("   - Com vários cargos, pede-os em paralelo e mostra uma matriz cargo × skill.")
     print("   - (TP2 d) Se indicar --csv, guarda também um CSV: job | skill | count.\n")
 
+    print(">  python jobscli.py sync [--full]")
+    print("   - Sincroniza o armazém local com o itjobs.pt (só o que mudou desde a última vez).")
+    print("   - top, search, type, skills e statistics aceitam --offline para usar o armazém.\n")
+
+    print(">  python jobscli.py salaries [--company C] [--min X] [--max Y] [--percentiles 25,50,75] [--top N]")
+    print("                                [--annual] [--teamlyzer] [--csv ficheiro.csv]")
+    print("   - Percentis, filtros por intervalo e ofertas mais bem pagas (bruto mensal) no armazém local.")
+    print("   - --teamlyzer completa as ofertas sem salário com o intervalo da empresa no Teamlyzer.\n")
+
+    print('>  python jobscli.py watch ["<Localidade>"] ["<Empresa>"] [--any-type] [--regime R] [--interval S] [--max-interval S]')
+    print("                             [-o novas.jsonl] [--webhook URL] [--once]")
+    print("   - Sonda o itjobs.pt com pedidos condicionais e emite (JSONL) só as ofertas novas que passam nos filtros.")
+    print("   - O intervalo cresce enquanto nada muda; os ids vistos ficam guardados entre execuções (--state).\n")
+
+    print(">  python jobscli.py report [--interval day|week|month] [--top N] [--skills-file skills.txt] [--offline]")
+    print("   - Relatório (requer numpy/pandas): regimes, tipos, empresas, salários, série temporal e skills.\n")
+
+    print(">  python jobscli.py serve [--socket caminho]")
+    print("   - Daemon que mantém ligações, cache e módulos carregados; as invocações seguintes")
+    print("     do jobscli.py são encaminhadas para ele por um socket Unix (JOBSCLI_NO_DAEMON=1 desativa).\n")
+
+    print(">  python jobscli.py serve-http [--host H] [--port P] [--workers N]")
+    print("   - API HTTP com JSON: /top, /search, /type, /skills, /statistics, /get, /list/skills e /salaries")
+    print("     (parâmetros na query string, ex: /top?n=50&offline=1&offset=10&limit=20).\n")
+
+    print(">  python jobscli.py [--no-cache] [--cache-stats] [--engine auto|async|threads] [--concurrency N]")
+    print("                     [--profile] [--trace rastreio.json] <comando> ...")
+    print("   - Opções globais: ignora a cache HTTP local ou mostra as estatísticas da cache no fim.")
+    print("   - --engine/--concurrency escolhem o motor de pedidos em paralelo (async requer httpx).")
+    print("   - --profile mostra tempos por fase, pedidos HTTP e parsing; --trace guarda os spans (chrome://tracing).\n")
+
 
 
 if __name__ == "__main__":